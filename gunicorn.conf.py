@@ -0,0 +1,50 @@
+"""
+Configuração do Gunicorn para produção (ASGI).
+
+O Gunicorn gerencia os processos e cada worker do Uvicorn roda um event loop
+que atende várias requisições ao mesmo tempo: enquanto uma view assíncrona
+espera o banco, as outras seguem, em vez de ficarem na fila de um worker
+síncrono. Uso:
+
+    gunicorn -c gunicorn.conf.py
+
+Para voltar ao modo síncrono (WSGI), basta ``gunicorn tierlist.wsgi:application``.
+
+Com ``RANKING_TAREFAS_NO_SERVIDOR=True`` o Gunicorn também sobe o
+``manage.py run_workers`` (tarefas em segundo plano) e o encerra junto, para
+planos sem um serviço de worker separado.
+"""
+import os
+import subprocess
+import sys
+
+wsgi_app = 'tierlist.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# WEB_CONCURRENCY é definida pelo Render de acordo com o plano
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+
+
+def when_ready(server):
+    if os.environ.get('RANKING_TAREFAS_NO_SERVIDOR', '').lower() in ('1', 'true', 'yes'):
+        manage = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manage.py')
+        server.log.info('Iniciando os trabalhadores de tarefas (run_workers)')
+        server.trabalhadores_tarefas = subprocess.Popen([sys.executable, manage, 'run_workers'])
+
+
+def on_exit(server):
+    trabalhadores = getattr(server, 'trabalhadores_tarefas', None)
+    if trabalhadores is not None and trabalhadores.poll() is None:
+        trabalhadores.terminate()
+        try:
+            trabalhadores.wait(graceful_timeout)
+        except subprocess.TimeoutExpired:
+            trabalhadores.kill()
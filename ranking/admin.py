@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Candidato, ProcessoSeletivo, Criterio, RankingCandidato, AvaliacaoCriterio
+from .models import Candidato, ProcessoSeletivo, Criterio, RankingCandidato, AvaliacaoCriterio, Tarefa
+from .paginacao import PaginadorEstimado
 
 
 class CriterioInline(admin.TabularInline):
@@ -14,12 +15,66 @@ class AvaliacaoCriterioInline(admin.TabularInline):
     model = AvaliacaoCriterio
     extra = 0
     fields = ['criterio', 'nota', 'anotacao']
-    readonly_fields = ['criterio']
     
     def get_queryset(self, request):
-        """Filtra critérios do processo seletivo correto"""
+        """Carrega junto o candidato e o critério usados no __str__ de cada linha"""
         qs = super().get_queryset(request)
-        return qs.select_related('criterio', 'ranking')
+        return qs.select_related('criterio', 'ranking__candidato')
+    
+    def get_formset(self, request, obj=None, **kwargs):
+        """Filtra critérios do processo seletivo correto, consultando as opções uma única vez"""
+        formset = super().get_formset(request, obj, **kwargs)
+        campo = formset.form.base_fields.get('criterio')
+        if campo is not None and obj is not None:
+            campo.queryset = Criterio.objects.filter(
+                processo_seletivo_id=obj.processo_seletivo_id
+            ).select_related('processo_seletivo')
+            # Lista fixa: sem isso cada linha do inline repetiria a consulta do <select>
+            campo.choices = list(campo.choices)
+        return formset
+
+
+class FaixaFilter(admin.SimpleListFilter):
+    """Filtro por faixa de valor (notas de 0 a 10), em vez de uma opção por valor distinto"""
+    campo = None
+    FAIXAS = {
+        '0-4': ('Abaixo de 4', 0, 4),
+        '4-6': ('De 4 a 6', 4, 6),
+        '6-8': ('De 6 a 8', 6, 8),
+        '8-10': ('8 ou mais', 8, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(chave, rotulo) for chave, (rotulo, _, _) in self.FAIXAS.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() in self.FAIXAS:
+            _, minimo, maximo = self.FAIXAS[self.value()]
+            queryset = queryset.filter(**{f'{self.campo}__gte': minimo})
+            if maximo is not None:
+                queryset = queryset.filter(**{f'{self.campo}__lt': maximo})
+        return queryset
+
+
+class FaixaMediaFilter(FaixaFilter):
+    """Filtro da lista de rankings por faixa da média ponderada (usa o índice da coluna armazenada)"""
+    title = 'média ponderada'
+    parameter_name = 'faixa_media'
+    campo = 'media_ponderada'
+
+    def lookups(self, request, model_admin):
+        return super().lookups(request, model_admin) + [('sem', 'Sem avaliações')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'sem':
+            return queryset.filter(media_ponderada__isnull=True)
+        return super().queryset(request, queryset)
+
+
+class FaixaNotaFilter(FaixaFilter):
+    title = 'nota'
+    parameter_name = 'faixa_nota'
+    campo = 'nota'
 
 
 @admin.register(Candidato)
@@ -27,14 +82,14 @@ class CandidatoAdmin(admin.ModelAdmin):
     list_display = ['nome', 'email', 'telefone', 'criado_em']
     list_filter = ['criado_em']
     search_fields = ['nome', 'email', 'telefone']
-    readonly_fields = ['criado_em', 'atualizado_em']
+    readonly_fields = ['arquivo_curriculo', 'criado_em', 'atualizado_em']
     
     fieldsets = (
         ('Informações Básicas', {
             'fields': ('nome', 'email', 'telefone')
         }),
         ('Redes e Documentos', {
-            'fields': ('linkedin', 'curriculo')
+            'fields': ('linkedin', 'curriculo', 'arquivo_curriculo')
         }),
         ('Observações', {
             'fields': ('observacoes',),
@@ -73,7 +128,9 @@ class ProcessoSeletivoAdmin(admin.ModelAdmin):
 class CriterioAdmin(admin.ModelAdmin):
     list_display = ['nome', 'processo_seletivo', 'peso', 'ordem']
     list_filter = ['processo_seletivo']
+    list_select_related = ['processo_seletivo']
     search_fields = ['nome', 'descricao', 'processo_seletivo__titulo']
+    autocomplete_fields = ['processo_seletivo']
     readonly_fields = ['criado_em', 'atualizado_em']
     
     fieldsets = (
@@ -88,13 +145,22 @@ class CriterioAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def delete_queryset(self, request, queryset):
+        """Recalcula as médias dos processos afetados pela exclusão em lote, que não passa por Criterio.delete"""
+        processo_ids = list(queryset.values_list('processo_seletivo_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        RankingCandidato.objects.filter(processo_seletivo_id__in=processo_ids).recalcular_medias()
+        ProcessoSeletivo.invalidar_quadros(processo_ids)
 
 
 @admin.register(RankingCandidato)
 class RankingCandidatoAdmin(admin.ModelAdmin):
     list_display = ['candidato', 'processo_seletivo', 'tier', 'get_media_criterios', 'data_avaliacao']
-    list_filter = ['tier', 'processo_seletivo', 'data_avaliacao']
+    list_filter = ['tier', 'tier_fixado', FaixaMediaFilter, 'processo_seletivo', 'data_avaliacao']
+    list_select_related = ['candidato', 'processo_seletivo']
     search_fields = ['candidato__nome', 'processo_seletivo__titulo', 'observacoes_gerais']
+    autocomplete_fields = ['candidato', 'processo_seletivo']
     readonly_fields = ['criado_em', 'atualizado_em', 'get_media_criterios']
     inlines = [AvaliacaoCriterioInline]
     
@@ -103,7 +169,7 @@ class RankingCandidatoAdmin(admin.ModelAdmin):
             'fields': ('candidato', 'processo_seletivo')
         }),
         ('Avaliação', {
-            'fields': ('tier', 'data_avaliacao', 'get_media_criterios')
+            'fields': ('tier', 'tier_fixado', 'data_avaliacao', 'get_media_criterios')
         }),
         ('Observações', {
             'fields': ('observacoes_gerais',)
@@ -115,17 +181,24 @@ class RankingCandidatoAdmin(admin.ModelAdmin):
     )
     
     def get_media_criterios(self, obj):
-        """Exibe a média dos critérios"""
+        """Exibe a média ponderada armazenada no ranking (sem consultas por linha)"""
         media = obj.calcular_media_criterios()
         return f"{media:.2f}" if media is not None else "Sem avaliações"
     get_media_criterios.short_description = 'Média dos Critérios'
+    get_media_criterios.admin_order_field = 'media_ponderada'
 
 
 @admin.register(AvaliacaoCriterio)
 class AvaliacaoCriterioAdmin(admin.ModelAdmin):
     list_display = ['get_candidato', 'criterio', 'nota', 'get_processo']
-    list_filter = ['criterio__processo_seletivo', 'criterio', 'nota']
+    list_filter = ['criterio__processo_seletivo', FaixaNotaFilter]
+    list_select_related = ['ranking__candidato', 'ranking__processo_seletivo', 'criterio__processo_seletivo']
     search_fields = ['ranking__candidato__nome', 'criterio__nome', 'anotacao']
+    autocomplete_fields = ['ranking', 'criterio']
+    # Tabela com centenas de milhares de linhas: sem COUNT(*) extra na busca
+    # e com a contagem estimada pelo PostgreSQL na lista sem filtros
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     readonly_fields = ['criado_em', 'atualizado_em']
     
     fieldsets = (
@@ -152,3 +225,26 @@ class AvaliacaoCriterioAdmin(admin.ModelAdmin):
         return obj.ranking.processo_seletivo.titulo
     get_processo.short_description = 'Processo Seletivo'
     get_processo.admin_order_field = 'ranking__processo_seletivo__titulo'
+    
+    def delete_queryset(self, request, queryset):
+        """Recalcula as médias armazenadas dos rankings afetados pela exclusão em lote"""
+        ranking_ids = list(queryset.values_list('ranking_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        rankings = RankingCandidato.objects.filter(id__in=ranking_ids)
+        rankings.recalcular_medias()
+        ProcessoSeletivo.invalidar_quadros(rankings.values('processo_seletivo_id'))
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    """Admin das tarefas em segundo plano: acompanhamento e traceback dos erros (somente leitura)"""
+    list_display = ['id', 'tipo', 'processo_seletivo', 'status', 'progresso', 'tentativas', 'criado_em', 'concluido_em']
+    list_filter = ['status', 'tipo']
+    list_select_related = ['processo_seletivo']
+    readonly_fields = [
+        'tipo', 'parametros', 'processo_seletivo', 'status', 'progresso', 'mensagem', 'resultado', 'erro',
+        'tentativas', 'trabalhador', 'criado_em', 'iniciado_em', 'batimento_em', 'concluido_em',
+    ]
+    
+    def has_add_permission(self, request):
+        return False
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class RankingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ranking'
+
+    def ready(self):
+        # Estatísticas materializadas do dashboard (opcional)
+        if getattr(settings, 'RANKING_ESTATISTICAS_MATERIALIZADAS', False):
+            from . import signals  # noqa: F401
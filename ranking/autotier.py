@@ -0,0 +1,186 @@
+"""
+Tier automático a partir da média ponderada.
+
+Três métodos, todos calculados de uma vez sobre o array de médias do
+processo (NumPy):
+
+- ``limiares``: nota mínima de cada tier (S, A, B, C, D); abaixo do último, F;
+- ``quantis``: percentual de candidatos em cada tier, do melhor para o pior
+  (médias empatadas ficam sempre no mesmo tier);
+- ``agrupamento``: quebras naturais por k-means unidimensional (uma
+  aproximação das quebras de Jenks que roda em tempo linear), um grupo por
+  tier.
+
+Os cortes usam todos os candidatos com média, mas só os que não têm o tier
+fixado manualmente (``tier_fixado``) são alterados. Candidatos sem avaliação
+não entram. ``propor_tiers`` só calcula (prévia); ``aplicar_tiers`` grava
+tudo com um único ``bulk_update`` numa transação.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .estatisticas import registrar_avaliacoes, registrar_mudancas_tier
+from .models import ProcessoSeletivo, RankingCandidato
+from .ordenacao import chaves_apos
+
+TIERS = [codigo for codigo, _ in RankingCandidato.TIER_CHOICES]
+
+METODOS = [
+    ('limiares', 'Notas mínimas'),
+    ('quantis', 'Percentual por tier'),
+    ('agrupamento', 'Quebras naturais'),
+]
+
+# Nota mínima de S, A, B, C e D
+LIMIARES_PADRAO = [9, 8, 7, 6, 5]
+
+# Percentual de candidatos em S, A, B, C, D e F
+QUANTIS_PADRAO = [5, 15, 30, 30, 15, 5]
+
+ITERACOES_AGRUPAMENTO = 100
+
+
+def indices_por_limiares(medias, limiares):
+    """Índice do tier (0 = S) de cada média, pela nota mínima de cada tier"""
+    limiares = np.asarray(limiares, dtype=np.float64)
+    if len(limiares) != len(TIERS) - 1 or np.any(np.diff(limiares) > 0):
+        raise ValueError('Informe uma nota mínima para cada tier, de S a D, em ordem decrescente')
+    # Quantos limiares a média não alcança
+    return len(limiares) - np.searchsorted(limiares[::-1], medias, side='right')
+
+
+def indices_por_quantis(medias, percentuais):
+    """Índice do tier de cada média pela fração de candidatos com média maior"""
+    percentuais = np.asarray(percentuais, dtype=np.float64)
+    if len(percentuais) != len(TIERS) or np.any(percentuais < 0) or not percentuais.sum():
+        raise ValueError('Informe um percentual não negativo para cada tier, de S a F')
+    if not len(medias):
+        return np.zeros(0, dtype=np.int64)
+    limites = np.cumsum(percentuais) / percentuais.sum()
+    ordenadas = np.sort(medias)
+    fracao_acima = (len(medias) - np.searchsorted(ordenadas, medias, side='right')) / len(medias)
+    return np.minimum(np.searchsorted(limites, fracao_acima, side='right'), len(TIERS) - 1)
+
+
+def indices_por_agrupamento(medias, grupos=len(TIERS)):
+    """Índice do tier de cada média por k-means 1-D (o grupo de maior centro vira S)"""
+    if not len(medias):
+        return np.zeros(0, dtype=np.int64)
+    # Nunca mais grupos que médias distintas; centros iniciais espalhados pelos
+    # quantis dos valores distintos (sem centros repetidos), para o resultado ser determinístico
+    distintas = np.unique(medias)
+    grupos = min(grupos, len(distintas))
+    centros = np.quantile(distintas, (np.arange(grupos) + 0.5) / grupos)
+    for _ in range(ITERACOES_AGRUPAMENTO):
+        grupo = np.searchsorted((centros[:-1] + centros[1:]) / 2, medias)
+        tamanhos = np.bincount(grupo, minlength=grupos)
+        somas = np.bincount(grupo, weights=medias, minlength=grupos)
+        novos = np.where(tamanhos > 0, somas / np.maximum(tamanhos, 1), centros)
+        novos.sort()
+        if np.allclose(novos, centros):
+            break
+        centros = novos
+    grupo = np.searchsorted((centros[:-1] + centros[1:]) / 2, medias)
+    # Tier pela posição do centro entre os grupos ocupados: o de maior centro é sempre S
+    ocupados = np.unique(grupo)
+    return len(ocupados) - 1 - np.searchsorted(ocupados, grupo)
+
+
+def calcular_indices(medias, metodo, parametros=None):
+    """Aplica o ``metodo`` às médias; ``parametros`` são os limiares ou percentuais (padrões se None)"""
+    if metodo == 'limiares':
+        return indices_por_limiares(medias, parametros or LIMIARES_PADRAO)
+    if metodo == 'quantis':
+        return indices_por_quantis(medias, parametros or QUANTIS_PADRAO)
+    if metodo == 'agrupamento':
+        return indices_por_agrupamento(medias)
+    raise ValueError(f'Método inválido: {metodo}')
+
+
+class Proposta:
+    """Resultado do tier automático: as mudanças e os totais para a prévia"""
+
+    def __init__(self, linhas, novos_tiers, incluir_fixados):
+        # (ranking_id, tier_atual, tier_novo, media, data_avaliacao) de quem muda de tier
+        self.mudancas = []
+        self.fixados = 0
+        self.por_tier = {tier: 0 for tier in TIERS}
+        for (ranking_id, tier, fixado, media, data_avaliacao), novo in zip(linhas, novos_tiers):
+            if fixado and not incluir_fixados:
+                self.fixados += 1
+                novo = tier
+            elif novo != tier:
+                self.mudancas.append((ranking_id, tier, novo, media, data_avaliacao))
+            if novo:
+                self.por_tier[novo] += 1
+        self.avaliados = len(linhas)
+
+    def resumo(self):
+        """Pares (tier, quantidade) na ordem do quadro"""
+        return list(self.por_tier.items())
+
+
+def _linhas(processo, travar=False):
+    rankings = RankingCandidato.objects.filter(processo_seletivo=processo, media_ponderada__isnull=False)
+    if travar:
+        rankings = rankings.select_for_update()
+    return list(rankings.order_by('id').values_list('id', 'tier', 'tier_fixado', 'media_ponderada', 'data_avaliacao'))
+
+
+def _propor(linhas, metodo, parametros, incluir_fixados):
+    medias = np.array([float(linha[3]) for linha in linhas], dtype=np.float64)
+    indices = calcular_indices(medias, metodo, parametros)
+    return Proposta(linhas, [TIERS[indice] for indice in indices.tolist()], incluir_fixados)
+
+
+def propor_tiers(processo, metodo, parametros=None, incluir_fixados=False):
+    """Calcula (sem gravar) os tiers que o método atribuiria; uma consulta"""
+    return _propor(_linhas(processo), metodo, parametros, incluir_fixados)
+
+
+def aplicar_tiers(processo, metodo, parametros=None, incluir_fixados=False):
+    """Calcula e grava os novos tiers com um único bulk_update; retorna a Proposta aplicada
+
+    Os cards que mudam de tier vão para o fim da coluna de destino, da
+    maior para a menor média. Com ``incluir_fixados``, os candidatos fixados
+    também são recalculados (e, se mudarem de tier, deixam de ser fixados).
+    """
+    with transaction.atomic():
+        proposta = _propor(_linhas(processo, travar=True), metodo, parametros, incluir_fixados)
+        if not proposta.mudancas:
+            return proposta
+
+        # Fim atual de cada coluna (os cards que vão sair dela não atrapalham: só empurram as chaves)
+        ultimas = dict(
+            RankingCandidato.objects.filter(
+                processo_seletivo=processo, tier__isnull=False
+            ).order_by().values_list('tier').annotate(ultima=Max('ordem'))
+        )
+        por_destino = {}
+        for mudanca in sorted(proposta.mudancas, key=lambda mudanca: (-mudanca[3], mudanca[0])):
+            por_destino.setdefault(mudanca[2], []).append(mudanca)
+
+        agora = timezone.now()
+        alterados = []
+        for tier, grupo in por_destino.items():
+            chaves = chaves_apos(ultimas.get(tier), len(grupo))
+            for (ranking_id, _, _, _, data_avaliacao), chave in zip(grupo, chaves):
+                alterados.append(RankingCandidato(
+                    id=ranking_id,
+                    tier=tier,
+                    ordem=chave,
+                    tier_fixado=False,
+                    data_avaliacao=data_avaliacao or agora,
+                ))
+        RankingCandidato.objects.bulk_update(
+            alterados, ['tier', 'ordem', 'tier_fixado', 'data_avaliacao'], batch_size=1000
+        )
+        ProcessoSeletivo.incrementar_versao_quadro(processo.id)
+
+        # bulk_update não dispara sinais: ajustar as estatísticas aqui
+        registrar_mudancas_tier((tier, novo) for _, tier, novo, _, _ in proposta.mudancas)
+        registrar_avaliacoes(agora, sum(1 for *_, data_avaliacao in proposta.mudancas if data_avaliacao is None))
+
+    return proposta
@@ -0,0 +1,213 @@
+"""
+Dados sintéticos e benchmark de ponta a ponta das views do ranking.
+
+``semear`` cria processos, candidatos, critérios e avaliações com
+``bulk_create`` (usado pelo comando ``seed_benchmark``). ``executar_benchmark``
+semeia um processo por tamanho pedido e mede cada view pelo test client do
+Django: tempo total (mediana), número de consultas, tempo de SQL e tamanho
+da resposta (usado pelo comando ``benchmark_views``, que roda num banco de
+teste descartável).
+"""
+import random
+import statistics
+import string
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .busca import indexar_candidatos
+from .estatisticas import materializadas, reconstruir_estatisticas
+from .models import ProcessoSeletivo, Candidato, RankingCandidato, Criterio, AvaliacaoCriterio
+from .ordenacao import chaves_distribuidas
+
+TAMANHO_LOTE = 2000
+
+
+def semear(processos=1, candidatos=100, criterios=5, densidade=0.7, fracao_ranqueada=0.6, semente=None):
+    """Cria ``processos`` processos com ``candidatos`` candidatos e ``criterios`` critérios cada
+
+    ``densidade`` é a fração de pares (candidato, critério) avaliados e
+    ``fracao_ranqueada`` a fração de candidatos já com tier. Retorna os IDs
+    dos processos criados.
+    """
+    aleatorio = random.Random(semente)
+    prefixo = ''.join(aleatorio.choices(string.ascii_lowercase + string.digits, k=8))
+    tiers = [codigo for codigo, _ in RankingCandidato.TIER_CHOICES]
+    agora = timezone.now()
+
+    processo_ids = []
+    for indice_processo in range(processos):
+        processo = ProcessoSeletivo.objects.create(
+            titulo=f'Benchmark {prefixo} #{indice_processo + 1}',
+            descricao='Processo gerado pelo seed_benchmark',
+            vaga='Desenvolvedor(a)',
+            departamento='Tecnologia',
+            status=aleatorio.choice(['aberto', 'em_andamento', 'finalizado']),
+            data_inicio=date.today() - timedelta(days=aleatorio.randint(0, 365)),
+        )
+        processo_ids.append(processo.id)
+
+        Criterio.objects.bulk_create([
+            Criterio(
+                processo_seletivo=processo,
+                nome=f'Critério {i + 1}',
+                peso=aleatorio.choice([1, 1, 1.5, 2, 3]),
+                ordem=i,
+            )
+            for i in range(criterios)
+        ])
+        criterio_ids = list(
+            Criterio.objects.filter(processo_seletivo=processo).order_by('ordem').values_list('id', flat=True)
+        )
+
+        for inicio in range(0, candidatos, TAMANHO_LOTE):
+            quantidade = min(TAMANHO_LOTE, candidatos - inicio)
+            emails = [
+                f'bench-{prefixo}-{processo.id}-{inicio + i}@exemplo.com' for i in range(quantidade)
+            ]
+            Candidato.objects.bulk_create([
+                Candidato(
+                    nome=f'Candidato {inicio + i + 1} ({prefixo})',
+                    email=email,
+                    telefone=f'+55119{aleatorio.randint(10000000, 99999999)}',
+                )
+                for i, email in enumerate(emails)
+            ])
+            candidato_ids = list(Candidato.objects.filter(email__in=emails).values_list('id', flat=True))
+
+            novos = []
+            for candidato_id in candidato_ids:
+                tier = aleatorio.choice(tiers) if aleatorio.random() < fracao_ranqueada else None
+                novos.append(RankingCandidato(
+                    candidato_id=candidato_id,
+                    processo_seletivo=processo,
+                    tier=tier,
+                    data_avaliacao=agora - timedelta(days=aleatorio.randint(0, 30)) if tier else None,
+                ))
+            RankingCandidato.objects.bulk_create(novos)
+
+        # Chaves de ordenação espaçadas dentro de cada tier
+        rankings = list(
+            RankingCandidato.objects.filter(processo_seletivo=processo).order_by('tier', 'id').only('id', 'tier')
+        )
+        por_tier = {}
+        for ranking in rankings:
+            por_tier.setdefault(ranking.tier, []).append(ranking)
+        for grupo in por_tier.values():
+            for ranking, chave in zip(grupo, chaves_distribuidas(len(grupo))):
+                ranking.ordem = chave
+        RankingCandidato.objects.bulk_update(rankings, ['ordem'], batch_size=TAMANHO_LOTE)
+
+        avaliacoes = []
+        for ranking in rankings:
+            for criterio_id in criterio_ids:
+                if aleatorio.random() < densidade:
+                    avaliacoes.append(AvaliacaoCriterio(
+                        ranking_id=ranking.id,
+                        criterio_id=criterio_id,
+                        nota=aleatorio.randint(0, 20) / 2,
+                    ))
+            if len(avaliacoes) >= TAMANHO_LOTE:
+                AvaliacaoCriterio.objects.bulk_create(avaliacoes)
+                avaliacoes = []
+        AvaliacaoCriterio.objects.bulk_create(avaliacoes)
+
+    # bulk_create não passa pelos saves: recalcular médias, quadros e estatísticas
+    RankingCandidato.objects.filter(processo_seletivo_id__in=processo_ids).recalcular_medias()
+    ProcessoSeletivo.invalidar_quadros(processo_ids)
+    indexar_candidatos(
+        RankingCandidato.objects.filter(processo_seletivo_id__in=processo_ids).values_list('candidato_id', flat=True)
+    )
+    if materializadas():
+        reconstruir_estatisticas()
+
+    return processo_ids
+
+
+def _medir(cliente, metodo, url, dados=None, repeticoes=5, preparar=None):
+    """Executa a requisição ``repeticoes`` vezes e devolve a mediana do tempo e os números da última"""
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            response = getattr(cliente, metodo)(url, dados or {})
+            if response.streaming:
+                tamanho = sum(len(pedaco) for pedaco in response.streaming_content)
+            else:
+                tamanho = len(response.content)
+            tempos.append(time.perf_counter() - inicio)
+
+    return {
+        'status': response.status_code,
+        'tempo_ms': round(statistics.median(tempos) * 1000, 2),
+        'consultas': len(consultas),
+        'tempo_sql_ms': round(sum(float(consulta['time']) for consulta in consultas) * 1000, 2),
+        'bytes': tamanho,
+    }
+
+
+def _cenarios(processo_id):
+    """Requisições medidas para um processo semeado: (nome, método, url, dados, preparar)"""
+    rankings = RankingCandidato.objects.filter(processo_seletivo_id=processo_id)
+    ranking = rankings.order_by('id').first()
+    criterio = Criterio.objects.filter(processo_seletivo_id=processo_id).order_by('ordem').first()
+    tier_cheio = rankings.exclude(tier__isnull=True).values_list('tier', flat=True).order_by('tier').first() or 'S'
+
+    cenarios = [
+        ('processos_list', 'get', reverse('processos_list'), None, None),
+        ('dashboard', 'get', reverse('dashboard'), None, None),
+        ('processo_ranking_frio', 'get', reverse('processo_ranking', args=[processo_id]), None, cache.clear),
+        ('processo_ranking', 'get', reverse('processo_ranking', args=[processo_id]), None, None),
+        ('tier_cards', 'get', reverse('tier_cards', args=[processo_id, tier_cheio]), None, None),
+        ('avaliar_candidato_modal', 'get', reverse('avaliar_candidato_modal', args=[ranking.id]), None, None),
+        ('update_ranking_tier', 'post', reverse('update_ranking_tier', args=[ranking.id]), {'tier': 'A'}, None),
+        ('exportar_ranking', 'get', reverse('exportar_ranking', args=[processo_id]), None, None),
+    ]
+    if criterio:
+        cenarios.append((
+            'salvar_avaliacao', 'post',
+            reverse('salvar_avaliacao', args=[ranking.id, criterio.id]), {'nota': '7.5'}, None,
+        ))
+    return cenarios
+
+
+def executar_benchmark(tamanhos=(100, 1000, 10000), criterios=8, densidade=0.7, repeticoes=5, semente=42,
+                       progresso=None):
+    """Semeia um processo por tamanho e mede cada view; retorna um dict serializável em JSON"""
+    cliente = Client()
+    resultados = {}
+
+    for tamanho in tamanhos:
+        inicio = time.perf_counter()
+        (processo_id,) = semear(
+            processos=1, candidatos=tamanho, criterios=criterios, densidade=densidade, semente=semente,
+        )
+        if progresso:
+            progresso(f'{tamanho} candidatos semeados em {time.perf_counter() - inicio:.1f}s')
+
+        resultados[str(tamanho)] = {
+            nome: _medir(cliente, metodo, url, dados, repeticoes, preparar)
+            for nome, metodo, url, dados, preparar in _cenarios(processo_id)
+        }
+        if progresso:
+            progresso(f'{tamanho} candidatos medidos')
+
+    return {
+        'parametros': {
+            'tamanhos': list(tamanhos),
+            'criterios': criterios,
+            'densidade': densidade,
+            'repeticoes': repeticoes,
+            'semente': semente,
+            'banco': connection.vendor,
+        },
+        'resultados': resultados,
+    }
@@ -0,0 +1,203 @@
+"""
+Busca textual de candidatos em todos os processos.
+
+Cada candidato tem uma linha em ``BuscaCandidato`` com o texto buscável já
+normalizado (minúsculas, sem acentos): nome, contatos (e-mail e telefone,
+também quebrados em partes), observações (do candidato e as observações
+gerais de cada processo), as anotações das avaliações e o texto extraído do
+currículo (ver ranking/curriculos.py). A linha é regravada pelos
+``save``/``delete`` dos models envolvidos; escritas em lote (importação,
+seed, extração dos currículos) chamam ``indexar_candidatos`` diretamente, e
+o comando ``reindexar_busca`` reconstrói tudo.
+
+O índice é do próprio banco (criado pelas migrações 0010 e 0011):
+
+- PostgreSQL: coluna ``vetor`` (tsvector gerado, pesos A-D por campo) com
+  índice GIN, mais um índice de trigramas (``pg_trgm``) no nome, para achar
+  nomes digitados com erro. A relevância é ``ts_rank_cd`` + similaridade do
+  nome;
+- SQLite: tabela FTS5 ``ranking_buscacandidato_fts`` mantida por triggers,
+  com relevância BM25 (os mesmos pesos por campo);
+- outros bancos: ``icontains`` sem índice, ordenado pelo ID.
+
+Os dois índices usam a configuração ``simple`` (sem stemming) e casam cada
+termo da consulta como prefixo, então se comportam igual nos dois bancos. Os
+resultados vêm paginados por cursor (relevância, ID), como o resto do app.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import AvaliacaoCriterio, BuscaCandidato, Candidato, RankingCandidato
+from .paginacao import codificar_cursor
+
+RESULTADOS_POR_PAGINA = 20
+
+# Termos considerados de uma consulta (o resto é ignorado)
+MAXIMO_TERMOS = 8
+
+TAMANHO_LOTE = 1000
+
+# Similaridade mínima de trigramas para um nome casar sem casar o texto (PostgreSQL)
+SIMILARIDADE_MINIMA = 0.3
+
+
+def normalizar(texto):
+    """Texto em minúsculas e sem acentos, como fica gravado no índice"""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(caractere for caractere in texto if not unicodedata.combining(caractere))
+
+
+def termos(consulta):
+    """Palavras normalizadas da consulta, no máximo ``MAXIMO_TERMOS``"""
+    return re.findall(r'\w+', normalizar(consulta))[:MAXIMO_TERMOS]
+
+
+def _contatos(email, telefone):
+    # O e-mail inteiro e as partes ("maria.silva@x.com" acha "silva"); o telefone também só com dígitos
+    telefone = telefone or ''
+    return ' '.join([email, re.sub(r'\W+', ' ', email), telefone, re.sub(r'\D+', '', telefone)])
+
+
+def indexar_candidatos(candidato_ids):
+    """Regrava a linha de busca dos candidatos: 3 consultas e um upsert por lote"""
+    candidato_ids = list(candidato_ids)
+    for inicio in range(0, len(candidato_ids), TAMANHO_LOTE):
+        lote = candidato_ids[inicio:inicio + TAMANHO_LOTE]
+
+        observacoes = {}
+        for candidato_id, texto in RankingCandidato.objects.filter(
+            candidato_id__in=lote, observacoes_gerais__gt=''
+        ).order_by('id').values_list('candidato_id', 'observacoes_gerais'):
+            observacoes.setdefault(candidato_id, []).append(texto)
+        anotacoes = {}
+        for candidato_id, texto in AvaliacaoCriterio.objects.filter(
+            ranking__candidato_id__in=lote, anotacao__gt=''
+        ).order_by('id').values_list('ranking__candidato_id', 'anotacao'):
+            anotacoes.setdefault(candidato_id, []).append(texto)
+
+        linhas = [
+            BuscaCandidato(
+                candidato_id=candidato_id,
+                nome=normalizar(nome),
+                contatos=normalizar(_contatos(email, telefone)),
+                observacoes=normalizar('\n'.join([texto or ''] + observacoes.get(candidato_id, []))),
+                anotacoes=normalizar('\n'.join(anotacoes.get(candidato_id, []))),
+                curriculo=normalizar(curriculo),
+            )
+            for candidato_id, nome, email, telefone, texto, curriculo in Candidato.objects.filter(
+                id__in=lote
+            ).order_by().values_list('id', 'nome', 'email', 'telefone', 'observacoes', 'arquivo_curriculo__texto')
+        ]
+        BuscaCandidato.objects.bulk_create(
+            linhas,
+            update_conflicts=True,
+            unique_fields=['candidato'],
+            update_fields=['nome', 'contatos', 'observacoes', 'anotacoes', 'curriculo'],
+        )
+
+
+def reindexar_tudo():
+    """Reconstrói o índice de todos os candidatos; retorna quantos foram indexados"""
+    candidato_ids = list(Candidato.objects.order_by('id').values_list('id', flat=True))
+    indexar_candidatos(candidato_ids)
+    return len(candidato_ids)
+
+
+def _ids_postgres(palavras, cursor, quantidade):
+    consulta = ' & '.join(f'{palavra}:*' for palavra in palavras)
+    nome = ' '.join(palavras)
+    sql = """
+        SELECT candidato_id, relevancia FROM (
+            SELECT candidato_id,
+                   (ts_rank_cd(vetor, consulta, 32) + similarity(nome, %s))::float8 AS relevancia
+            FROM ranking_buscacandidato, to_tsquery('simple', %s) AS consulta
+            WHERE vetor @@ consulta OR (nome %% %s AND similarity(nome, %s) >= %s)
+        ) AS resultados
+    """
+    parametros = [nome, consulta, nome, nome, SIMILARIDADE_MINIMA]
+    return _paginar(sql, parametros, cursor, quantidade)
+
+
+def _ids_sqlite(palavras, cursor, quantidade):
+    # bm25 é menor para os mais relevantes: o sinal é invertido para ordenar como no PostgreSQL
+    sql = """
+        SELECT candidato_id, relevancia FROM (
+            SELECT rowid AS candidato_id,
+                   -bm25(ranking_buscacandidato_fts, 10.0, 5.0, 2.0, 1.0, 1.0) AS relevancia
+            FROM ranking_buscacandidato_fts
+            WHERE ranking_buscacandidato_fts MATCH %s
+        ) AS resultados
+    """
+    return _paginar(sql, [' '.join(f'"{palavra}"*' for palavra in palavras)], cursor, quantidade)
+
+
+def _paginar(sql, parametros, cursor, quantidade):
+    if cursor:
+        sql += ' WHERE relevancia < %s OR (relevancia = %s AND candidato_id > %s)'
+        parametros = parametros + [cursor[0], cursor[0], cursor[1]]
+    sql += ' ORDER BY relevancia DESC, candidato_id LIMIT %s'
+    with connection.cursor() as cursor_banco:
+        cursor_banco.execute(sql, parametros + [quantidade])
+        return cursor_banco.fetchall()
+
+
+def _ids_generico(palavras, cursor, quantidade):
+    filtro = Q()
+    for palavra in palavras:
+        filtro &= (
+            Q(nome__icontains=palavra) | Q(contatos__icontains=palavra)
+            | Q(observacoes__icontains=palavra) | Q(anotacoes__icontains=palavra)
+            | Q(curriculo__icontains=palavra)
+        )
+    linhas = BuscaCandidato.objects.filter(filtro)
+    if cursor:
+        linhas = linhas.filter(candidato_id__gt=cursor[1])
+    return [(candidato_id, 0.0) for candidato_id in linhas.order_by('candidato_id').values_list(
+        'candidato_id', flat=True
+    )[:quantidade]]
+
+
+def buscar(consulta, cursor=None, tamanho=RESULTADOS_POR_PAGINA):
+    """Uma página de candidatos que casam com ``consulta``, do mais relevante para o menos
+
+    ``cursor`` é o par (relevância, ID) decodificado da página anterior.
+    Retorna os candidatos (cada um com ``relevancia`` e ``rankings_busca``,
+    os rankings com o processo) e o cursor da próxima página (ou None).
+    São 3 consultas por página: os IDs no índice, os candidatos e os rankings.
+    """
+    palavras = termos(consulta)
+    if not palavras:
+        return [], None
+
+    ids_por_banco = {'postgresql': _ids_postgres, 'sqlite': _ids_sqlite}
+    linhas = ids_por_banco.get(connection.vendor, _ids_generico)(palavras, cursor, tamanho + 1)
+    tem_mais = len(linhas) > tamanho
+    linhas = linhas[:tamanho]
+
+    candidatos = Candidato.objects.in_bulk([candidato_id for candidato_id, _ in linhas])
+    rankings = {}
+    for ranking in RankingCandidato.objects.filter(candidato_id__in=candidatos).select_related(
+        'processo_seletivo'
+    ).only(
+        'candidato_id', 'tier', 'media_ponderada', 'processo_seletivo__titulo', 'processo_seletivo__status'
+    ).order_by('-processo_seletivo__criado_em', 'id'):
+        rankings.setdefault(ranking.candidato_id, []).append(ranking)
+
+    resultados = []
+    for candidato_id, relevancia in linhas:
+        # Candidato apagado entre a leitura do índice e a dos candidatos
+        if candidato_id not in candidatos:
+            continue
+        candidato = candidatos[candidato_id]
+        candidato.relevancia = relevancia
+        candidato.rankings_busca = rankings.get(candidato_id, [])
+        resultados.append(candidato)
+
+    proximo_cursor = None
+    if tem_mais:
+        candidato_id, relevancia = linhas[-1]
+        proximo_cursor = codificar_cursor(relevancia, candidato_id)
+    return resultados, proximo_cursor
@@ -0,0 +1,106 @@
+"""
+Cache versionado do quadro de ranking.
+
+Cada ProcessoSeletivo tem um ``versao_quadro`` que todo escritor incrementa
+(movimentos de tier, avaliações, candidatos e critérios). O quadro calculado
+e o HTML renderizado ficam no cache sob uma chave que inclui essa versão, de
+modo que abrir o mesmo quadro repetidamente custa uma consulta ao cache, e
+qualquer escrita invalida as entradas antigas sem precisar apagá-las.
+
+O backend é o do alias ``RANKING_CACHE_ALIAS`` (padrão ``default``), que pode
+apontar para memória local, arquivo ou um backend compartilhado (Redis,
+Memcached, banco) via ``CACHES`` nas settings.
+
+A mesma versão serve de validador HTTP (``condicional``): a página do quadro
+e os modais respondem com um ETag derivado dela e, quando o navegador (ou o
+HTMX) repete o pedido com ``If-None-Match`` e nada mudou, recebem ``304 Not
+Modified`` depois de uma única consulta, sem montar contexto nem renderizar.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def _cache():
+    return caches[getattr(settings, 'RANKING_CACHE_ALIAS', 'default')]
+
+
+def chave_quadro(processo):
+    """Chave do quadro para a versão atual do processo"""
+    return f'ranking:quadro:{processo.id}:v{processo.versao_quadro}'
+
+
+def chave_matriz(processo):
+    """Chave da matriz de notas (simulação de pesos) para a versão atual do processo"""
+    return f'ranking:matriz:{processo.id}:v{processo.versao_quadro}'
+
+
+def _obter(chave, construir, processo):
+    cache = _cache()
+
+    valor = cache.get(chave)
+    if valor is None:
+        valor = construir(processo)
+        cache.set(chave, valor, getattr(settings, 'RANKING_CACHE_TIMEOUT', 3600))
+    return valor
+
+
+def obter_quadro(processo, construir):
+    """Retorna o quadro cacheado da versão atual, construindo-o com ``construir(processo)`` se preciso"""
+    return _obter(chave_quadro(processo), construir, processo)
+
+
+async def aobter_quadro(processo, construir):
+    """Versão assíncrona de ``obter_quadro``: cache via API async e ``construir`` numa thread"""
+    cache = _cache()
+    chave = chave_quadro(processo)
+
+    quadro = await cache.aget(chave)
+    if quadro is None:
+        quadro = await sync_to_async(construir)(processo)
+        await cache.aset(chave, quadro, getattr(settings, 'RANKING_CACHE_TIMEOUT', 3600))
+    return quadro
+
+
+def obter_matriz(processo, construir):
+    """Retorna a matriz de notas cacheada da versão atual, construindo-a com ``construir(processo)`` se preciso"""
+    return _obter(chave_matriz(processo), construir, processo)
+
+
+def etag(request, *partes):
+    """ETag das ``partes`` (versões, datas) e do segredo CSRF da requisição
+
+    As páginas embutem o token CSRF: com outro segredo (nova sessão, login),
+    a cópia guardada pelo navegador não serve mais.
+    """
+    bruto = ':'.join(str(parte) for parte in partes + (request.META.get('CSRF_COOKIE', ''),))
+    return hashlib.sha256(bruto.encode()).hexdigest()[:32]
+
+
+def condicional(calcular_etag):
+    """``condition`` do Django para views assíncronas, com o ETag calculado por ``await calcular_etag(...)``
+
+    O ``condition`` chama a função de ETag fora de uma thread, onde o ORM
+    síncrono não pode ser usado; o valor é calculado antes, com o ORM
+    assíncrono, e entregue a ele pela requisição. ``calcular_etag`` retorna
+    None quando o recurso não existe (a view segue e responde 404). A
+    resposta sai com ``Cache-Control: private, no-cache``: o navegador guarda
+    a cópia, mas sempre a revalida.
+    """
+    def decorador(view):
+        view_condicional = condition(etag_func=lambda request, *args, **kwargs: request.etag_ranking)(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            request.etag_ranking = await calcular_etag(request, *args, **kwargs)
+            response = await view_condicional(request, *args, **kwargs)
+            if request.etag_ranking is not None:
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorador
@@ -0,0 +1,249 @@
+"""
+Currículos: upload em streaming, armazenamento por conteúdo e extração de texto.
+
+O upload passa por ``CurriculoUploadHandler``, que recebe o arquivo em
+blocos, calcula o SHA-256 enquanto grava num arquivo temporário e recusa o
+envio assim que ele passa de ``RANKING_CURRICULOS_MAX_MB`` ou quando os
+primeiros bytes não são de um PDF, DOCX ou DOC, sem nunca manter o arquivo
+inteiro em memória.
+
+``armazenar`` grava o conteúdo em ``curriculos/sha256/<ab>/<hash>.<ext>``
+(movendo o temporário, sem reler o arquivo) e registra um
+``ArquivoCurriculo``; se o mesmo conteúdo já existe, reaproveita o registro
+e descarta o temporário. Vários candidatos podem apontar para o mesmo
+arquivo.
+
+A extração do texto roda num pool de threads do próprio processo
+(``RANKING_CURRICULOS_WORKERS``), agendada para depois do commit: a
+requisição responde sem esperar. O texto vai para ``ArquivoCurriculo.texto``
+e para o índice de busca dos candidatos que usam o arquivo. PDF requer o
+pacote pypdf; DOCX é lido com a biblioteca padrão; DOC (formato binário
+antigo) fica como ``indisponivel``.
+"""
+import hashlib
+import logging
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import IntegrityError, close_old_connections, connections, transaction
+
+from .busca import indexar_candidatos
+from .models import ArquivoCurriculo, Candidato
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - dependência opcional
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Extensão aceita -> (assinatura dos primeiros bytes, content type gravado)
+TIPOS = {
+    'pdf': (b'%PDF-', 'application/pdf'),
+    'docx': (b'PK\x03\x04', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+}
+
+# Texto extraído guardado por arquivo (o resto é descartado)
+LIMITE_TEXTO = 200000
+
+_NS_DOCX = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def tamanho_maximo():
+    return getattr(settings, 'RANKING_CURRICULOS_MAX_MB', 10) * 1024 * 1024
+
+
+def pdf_disponivel():
+    return PdfReader is not None
+
+
+class CurriculoUploadHandler(FileUploadHandler):
+    """Grava o arquivo enviado em disco bloco a bloco, calculando o SHA-256 e validando tamanho e tipo
+
+    O arquivo resultante (``TemporaryUploadedFile``) ganha os atributos
+    ``sha256`` e ``tipo``. Um envio recusado não aparece em
+    ``request.FILES`` e o motivo fica em ``erro``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.erro = None
+        self.arquivo = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.tipo = os.path.splitext(self.file_name or '')[1].lower().lstrip('.')
+        if self.tipo not in TIPOS:
+            self._recusar('Envie o currículo em PDF, DOC ou DOCX.')
+        self.hash = hashlib.sha256()
+        self.recebidos = 0
+        self.inicio = b''
+        self.arquivo = TemporaryUploadedFile(self.file_name, TIPOS[self.tipo][1], 0, None)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.recebidos += len(raw_data)
+        if self.recebidos > tamanho_maximo():
+            self._recusar(f'O currículo deve ter no máximo {tamanho_maximo() // (1024 * 1024)} MB.')
+        assinatura = TIPOS[self.tipo][0]
+        if len(self.inicio) < len(assinatura):
+            self.inicio += raw_data[:len(assinatura)]
+            if not self.inicio.startswith(assinatura[:len(self.inicio)]):
+                self._recusar('O conteúdo do arquivo não corresponde à extensão.')
+        self.hash.update(raw_data)
+        self.arquivo.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.recebidos:
+            # Aqui o SkipFile não é tratado pelo parser: só descartar
+            self.erro = 'O arquivo enviado está vazio.'
+            self._descartar()
+            return None
+        self.arquivo.seek(0)
+        self.arquivo.size = file_size
+        self.arquivo.sha256 = self.hash.hexdigest()
+        self.arquivo.tipo = self.tipo
+        return self.arquivo
+
+    def upload_interrupted(self):
+        self._descartar()
+
+    def _recusar(self, erro):
+        self.erro = erro
+        self._descartar()
+        raise SkipFile(erro)
+
+    def _descartar(self):
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+
+
+def caminho_por_conteudo(sha256, tipo):
+    return f'curriculos/sha256/{sha256[:2]}/{sha256}.{tipo}'
+
+
+def armazenar(enviado):
+    """Grava (ou reaproveita, pelo SHA-256) o arquivo enviado; retorna (ArquivoCurriculo, criado)"""
+    existente = ArquivoCurriculo.objects.filter(sha256=enviado.sha256).first()
+    if existente:
+        return existente, False
+
+    caminho = caminho_por_conteudo(enviado.sha256, enviado.tipo)
+    # Arquivo já em disco sem registro (gravação interrompida): mesmo conteúdo, basta registrar
+    if not default_storage.exists(caminho):
+        caminho = default_storage.save(caminho, enviado)
+    try:
+        with transaction.atomic():
+            arquivo = ArquivoCurriculo.objects.create(
+                sha256=enviado.sha256,
+                arquivo=caminho,
+                nome_original=enviado.name[:255],
+                tipo=enviado.tipo,
+                tamanho=enviado.size,
+            )
+    except IntegrityError:
+        # Outro envio do mesmo conteúdo registrou primeiro
+        return ArquivoCurriculo.objects.get(sha256=enviado.sha256), False
+    agendar_extracao(arquivo.id)
+    return arquivo, True
+
+
+def anexar(candidato, enviado):
+    """Associa o currículo enviado ao candidato e libera o arquivo anterior se ninguém mais o usa"""
+    # Numa transação: a extração (agendada para o commit) já encontra o candidato ligado ao arquivo
+    with transaction.atomic():
+        arquivo, criado = armazenar(enviado)
+        anterior_id = candidato.arquivo_curriculo_id
+        candidato.arquivo_curriculo = arquivo
+        candidato.curriculo.name = arquivo.arquivo.name
+        candidato.save(update_fields=['arquivo_curriculo', 'curriculo', 'atualizado_em'])
+        if anterior_id and anterior_id != arquivo.id:
+            liberar(anterior_id)
+    return arquivo, criado
+
+
+def liberar(arquivo_id):
+    """Remove o arquivo (registro e conteúdo) se nenhum candidato aponta mais para ele"""
+    arquivo = ArquivoCurriculo.objects.filter(id=arquivo_id, candidatos__isnull=True).first()
+    if arquivo is None:
+        return
+    nome = arquivo.arquivo.name
+    arquivo.delete()
+    transaction.on_commit(lambda: default_storage.delete(nome))
+
+
+def _texto_pdf(conteudo):
+    return '\n'.join(pagina.extract_text() or '' for pagina in PdfReader(conteudo).pages)
+
+
+def _texto_docx(conteudo):
+    with zipfile.ZipFile(conteudo) as pacote:
+        documento = ElementTree.fromstring(pacote.read('word/document.xml'))
+    return '\n'.join(
+        ''.join(texto.text or '' for texto in paragrafo.iter(f'{_NS_DOCX}t'))
+        for paragrafo in documento.iter(f'{_NS_DOCX}p')
+    )
+
+
+def extrair_texto(arquivo_id):
+    """Extrai o texto do arquivo, grava e reindexa os candidatos que o usam"""
+    arquivo = ArquivoCurriculo.objects.filter(id=arquivo_id).first()
+    if arquivo is None:
+        return
+    leitores = {'docx': _texto_docx}
+    if pdf_disponivel():
+        leitores['pdf'] = _texto_pdf
+    leitor = leitores.get(arquivo.tipo)
+
+    texto = ''
+    if leitor is None:
+        extracao = 'indisponivel'
+    else:
+        try:
+            with arquivo.arquivo.open('rb') as conteudo:
+                texto = re.sub(r'\s+', ' ', leitor(conteudo)).strip()[:LIMITE_TEXTO]
+            extracao = 'concluida'
+        except Exception:
+            logger.exception('Falha ao extrair o texto do currículo %s', arquivo.sha256)
+            extracao = 'erro'
+
+    with transaction.atomic():
+        ArquivoCurriculo.objects.filter(id=arquivo.id).update(texto=texto, extracao=extracao)
+        indexar_candidatos(Candidato.objects.filter(arquivo_curriculo=arquivo).values_list('id', flat=True))
+
+
+def _extrair_em_thread(arquivo_id):
+    # A thread do pool tem conexões próprias: fechar ao terminar, para não acumular
+    close_old_connections()
+    try:
+        extrair_texto(arquivo_id)
+    except Exception:
+        logger.exception('Falha na extração do currículo %s', arquivo_id)
+    finally:
+        connections.close_all()
+
+
+@lru_cache(maxsize=None)
+def obter_pool():
+    """Pool de threads (único por processo) que extrai o texto dos currículos"""
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, 'RANKING_CURRICULOS_WORKERS', 2),
+        thread_name_prefix='ranking-curriculos',
+    )
+
+
+def agendar_extracao(arquivo_id):
+    """Extrai o texto depois do commit, no pool; com ``RANKING_CURRICULOS_WORKERS=0``, na própria thread"""
+    if getattr(settings, 'RANKING_CURRICULOS_WORKERS', 2) > 0:
+        transaction.on_commit(lambda: obter_pool().submit(_extrair_em_thread, arquivo_id))
+    else:
+        transaction.on_commit(lambda: extrair_texto(arquivo_id))
@@ -0,0 +1,185 @@
+"""
+Estatísticas do dashboard.
+
+``calcular_estatisticas`` conta tudo ao vivo numa única consulta agregada.
+Com ``RANKING_ESTATISTICAS_MATERIALIZADAS`` ligado, os mesmos números ficam
+numa linha de ``EstatisticasDashboard`` (mais os totais diários em
+``AvaliacoesDiarias``), ajustada por sinais a cada gravação, e o dashboard
+lê tudo com uma consulta de custo constante. Operações em lote que não
+disparam sinais (``bulk_update``, ``QuerySet.update``) devem chamar os
+ajustes daqui ou ``reconstruir_estatisticas``.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Func, IntegerField, Q, Subquery, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import (
+    ProcessoSeletivo, Candidato, RankingCandidato, EstatisticasDashboard, AvaliacoesDiarias,
+)
+
+# Janela (em dias, contando hoje) do contador "avaliados recentemente"
+JANELA_DIAS = 7
+
+STATUS_ATIVOS = ['aberto', 'em_andamento']
+
+
+def _contagem(queryset):
+    """COUNT de um queryset como subquery escalar"""
+    return Subquery(
+        queryset.order_by().annotate(total=Func(Value(1), function='COUNT')).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+class _ContagemEscalar(Subquery):
+    """Subquery escalar aceita dentro de aggregate() (não depende das linhas agregadas)"""
+
+    contains_aggregate = True
+
+    def __init__(self, queryset):
+        contagem = _contagem(queryset)
+        super().__init__(contagem.query, output_field=contagem.output_field)
+
+
+def materializadas():
+    """Indica se as estatísticas são servidas da tabela materializada"""
+    return getattr(settings, 'RANKING_ESTATISTICAS_MATERIALIZADAS', False)
+
+
+def campo_tier(tier):
+    """Nome do contador de EstatisticasDashboard correspondente a um tier (None = pendente)"""
+    return f'tier_{tier.lower()}' if tier else 'rankings_pendentes'
+
+
+def _tiers():
+    return [codigo for codigo, _ in RankingCandidato.TIER_CHOICES]
+
+
+def _primeiro_dia_janela():
+    return timezone.localdate() - timedelta(days=JANELA_DIAS - 1)
+
+
+def calcular_estatisticas():
+    """Calcula todas as estatísticas ao vivo em uma única consulta"""
+    inicio = timezone.make_aware(datetime.combine(_primeiro_dia_janela(), time.min))
+
+    agregados = {
+        'processos_ativos': _ContagemEscalar(ProcessoSeletivo.objects.filter(status__in=STATUS_ATIVOS)),
+        'candidatos': _ContagemEscalar(Candidato.objects.all()),
+        'rankings_pendentes': Count('id', filter=Q(tier__isnull=True)),
+        'avaliados_recentes': Count('id', filter=Q(data_avaliacao__gte=inicio)),
+    }
+    for tier in _tiers():
+        agregados[campo_tier(tier)] = Count('id', filter=Q(tier=tier))
+
+    estatisticas = RankingCandidato.objects.order_by().aggregate(**agregados)
+    return _completar(estatisticas)
+
+
+def _completar(estatisticas):
+    """Acrescenta os campos derivados usados pelo template"""
+    estatisticas['por_tier'] = [(tier, estatisticas[campo_tier(tier)]) for tier in _tiers()]
+    estatisticas['rankings_completos'] = sum(total for _, total in estatisticas['por_tier'])
+    return estatisticas
+
+
+def obter_estatisticas():
+    """Estatísticas do dashboard, lidas da linha materializada quando habilitada"""
+    if not materializadas():
+        return calcular_estatisticas()
+
+    recentes = AvaliacoesDiarias.objects.filter(
+        dia__gte=_primeiro_dia_janela()
+    ).order_by().annotate(
+        soma=Func(F('total'), function='SUM')
+    ).values('soma')
+
+    campos = ['processos_ativos', 'candidatos', 'rankings_pendentes'] + [campo_tier(t) for t in _tiers()]
+    estatisticas = EstatisticasDashboard.objects.filter(pk=EstatisticasDashboard.ID_UNICO).annotate(
+        avaliados_recentes=Coalesce(Subquery(recentes, output_field=IntegerField()), 0)
+    ).values(*campos, 'avaliados_recentes').first()
+
+    if estatisticas is None:
+        # Primeira leitura (ou tabela apagada): montar a linha a partir dos dados
+        return reconstruir_estatisticas()
+
+    return _completar(estatisticas)
+
+
+def reconstruir_estatisticas():
+    """Refaz a linha de estatísticas e os totais diários a partir dos dados atuais"""
+    with transaction.atomic():
+        estatisticas = calcular_estatisticas()
+        campos = ['processos_ativos', 'candidatos', 'rankings_pendentes'] + [campo_tier(t) for t in _tiers()]
+        EstatisticasDashboard.objects.update_or_create(
+            pk=EstatisticasDashboard.ID_UNICO,
+            defaults={
+                **{campo: estatisticas[campo] for campo in campos},
+                'reconstruido_em': timezone.now(),
+            },
+        )
+
+        AvaliacoesDiarias.objects.all().delete()
+        por_dia = RankingCandidato.objects.filter(
+            data_avaliacao__isnull=False
+        ).order_by().annotate(
+            dia=TruncDate('data_avaliacao')
+        ).values('dia').annotate(total=Count('id'))
+        AvaliacoesDiarias.objects.bulk_create(
+            [AvaliacoesDiarias(dia=linha['dia'], total=linha['total']) for linha in por_dia],
+            batch_size=500,
+        )
+
+    return estatisticas
+
+
+def ajustar_contadores(**deltas):
+    """Soma os deltas aos contadores da linha materializada (um único UPDATE)"""
+    deltas = {campo: delta for campo, delta in deltas.items() if delta}
+    if not deltas or not materializadas():
+        return
+    EstatisticasDashboard.objects.filter(pk=EstatisticasDashboard.ID_UNICO).update(
+        **{campo: F(campo) + delta for campo, delta in deltas.items()}
+    )
+
+
+def registrar_mudancas_tier(mudancas):
+    """Ajusta os contadores por tier a partir de pares (tier_anterior, tier_novo)"""
+    deltas = Counter()
+    for anterior, novo in mudancas:
+        if anterior != novo:
+            deltas[campo_tier(anterior)] -= 1
+            deltas[campo_tier(novo)] += 1
+    ajustar_contadores(**deltas)
+
+
+def registrar_avaliacoes(momento, quantidade=1):
+    """Soma ``quantidade`` (pode ser negativa) ao total de avaliações do dia de ``momento``"""
+    if not quantidade or not materializadas():
+        return
+    dia = timezone.localdate(momento)
+
+    if AvaliacoesDiarias.objects.filter(dia=dia).update(total=F('total') + quantidade):
+        return
+    if quantidade < 0:
+        return
+    try:
+        with transaction.atomic():
+            AvaliacoesDiarias.objects.create(dia=dia, total=quantidade)
+    except IntegrityError:
+        # Outra transação criou o dia entre o UPDATE e o INSERT
+        AvaliacoesDiarias.objects.filter(dia=dia).update(total=F('total') + quantidade)
+
+
+def atualizar_processos_ativos():
+    """Recontagem dos processos ativos (tabela pequena) direto no UPDATE da linha"""
+    if not materializadas():
+        return
+    EstatisticasDashboard.objects.filter(pk=EstatisticasDashboard.ID_UNICO).update(
+        processos_ativos=_contagem(ProcessoSeletivo.objects.filter(status__in=STATUS_ATIVOS))
+    )
@@ -0,0 +1,176 @@
+"""
+Eventos do quadro em tempo real (server-sent events).
+
+Cada escrita no quadro publica um evento pequeno em JSON no canal do seu
+processo; a view ``eventos_quadro`` mantém um stream SSE aberto por aba e
+repassa os eventos, e o JavaScript do quadro aplica cada um no DOM (move o
+card, atualiza as bolinhas, insere o candidato novo) em vez de recarregar a
+página. Tipos de evento:
+
+- ``tier``: card movido (``ranking_id``, ``de``, ``para``, ``ordem``);
+- ``avaliacao``: nota salva (``ranking_id``, ``criterio_id``);
+- ``candidato``: candidato criado ou alterado (``ranking_id``);
+- ``criterios``: critérios do processo alterados (as bolinhas de todos os cards mudam);
+- ``quadro``: alteração em lote (importação, tier automático, reordenação);
+  o cliente recarrega só o fragmento do quadro, que vem do cache.
+
+Todo evento leva ``origem``, o identificador da aba que fez a escrita
+(cabeçalho ``X-Quadro-Cliente``), para essa aba ignorá-lo.
+
+O broker é plugável por ``RANKING_EVENTOS_BROKER`` (caminho da classe).
+``BrokerMemoria`` distribui os eventos dentro do processo, sem serviço
+externo: serve para um único worker ASGI. Com vários workers,
+``BrokerPostgres`` repassa os eventos entre eles via LISTEN/NOTIFY do
+próprio banco.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Eventos pendentes por aba; uma aba que não acompanha recebe ``quadro`` e se atualiza de uma vez
+TAMANHO_FILA = 100
+
+
+class BrokerMemoria:
+    """Distribui os eventos para as abas conectadas a este processo
+
+    ``publicar`` pode ser chamado de qualquer thread (as views síncronas
+    rodam fora do event loop); cada assinante recebe o evento na fila do
+    seu próprio loop via ``call_soon_threadsafe``.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._assinantes = {}
+
+    def publicar(self, processo_id, evento):
+        self._distribuir(processo_id, evento)
+
+    def _distribuir(self, processo_id, evento):
+        with self._trava:
+            assinantes = list(self._assinantes.get(processo_id, ()))
+        for loop, fila in assinantes:
+            try:
+                loop.call_soon_threadsafe(self._entregar, fila, evento)
+            except RuntimeError:
+                # Loop já encerrado; a assinatura sai da lista no finally de ``assinar``
+                pass
+
+    @staticmethod
+    def _entregar(fila, evento):
+        if fila.full():
+            while not fila.empty():
+                fila.get_nowait()
+            evento = {'tipo': 'quadro'}
+        fila.put_nowait(evento)
+
+    @asynccontextmanager
+    async def assinar(self, processo_id):
+        """Fila (asyncio.Queue) com os eventos do processo enquanto o bloco estiver aberto"""
+        assinante = (asyncio.get_running_loop(), asyncio.Queue(TAMANHO_FILA))
+        with self._trava:
+            self._assinantes.setdefault(processo_id, set()).add(assinante)
+        try:
+            yield assinante[1]
+        finally:
+            with self._trava:
+                assinantes = self._assinantes.get(processo_id, set())
+                assinantes.discard(assinante)
+                if not assinantes:
+                    self._assinantes.pop(processo_id, None)
+
+    def total_assinantes(self, processo_id):
+        with self._trava:
+            return len(self._assinantes.get(processo_id, ()))
+
+
+class BrokerPostgres(BrokerMemoria):
+    """Repassa os eventos entre workers (e máquinas) por LISTEN/NOTIFY do PostgreSQL
+
+    ``publicar`` faz um ``pg_notify`` pela conexão da requisição; uma thread
+    por processo escuta o canal numa conexão própria e distribui cada
+    notificação às abas locais, como o ``BrokerMemoria``.
+    """
+
+    canal = 'ranking_eventos'
+    espera_reconexao = 5
+
+    def __init__(self):
+        super().__init__()
+        self._ouvinte = None
+
+    def publicar(self, processo_id, evento):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [
+                self.canal, json.dumps({'processo_id': processo_id, 'evento': evento}),
+            ])
+
+    @asynccontextmanager
+    async def assinar(self, processo_id):
+        with self._trava:
+            if self._ouvinte is None:
+                self._ouvinte = threading.Thread(target=self._escutar, name='ranking-eventos', daemon=True)
+                self._ouvinte.start()
+        async with super().assinar(processo_id) as fila:
+            yield fila
+
+    def _escutar(self):
+        # Conexão fora do ORM (API de notificações do psycopg2, o driver do requirements.txt)
+        banco = connections.create_connection('default')
+        while True:
+            conexao = None
+            try:
+                conexao = banco.Database.connect(**banco.get_connection_params())
+                conexao.autocommit = True
+                with conexao.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.canal}')
+                while True:
+                    if select.select([conexao], [], [], 30) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    while conexao.notifies:
+                        dados = json.loads(conexao.notifies.pop(0).payload)
+                        self._distribuir(dados['processo_id'], dados['evento'])
+            except Exception:
+                logger.exception('Escuta de eventos do quadro interrompida; reconectando')
+                if conexao is not None:
+                    conexao.close()
+                time.sleep(self.espera_reconexao)
+
+
+@lru_cache(maxsize=None)
+def obter_broker():
+    """Instância (única por processo) do broker configurado em ``RANKING_EVENTOS_BROKER``"""
+    return import_string(getattr(settings, 'RANKING_EVENTOS_BROKER', 'ranking.eventos.BrokerMemoria'))()
+
+
+def publicar_evento(processo_id, tipo, origem=None, **dados):
+    """Publica um evento do quadro depois que a transação atual confirmar
+
+    Falhas no broker só vão para o log: a escrita que gerou o evento já foi gravada.
+    """
+    evento = {'tipo': tipo, 'origem': origem or '', **dados}
+
+    def publicar():
+        try:
+            obter_broker().publicar(processo_id, evento)
+        except Exception:
+            logger.exception('Falha ao publicar evento %s do processo %s', tipo, processo_id)
+
+    transaction.on_commit(publicar)
+
+
+def origem_da_requisicao(request):
+    """Identificador da aba que fez a requisição (cabeçalho ``X-Quadro-Cliente``)"""
+    return request.headers.get('X-Quadro-Cliente', '')[:64]
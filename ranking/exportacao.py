@@ -0,0 +1,121 @@
+"""
+Exportação do ranking de um processo seletivo (CSV e, se o openpyxl estiver
+instalado, XLSX).
+
+Uma única consulta agrupada por ranking traz candidato, tier, ordem, média
+ponderada e uma coluna por critério (``Max(Case(When(...)))`` sobre as
+avaliações), lida com ``.iterator(chunk_size=...)``. O CSV é gerado linha a
+linha, então a resposta começa a sair antes da consulta terminar e a memória
+não cresce com o tamanho do processo.
+"""
+import csv
+
+from django.db.models import Case, IntegerField, Max, Value, When
+
+from .models import Criterio, RankingCandidato, _decimal
+
+# Linhas buscadas do banco por vez
+TAMANHO_BLOCO = 2000
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # pragma: no cover - dependência opcional
+    Workbook = None
+
+
+def xlsx_disponivel():
+    return Workbook is not None
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la"""
+
+    def write(self, valor):
+        return valor
+
+
+def _criterios(processo):
+    return list(Criterio.objects.filter(processo_seletivo=processo).order_by('ordem', 'nome').values('id', 'nome'))
+
+
+def consulta_exportacao(processo, criterios):
+    """Rankings do processo pivotados: uma linha por candidato, uma coluna ``nota_<id>`` por critério"""
+    tiers = [codigo for codigo, _ in RankingCandidato.TIER_CHOICES]
+    posicao_tier = Case(
+        *[When(tier=tier, then=Value(indice)) for indice, tier in enumerate(tiers)],
+        default=Value(len(tiers)),
+        output_field=IntegerField(),
+    )
+
+    return RankingCandidato.objects.filter(
+        processo_seletivo=processo
+    ).values(
+        'id', 'tier', 'ordem', 'media_ponderada',
+        'candidato__nome', 'candidato__email', 'candidato__telefone', 'candidato__linkedin',
+    ).annotate(
+        posicao_tier=posicao_tier,
+        **{
+            f'nota_{criterio["id"]}': Max(Case(When(
+                avaliacoes_criterios__criterio_id=criterio['id'],
+                then='avaliacoes_criterios__nota',
+            )))
+            for criterio in criterios
+        },
+    ).order_by('posicao_tier', 'ordem', 'id')
+
+
+def _nota(valor):
+    # Alguns bancos (SQLite) devolvem o agregado sem as casas decimais
+    return None if valor is None else _decimal(valor)
+
+
+def linhas_exportacao(processo):
+    """Gera o cabeçalho e depois uma lista de valores por ranking, em ordem de tier/posição"""
+    criterios = _criterios(processo)
+
+    yield (
+        ['Tier', 'Posição', 'Nome', 'E-mail', 'Telefone', 'LinkedIn']
+        + [criterio['nome'] for criterio in criterios]
+        + ['Média Ponderada']
+    )
+
+    posicao = 0
+    tier_atual = object()
+    for linha in consulta_exportacao(processo, criterios).iterator(chunk_size=TAMANHO_BLOCO):
+        # Posição 1, 2, 3... dentro de cada tier (a chave fracionária não diz nada fora do sistema)
+        if linha['tier'] != tier_atual:
+            tier_atual, posicao = linha['tier'], 0
+        posicao += 1
+
+        yield (
+            [
+                linha['tier'] or 'Sem tier',
+                posicao,
+                linha['candidato__nome'],
+                linha['candidato__email'],
+                linha['candidato__telefone'] or '',
+                linha['candidato__linkedin'] or '',
+            ]
+            + [_nota(linha[f'nota_{criterio["id"]}']) for criterio in criterios]
+            + [linha['media_ponderada']]
+        )
+
+
+def gerar_csv(processo):
+    """Gera o CSV em pedaços de texto (com BOM, para o Excel reconhecer UTF-8)"""
+    escritor = csv.writer(_Eco())
+    yield '\ufeff'
+    for valores in linhas_exportacao(processo):
+        yield escritor.writerow(['' if valor is None else valor for valor in valores])
+
+
+def gravar_xlsx(processo, destino):
+    """Grava o XLSX em ``destino`` (caminho ou arquivo binário) no modo write-only do openpyxl"""
+    if Workbook is None:
+        raise RuntimeError('Exportação XLSX requer o pacote openpyxl')
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(title='Ranking')
+    for valores in linhas_exportacao(processo):
+        aba.append(valores)
+    planilha.save(destino)
@@ -0,0 +1,171 @@
+"""
+Importação em massa de candidatos a partir de CSV.
+
+O arquivo é lido em streaming e processado em lotes: cada lote resolve os
+candidatos já cadastrados com uma consulta ``email IN (...)``, cria os novos
+com ``bulk_create`` e os anexa ao processo seletivo (como não ranqueados, no
+fim da coluna) com ``bulk_create(..., ignore_conflicts=True)``. A memória
+usada depende só do tamanho do lote, não do tamanho do arquivo.
+"""
+import csv
+import io
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import estatisticas
+from .busca import indexar_candidatos
+from .models import Candidato, ProcessoSeletivo, RankingCandidato
+from .ordenacao import chaves_apos
+
+# Linhas processadas por lote (e por transação)
+TAMANHO_LOTE = 1000
+
+# Colunas aceitas no CSV (apenas nome e email são obrigatórias)
+COLUNAS = ('nome', 'email', 'telefone', 'linkedin')
+COLUNAS_OBRIGATORIAS = ('nome', 'email')
+
+# Limite de erros guardados para exibição (os demais só entram na contagem)
+MAXIMO_ERROS_LISTADOS = 200
+
+
+class ResultadoImportacao:
+    """Totais de uma importação e os erros por linha"""
+
+    def __init__(self):
+        self.linhas = 0
+        self.candidatos_criados = 0
+        self.candidatos_existentes = 0
+        self.adicionados_ao_processo = 0
+        self.ja_no_processo = 0
+        self.total_erros = 0
+        self.erros = []
+
+    def registrar_erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < MAXIMO_ERROS_LISTADOS:
+            self.erros.append((linha, mensagem))
+
+    @property
+    def erros_omitidos(self):
+        return self.total_erros - len(self.erros)
+
+
+def abrir_texto(arquivo, encoding='utf-8-sig'):
+    """Envolve um arquivo binário (ex.: upload) para leitura de CSV em texto, sem carregá-lo inteiro"""
+    return io.TextIOWrapper(arquivo, encoding=encoding, newline='')
+
+
+def _mensagem(erro):
+    """Texto de um ValidationError, sem repetir mensagens (o e-mail tem dois validadores iguais)"""
+    if hasattr(erro, 'message_dict'):
+        return '; '.join(
+            f'{campo}: {" ".join(dict.fromkeys(msgs))}' for campo, msgs in erro.message_dict.items()
+        )
+    return ' '.join(dict.fromkeys(erro.messages))
+
+
+def _validar_linha(valores):
+    """Monta (sem salvar) o Candidato de uma linha do CSV, validando com as regras do model"""
+    dados = {coluna: (valores.get(coluna) or '').strip() for coluna in COLUNAS}
+    candidato = Candidato(
+        nome=dados['nome'],
+        email=dados['email'],
+        telefone=dados['telefone'] or None,
+        linkedin=dados['linkedin'] or None,
+    )
+    # Unicidade do e-mail é resolvida pelo lote, não por consulta linha a linha
+    candidato.full_clean(validate_unique=False, validate_constraints=False)
+    return candidato
+
+
+def importar_candidatos(processo, arquivo, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Importa os candidatos do CSV ``arquivo`` (texto) para ``processo``; retorna um ResultadoImportacao
+
+    ``progresso``, se informado, é chamado com o resultado parcial depois de cada lote.
+    """
+    resultado = ResultadoImportacao()
+    leitor = csv.DictReader(arquivo)
+
+    cabecalho = [coluna.strip().lower() for coluna in (leitor.fieldnames or [])]
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in cabecalho]
+    if faltando:
+        raise ValueError(f'Coluna(s) obrigatória(s) ausente(s) no CSV: {", ".join(faltando)}')
+    leitor.fieldnames = cabecalho
+
+    # A linha 1 é o cabeçalho
+    linhas = enumerate(leitor, start=2)
+    while True:
+        lote = list(islice(linhas, tamanho_lote))
+        if not lote:
+            break
+        _importar_lote(processo, lote, resultado)
+        if progresso is not None:
+            progresso(resultado)
+
+    return resultado
+
+
+def _importar_lote(processo, lote, resultado):
+    """Valida e grava um lote de linhas: 3 a 5 consultas, independentemente do tamanho do lote"""
+    validos = {}
+    for numero, valores in lote:
+        resultado.linhas += 1
+        try:
+            candidato = _validar_linha(valores)
+        except ValidationError as erro:
+            resultado.registrar_erro(numero, _mensagem(erro))
+            continue
+        # E-mail repetido no próprio arquivo: vale a primeira ocorrência
+        validos.setdefault(candidato.email, candidato)
+
+    if not validos:
+        return
+
+    with transaction.atomic():
+        ids_por_email = dict(
+            Candidato.objects.filter(email__in=validos.keys()).values_list('email', 'id')
+        )
+        resultado.candidatos_existentes += len(ids_por_email)
+
+        novos = [candidato for email, candidato in validos.items() if email not in ids_por_email]
+        if novos:
+            # ignore_conflicts cobre e-mails criados por outra transação nesse meio-tempo
+            Candidato.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+            criados = dict(
+                Candidato.objects.filter(email__in=[c.email for c in novos]).values_list('email', 'id')
+            )
+            resultado.candidatos_criados += len(criados)
+            ids_por_email.update(criados)
+            estatisticas.ajustar_contadores(candidatos=len(criados))
+            indexar_candidatos(criados.values())
+
+        ja_no_processo = set(
+            RankingCandidato.objects.filter(
+                processo_seletivo=processo, candidato_id__in=ids_por_email.values()
+            ).values_list('candidato_id', flat=True)
+        )
+        resultado.ja_no_processo += len(ja_no_processo)
+
+        # Manter a ordem do arquivo, no fim da coluna de não ranqueados
+        candidato_ids = [
+            ids_por_email[email] for email in validos
+            if email in ids_por_email and ids_por_email[email] not in ja_no_processo
+        ]
+        if not candidato_ids:
+            return
+        ultima = RankingCandidato.objects.filter(
+            processo_seletivo=processo, tier__isnull=True
+        ).order_by('-ordem').values_list('ordem', flat=True).first()
+
+        rankings = [
+            RankingCandidato(candidato_id=candidato_id, processo_seletivo=processo, ordem=chave)
+            for candidato_id, chave in zip(candidato_ids, chaves_apos(ultima, len(candidato_ids)))
+        ]
+        RankingCandidato.objects.bulk_create(rankings, batch_size=500, ignore_conflicts=True)
+        resultado.adicionados_ao_processo += len(rankings)
+
+        # bulk_create não chama save() nem dispara sinais
+        ProcessoSeletivo.invalidar_quadros([processo.id])
+        estatisticas.ajustar_contadores(rankings_pendentes=len(rankings))
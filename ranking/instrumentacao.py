@@ -0,0 +1,179 @@
+"""
+Instrumentação por requisição: SQL, templates e Server-Timing.
+
+Ativada por ``RANKING_INSTRUMENTACAO``. O middleware registra um
+``execute_wrapper`` em cada conexão durante a requisição para contar e
+cronometrar as consultas e detectar SQL idêntico repetido (assinatura de
+N+1: o mesmo SQL com parâmetros diferentes, executado várias vezes). A
+renderização de templates é medida envolvendo o ``render`` do backend de
+templates do Django; a medição da requisição corrente fica num ContextVar.
+
+A resposta ganha um cabeçalho ``Server-Timing`` (visível na aba Network do
+navegador) e cada requisição gera uma linha de log no logger
+``ranking.instrumentacao``, em nível WARNING quando passa de
+``RANKING_INSTRUMENTACAO_LENTO_MS``. Requisições do HTMX (cabeçalho
+``HX-Request``) são marcadas como ``parcial`` para separar o custo dos
+fragmentos do custo das páginas completas.
+
+O tempo de respostas em streaming (ex.: exportação CSV) cobre só até o
+início do envio.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template as TemplateDjango
+
+logger = logging.getLogger('ranking.instrumentacao')
+
+# Medição da requisição em andamento (None fora do middleware)
+_medicao_atual = ContextVar('ranking_medicao', default=None)
+
+
+class Medicao:
+    """Números coletados durante uma requisição"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self.profundidade_template = 0
+        self.sql = Counter()
+
+    def repetidas(self, minimo):
+        """SQLs executados ao menos ``minimo`` vezes, do mais repetido para o menos"""
+        return [(sql, vezes) for sql, vezes in self.sql.most_common() if vezes >= minimo]
+
+    def __call__(self, execute, sql, params, many, context):
+        # Usado como execute_wrapper: mede a consulta e guarda o SQL (sem os parâmetros)
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sql[sql] += 1
+
+
+_render_original = TemplateDjango.render
+
+
+def _render_medido(self, context=None, request=None):
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return _render_original(self, context, request)
+
+    # Só o render mais externo conta, para render_to_string aninhado não somar duas vezes
+    medicao.profundidade_template += 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context, request)
+    finally:
+        medicao.profundidade_template -= 1
+        if medicao.profundidade_template == 0:
+            medicao.tempo_template += time.perf_counter() - inicio
+
+
+def _instalar_medicao_templates():
+    if TemplateDjango.render is not _render_medido:
+        TemplateDjango.render = _render_medido
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 1)
+
+
+class InstrumentacaoMiddleware:
+    """Mede SQL e templates de cada requisição e publica em Server-Timing e no log
+
+    Funciona nos dois modos (WSGI e ASGI), para não forçar as views
+    assíncronas a rodarem numa thread quando a instrumentação está ligada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RANKING_INSTRUMENTACAO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lento_ms = getattr(settings, 'RANKING_INSTRUMENTACAO_LENTO_MS', 500)
+        self.minimo_repeticoes = getattr(settings, 'RANKING_INSTRUMENTACAO_REPETICOES', 5)
+        _instalar_medicao_templates()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        try:
+            with self._wrappers(medicao):
+                response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        return self._publicar(request, response, medicao)
+
+    async def __acall__(self, request):
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        # O ORM assíncrono roda numa thread da requisição (sync_to_async), com
+        # conexões próprias: os wrappers são registrados nelas, não nas do event loop
+        pilha = await sync_to_async(self._wrappers)(medicao)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pilha.close)()
+            _medicao_atual.reset(token)
+        return self._publicar(request, response, medicao)
+
+    def _wrappers(self, medicao):
+        pilha = ExitStack()
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(medicao))
+        return pilha
+
+    def _publicar(self, request, response, medicao):
+        total = time.perf_counter() - medicao.inicio
+        tipo = 'parcial' if request.headers.get('HX-Request') else 'pagina'
+        view = request.resolver_match.view_name if request.resolver_match else '-'
+        repetidas = medicao.repetidas(self.minimo_repeticoes)
+
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={_ms(medicao.tempo_sql)};desc="{medicao.consultas} consultas"',
+            f'tpl;dur={_ms(medicao.tempo_template)};desc="templates"',
+            f'total;dur={_ms(total)};desc="{tipo} {view}"',
+        ])
+
+        dados = {
+            'view': view,
+            'tipo': tipo,
+            'metodo': request.method,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'sql_ms': _ms(medicao.tempo_sql),
+            'consultas': medicao.consultas,
+            'template_ms': _ms(medicao.tempo_template),
+            'sql_repetidos': [{'sql': sql[:300], 'vezes': vezes} for sql, vezes in repetidas],
+        }
+        nivel = logging.WARNING if dados['total_ms'] >= self.lento_ms else logging.DEBUG
+        logger.log(
+            nivel,
+            'view=%s tipo=%s metodo=%s status=%s total_ms=%s sql_ms=%s consultas=%s template_ms=%s repetidos=%s',
+            view, tipo, request.method, response.status_code, dados['total_ms'], dados['sql_ms'],
+            medicao.consultas, dados['template_ms'], len(repetidas),
+            extra={'instrumentacao': dados},
+        )
+        for sql, vezes in repetidas:
+            logger.warning('view=%s sql_repetido vezes=%s sql=%s', view, vezes, sql[:300])
+
+        return response
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from ranking.benchmark import executar_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede as views do ranking (tempo, consultas, tempo de SQL e bytes) em processos de vários tamanhos, '
+        'num banco de teste descartável, e imprime o resultado em JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanhos',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+            help='Quantidades de candidatos a medir (padrão: 100 1000 10000)',
+        )
+        parser.add_argument('--criterios', type=int, default=8, help='Critérios por processo (padrão: 8)')
+        parser.add_argument('--densidade', type=float, default=0.7, help='Fração de avaliações (padrão: 0.7)')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Repetições por view (padrão: 5)')
+        parser.add_argument('--semente', type=int, default=42, help='Semente aleatória (padrão: 42)')
+        parser.add_argument('--saida', help='Arquivo JSON de destino (padrão: saída padrão)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            resultado = executar_benchmark(
+                tamanhos=options['tamanhos'],
+                criterios=options['criterios'],
+                densidade=options['densidade'],
+                repeticoes=options['repeticoes'],
+                semente=options['semente'],
+                progresso=lambda mensagem: self.stderr.write(mensagem),
+            )
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+        # Chaves ordenadas e indentação fixa: o JSON pode ser comparado com diff entre commits
+        saida = json.dumps(resultado, indent=2, sort_keys=True, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Resultado gravado em {options["saida"]}'))
+        else:
+            self.stdout.write(saida)
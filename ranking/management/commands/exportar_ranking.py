@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ranking.exportacao import gerar_csv, gravar_xlsx, xlsx_disponivel
+from ranking.models import ProcessoSeletivo
+
+
+class Command(BaseCommand):
+    help = 'Exporta o ranking de um processo seletivo em CSV (padrão) ou XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('processo_id', type=int, help='ID do processo seletivo')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'xlsx'],
+            default='csv',
+            help='Formato do arquivo (XLSX requer o pacote openpyxl)',
+        )
+        parser.add_argument(
+            '--saida',
+            help='Arquivo de destino (padrão: saída padrão; obrigatório para XLSX)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            processo = ProcessoSeletivo.objects.get(id=options['processo_id'])
+        except ProcessoSeletivo.DoesNotExist:
+            raise CommandError(f'Processo não encontrado: {options["processo_id"]}')
+
+        if options['formato'] == 'xlsx':
+            if not xlsx_disponivel():
+                raise CommandError('Exportação XLSX requer o pacote openpyxl')
+            if not options['saida']:
+                raise CommandError('Informe --saida para exportar em XLSX')
+            gravar_xlsx(processo, options['saida'])
+            self.stderr.write(self.style.SUCCESS(f'Ranking exportado para {options["saida"]}'))
+            return
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8', newline='') as destino:
+                destino.writelines(gerar_csv(processo))
+            self.stderr.write(self.style.SUCCESS(f'Ranking exportado para {options["saida"]}'))
+        else:
+            for pedaco in gerar_csv(processo):
+                self.stdout.write(pedaco, ending='')
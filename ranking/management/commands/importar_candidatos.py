@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ranking.importacao import TAMANHO_LOTE, importar_candidatos
+from ranking.models import ProcessoSeletivo
+
+
+class Command(BaseCommand):
+    help = 'Importa candidatos de um CSV (nome, email, telefone, linkedin) para um processo seletivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('processo_id', type=int, help='ID do processo seletivo de destino')
+        parser.add_argument('arquivo', help='Caminho do arquivo CSV (com cabeçalho)')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANHO_LOTE,
+            help=f'Linhas por lote/transação (padrão: {TAMANHO_LOTE})',
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Codificação do arquivo (padrão: utf-8-sig)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            processo = ProcessoSeletivo.objects.get(id=options['processo_id'])
+        except ProcessoSeletivo.DoesNotExist:
+            raise CommandError(f'Processo não encontrado: {options["processo_id"]}')
+
+        try:
+            with open(options['arquivo'], encoding=options['encoding'], newline='') as arquivo:
+                resultado = importar_candidatos(processo, arquivo, tamanho_lote=options['lote'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for linha, mensagem in resultado.erros:
+            self.stderr.write(f'Linha {linha}: {mensagem}')
+        if resultado.erros_omitidos:
+            self.stderr.write(f'... e mais {resultado.erros_omitidos} erro(s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.linhas} linha(s) lida(s): {resultado.candidatos_criados} candidato(s) novo(s), '
+            f'{resultado.candidatos_existentes} já cadastrado(s), '
+            f'{resultado.adicionados_ao_processo} adicionado(s) ao processo, '
+            f'{resultado.ja_no_processo} já estava(m) no processo, {resultado.total_erros} erro(s)'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ranking.models import ProcessoSeletivo, RankingCandidato
+from ranking.ordenacao import rebalancear_tier
+
+
+class Command(BaseCommand):
+    help = 'Redistribui as chaves de ordenação dos tiers de um processo seletivo, preservando a ordem atual'
+
+    def add_arguments(self, parser):
+        parser.add_argument('processo_id', type=int, help='ID do processo seletivo')
+        parser.add_argument(
+            '--tier',
+            choices=[codigo for codigo, _ in RankingCandidato.TIER_CHOICES] + ['unranked'],
+            help='Rebalanceia apenas este tier (padrão: todos)',
+        )
+
+    def handle(self, *args, **options):
+        processo_id = options['processo_id']
+        if not ProcessoSeletivo.objects.filter(id=processo_id).exists():
+            raise CommandError(f'Processo {processo_id} não encontrado')
+
+        if options['tier']:
+            tiers = [options['tier']]
+        else:
+            tiers = [codigo for codigo, _ in RankingCandidato.TIER_CHOICES] + ['unranked']
+
+        total = 0
+        for tier in tiers:
+            alterados = rebalancear_tier(processo_id, None if tier == 'unranked' else tier)
+            total += alterados
+            self.stdout.write(f'Tier {tier}: {alterados} card(s) reposicionado(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'{total} card(s) reposicionado(s) no total'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ranking.models import ProcessoSeletivo, RankingCandidato
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a média ponderada armazenada dos rankings de um ou mais processos seletivos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'processo_ids',
+            nargs='*',
+            type=int,
+            help='IDs dos processos seletivos (omitir junto com --todos para recalcular tudo)',
+        )
+        parser.add_argument(
+            '--todos',
+            action='store_true',
+            help='Recalcula os rankings de todos os processos seletivos',
+        )
+
+    def handle(self, *args, **options):
+        processo_ids = options['processo_ids']
+
+        if not processo_ids and not options['todos']:
+            raise CommandError('Informe ao menos um ID de processo ou use --todos')
+
+        rankings = RankingCandidato.objects.all()
+        if processo_ids:
+            encontrados = set(
+                ProcessoSeletivo.objects.filter(id__in=processo_ids).values_list('id', flat=True)
+            )
+            faltando = sorted(set(processo_ids) - encontrados)
+            if faltando:
+                raise CommandError(f'Processo(s) não encontrado(s): {", ".join(map(str, faltando))}')
+            rankings = rankings.filter(processo_seletivo_id__in=processo_ids)
+
+        with transaction.atomic():
+            total = rankings.recalcular_medias()
+
+        self.stdout.write(self.style.SUCCESS(f'{total} ranking(s) recalculado(s)'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ranking.estatisticas import reconstruir_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói a tabela materializada de estatísticas do dashboard a partir dos dados atuais'
+
+    def handle(self, *args, **options):
+        estatisticas = reconstruir_estatisticas()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Estatísticas reconstruídas: {estatisticas['processos_ativos']} processo(s) ativo(s), "
+            f"{estatisticas['candidatos']} candidato(s), "
+            f"{estatisticas['rankings_completos']} ranking(s) com tier, "
+            f"{estatisticas['rankings_pendentes']} pendente(s)"
+        ))
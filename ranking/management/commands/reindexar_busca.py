@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ranking.busca import reindexar_tudo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca textual de todos os candidatos'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = reindexar_tudo()
+
+        self.stdout.write(self.style.SUCCESS(f'{total} candidato(s) indexado(s)'))
@@ -0,0 +1,121 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+logger = logging.getLogger('ranking.tarefas')
+
+# Segundos que um processo tem para terminar a tarefa atual depois do SIGTERM
+TEMPO_ENCERRAMENTO = 30
+
+# Segundos entre duas rodadas de manutenção (abandonadas e limpeza)
+INTERVALO_MANUTENCAO = 60
+
+
+def _aguardar_sinal():
+    """Evento sinalizado no primeiro SIGTERM/SIGINT recebido pelo processo"""
+    parada = threading.Event()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sinal, lambda *args: parada.set())
+    return parada
+
+
+def _processo_trabalhador(intervalo, ate_esvaziar):
+    # Processo novo (spawn): o Django é configurado aqui, antes de importar os models
+    import django
+    django.setup()
+    from ranking.tarefas import trabalhar
+
+    trabalhar(intervalo=intervalo, parada=_aguardar_sinal(), ate_esvaziar=ate_esvaziar)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas em segundo plano (fila no banco) com um grupo de processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=getattr(settings, 'RANKING_TAREFAS_PROCESSOS', 2),
+            help='Processos trabalhadores (0 executa no próprio processo do comando)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=getattr(settings, 'RANKING_TAREFAS_INTERVALO', 1.0),
+            help='Segundos de espera entre consultas quando a fila está vazia',
+        )
+        parser.add_argument(
+            '--ate-esvaziar',
+            action='store_true',
+            help='Termina quando não houver mais tarefas pendentes, em vez de esperar por novas',
+        )
+
+    def handle(self, *args, **options):
+        anteriores = {sinal: signal.getsignal(sinal) for sinal in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.executar(options['processos'], options['intervalo'], options['ate_esvaziar'], _aguardar_sinal())
+        finally:
+            for sinal, tratador in anteriores.items():
+                signal.signal(sinal, tratador)
+
+    def executar(self, processos, intervalo, ate_esvaziar, parada):
+        from ranking.tarefas import manutencao, trabalhar
+
+        manutencao()
+        if processos <= 0:
+            total = trabalhar(intervalo=intervalo, parada=parada, ate_esvaziar=ate_esvaziar)
+            self.stdout.write(self.style.SUCCESS(f'{total} tarefa(s) executada(s)'))
+            return
+
+        # spawn: processos limpos, sem herdar conexões nem threads do comando
+        contexto = multiprocessing.get_context('spawn')
+        connections.close_all()
+        filhos = {}
+
+        def iniciar(indice):
+            filho = contexto.Process(
+                target=_processo_trabalhador,
+                args=(intervalo, ate_esvaziar),
+                name=f'ranking-tarefas-{indice}',
+            )
+            filho.start()
+            filhos[indice] = filho
+
+        for indice in range(processos):
+            iniciar(indice)
+        self.stdout.write(f'{processos} processo(s) trabalhador(es) iniciado(s)')
+
+        proxima_manutencao = time.monotonic() + INTERVALO_MANUTENCAO
+        while not parada.is_set():
+            for indice, filho in list(filhos.items()):
+                if filho.is_alive():
+                    continue
+                if ate_esvaziar and filho.exitcode == 0:
+                    del filhos[indice]
+                else:
+                    logger.warning('Trabalhador %s terminou (código %s); reiniciando', filho.name, filho.exitcode)
+                    iniciar(indice)
+            if not filhos:
+                break
+            if time.monotonic() >= proxima_manutencao:
+                manutencao()
+                connections.close_all()
+                proxima_manutencao = time.monotonic() + INTERVALO_MANUTENCAO
+            parada.wait(intervalo)
+
+        # Cada processo termina a tarefa em andamento; quem passar do prazo é morto (e a tarefa volta para a fila)
+        for filho in filhos.values():
+            if filho.is_alive():
+                filho.terminate()
+        for filho in filhos.values():
+            filho.join(TEMPO_ENCERRAMENTO)
+            if filho.is_alive():
+                filho.kill()
+        self.stdout.write(self.style.SUCCESS('Trabalhadores encerrados'))
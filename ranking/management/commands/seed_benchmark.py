@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ranking.benchmark import semear
+
+
+class Command(BaseCommand):
+    help = 'Gera processos, candidatos, critérios e avaliações sintéticos (com bulk_create) para testes de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=1, help='Quantidade de processos (padrão: 1)')
+        parser.add_argument('--candidatos', type=int, default=1000, help='Candidatos por processo (padrão: 1000)')
+        parser.add_argument('--criterios', type=int, default=8, help='Critérios por processo (padrão: 8)')
+        parser.add_argument(
+            '--densidade',
+            type=float,
+            default=0.7,
+            help='Fração dos pares candidato × critério com avaliação (padrão: 0.7)',
+        )
+        parser.add_argument(
+            '--ranqueados',
+            type=float,
+            default=0.6,
+            help='Fração dos candidatos que já recebem um tier (padrão: 0.6)',
+        )
+        parser.add_argument('--semente', type=int, help='Semente aleatória, para gerar sempre os mesmos dados')
+
+    def handle(self, *args, **options):
+        for opcao in ('densidade', 'ranqueados'):
+            if not 0 <= options[opcao] <= 1:
+                raise CommandError(f'--{opcao} deve estar entre 0 e 1')
+
+        inicio = time.perf_counter()
+        processo_ids = semear(
+            processos=options['processos'],
+            candidatos=options['candidatos'],
+            criterios=options['criterios'],
+            densidade=options['densidade'],
+            fracao_ranqueada=options['ranqueados'],
+            semente=options['semente'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(processo_ids)} processo(s) criado(s) em {time.perf_counter() - inicio:.1f}s: '
+            f'{", ".join(map(str, processo_ids))}'
+        ))
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.9 on 2026-10-18 02:43
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+class Divisao(models.Func):
+    """Divisão de decimais; no SQLite, somas inteiras (ex.: 11 / 2) cairiam em divisão inteira"""
+    arg_joiner = ' / '
+    template = '(%(expressions)s)'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        numerador, denominador = self.get_source_expressions()
+        clone = self.copy()
+        clone.set_source_expressions([Cast(numerador, models.FloatField()), denominador])
+        return clone.as_sql(compiler, connection, **extra_context)
+
+
+def preencher_medias(apps, schema_editor):
+    RankingCandidato = apps.get_model('ranking', 'RankingCandidato')
+    AvaliacaoCriterio = apps.get_model('ranking', 'AvaliacaoCriterio')
+
+    avaliacoes = AvaliacaoCriterio.objects.filter(ranking=OuterRef('pk')).order_by().values('ranking')
+    soma_ponderada = avaliacoes.annotate(total=Sum(F('nota') * F('criterio__peso'))).values('total')
+    soma_pesos = avaliacoes.annotate(total=Sum('criterio__peso')).values('total')
+    decimal_field = models.DecimalField(max_digits=14, decimal_places=4)
+
+    RankingCandidato.objects.update(
+        soma_ponderada=Coalesce(Subquery(soma_ponderada), Value(Decimal('0')), output_field=decimal_field),
+        soma_pesos=Coalesce(Subquery(soma_pesos), Value(Decimal('0')), output_field=decimal_field),
+    )
+    RankingCandidato.objects.filter(soma_pesos__gt=0).update(
+        media_ponderada=Round(Divisao(F('soma_ponderada'), F('soma_pesos')), 2)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0003_alter_criterio_peso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rankingcandidato',
+            name='media_ponderada',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Média ponderada das avaliações dos critérios', max_digits=4, null=True, verbose_name='Média Ponderada'),
+        ),
+        migrations.AddField(
+            model_name='rankingcandidato',
+            name='soma_pesos',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, help_text='Soma dos pesos dos critérios avaliados (mantida incrementalmente)', max_digits=14, verbose_name='Soma dos Pesos'),
+        ),
+        migrations.AddField(
+            model_name='rankingcandidato',
+            name='soma_ponderada',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, help_text='Soma de nota × peso das avaliações (mantida incrementalmente)', max_digits=14, verbose_name='Soma Ponderada'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingcandidato',
+            index=models.Index(fields=['processo_seletivo', 'media_ponderada'], name='ranking_processo_media_idx'),
+        ),
+        migrations.RunPython(preencher_medias, migrations.RunPython.noop),
+    ]
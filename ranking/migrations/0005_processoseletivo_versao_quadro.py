@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0004_rankingcandidato_media_ponderada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processoseletivo',
+            name='versao_quadro',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incrementada a cada alteração na ordenação do quadro de ranking', verbose_name='Versão do Quadro'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:05
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+ALFABETO = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(ALFABETO)
+
+
+def chaves_distribuidas(quantidade):
+    # Cópia congelada de ranking.ordenacao.chaves_distribuidas
+    tamanho = 1
+    while BASE ** tamanho < (quantidade + 1) * BASE:
+        tamanho += 1
+
+    passo = BASE ** tamanho // (quantidade + 1)
+    chaves = []
+    for indice in range(1, quantidade + 1):
+        valor = indice * passo
+        digitos = []
+        for _ in range(tamanho):
+            valor, resto = divmod(valor, BASE)
+            digitos.append(ALFABETO[resto])
+        chaves.append(''.join(reversed(digitos)).rstrip('0'))
+    return chaves
+
+
+def converter_ordem(apps, schema_editor):
+    RankingCandidato = apps.get_model('ranking', 'RankingCandidato')
+
+    rankings = RankingCandidato.objects.order_by(
+        'processo_seletivo_id', 'tier', 'ordem', '-data_avaliacao', 'id'
+    ).only('id', 'processo_seletivo_id', 'tier', 'ordem')
+
+    alterados = []
+    for _, grupo in groupby(rankings.iterator(), key=lambda r: (r.processo_seletivo_id, r.tier)):
+        grupo = list(grupo)
+        for ranking, chave in zip(grupo, chaves_distribuidas(len(grupo))):
+            ranking.ordem_chave = chave
+            alterados.append(ranking)
+
+    RankingCandidato.objects.bulk_update(alterados, ['ordem_chave'], batch_size=500)
+
+
+def reverter_ordem(apps, schema_editor):
+    RankingCandidato = apps.get_model('ranking', 'RankingCandidato')
+
+    rankings = RankingCandidato.objects.order_by(
+        'processo_seletivo_id', 'tier', 'ordem_chave', 'id'
+    ).only('id', 'processo_seletivo_id', 'tier', 'ordem_chave')
+
+    alterados = []
+    for _, grupo in groupby(rankings.iterator(), key=lambda r: (r.processo_seletivo_id, r.tier)):
+        for posicao, ranking in enumerate(grupo):
+            ranking.ordem = posicao
+            alterados.append(ranking)
+
+    RankingCandidato.objects.bulk_update(alterados, ['ordem'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0005_processoseletivo_versao_quadro'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rankingcandidato',
+            name='ordem_chave',
+            field=models.CharField(blank=True, default='', help_text='Chave de ordenação fracionária do candidato dentro do seu tier', max_length=64, verbose_name='Ordem'),
+        ),
+        migrations.RunPython(converter_ordem, reverter_ordem),
+        migrations.RemoveField(
+            model_name='rankingcandidato',
+            name='ordem',
+        ),
+        migrations.RenameField(
+            model_name='rankingcandidato',
+            old_name='ordem_chave',
+            new_name='ordem',
+        ),
+        migrations.AlterModelOptions(
+            name='rankingcandidato',
+            options={'ordering': ['tier', 'ordem', 'id'], 'verbose_name': 'Ranking de Candidato', 'verbose_name_plural': 'Rankings de Candidatos'},
+        ),
+        migrations.AddIndex(
+            model_name='rankingcandidato',
+            index=models.Index(fields=['processo_seletivo', 'tier', 'ordem'], name='ranking_processo_ordem_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.9 on 2026-10-18 02:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0006_rankingcandidato_ordem_fracionaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvaliacoesDiarias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(unique=True, verbose_name='Dia')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Avaliações do Dia',
+                'verbose_name_plural': 'Avaliações por Dia',
+                'ordering': ['-dia'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstatisticasDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processos_ativos', models.PositiveIntegerField(default=0, verbose_name='Processos Ativos')),
+                ('candidatos', models.PositiveIntegerField(default=0, verbose_name='Candidatos')),
+                ('rankings_pendentes', models.PositiveIntegerField(default=0, verbose_name='Rankings sem Tier')),
+                ('tier_s', models.PositiveIntegerField(default=0, verbose_name='Tier S')),
+                ('tier_a', models.PositiveIntegerField(default=0, verbose_name='Tier A')),
+                ('tier_b', models.PositiveIntegerField(default=0, verbose_name='Tier B')),
+                ('tier_c', models.PositiveIntegerField(default=0, verbose_name='Tier C')),
+                ('tier_d', models.PositiveIntegerField(default=0, verbose_name='Tier D')),
+                ('tier_f', models.PositiveIntegerField(default=0, verbose_name='Tier F')),
+                ('reconstruido_em', models.DateTimeField(default=django.utils.timezone.now, help_text='Última reconstrução completa a partir dos dados', verbose_name='Reconstruído em')),
+            ],
+            options={
+                'verbose_name': 'Estatísticas do Dashboard',
+                'verbose_name_plural': 'Estatísticas do Dashboard',
+            },
+        ),
+    ]
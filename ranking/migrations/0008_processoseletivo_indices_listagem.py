@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0007_estatisticas_dashboard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='processoseletivo',
+            index=models.Index(fields=['-criado_em', '-id'], name='processo_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processoseletivo',
+            index=models.Index(fields=['status', '-criado_em', '-id'], name='processo_status_criado_idx'),
+        ),
+    ]
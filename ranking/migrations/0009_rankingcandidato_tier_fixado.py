@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0008_processoseletivo_indices_listagem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rankingcandidato',
+            name='tier_fixado',
+            field=models.BooleanField(default=False, help_text='Tier definido manualmente; o tier automático não altera este candidato', verbose_name='Tier Fixado'),
+        ),
+    ]
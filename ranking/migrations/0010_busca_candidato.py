@@ -0,0 +1,148 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:27
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Índice textual próprio de cada banco (ver ranking/busca.py); outros bancos ficam só com a tabela
+SQL_INDICE = {
+    'postgresql': (
+        [
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            """
+            ALTER TABLE ranking_buscacandidato ADD COLUMN vetor tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', nome), 'A')
+                || setweight(to_tsvector('simple', contatos), 'B')
+                || setweight(to_tsvector('simple', observacoes), 'C')
+                || setweight(to_tsvector('simple', anotacoes), 'D')
+            ) STORED
+            """,
+            'CREATE INDEX ranking_busca_vetor_idx ON ranking_buscacandidato USING gin (vetor)',
+            'CREATE INDEX ranking_busca_nome_trgm_idx ON ranking_buscacandidato USING gin (nome gin_trgm_ops)',
+        ],
+        [
+            'DROP INDEX IF EXISTS ranking_busca_nome_trgm_idx',
+            'DROP INDEX IF EXISTS ranking_busca_vetor_idx',
+            'ALTER TABLE ranking_buscacandidato DROP COLUMN IF EXISTS vetor',
+        ],
+    ),
+    'sqlite': (
+        [
+            """
+            CREATE VIRTUAL TABLE ranking_buscacandidato_fts USING fts5(
+                nome, contatos, observacoes, anotacoes,
+                content='ranking_buscacandidato', content_rowid='candidato_id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER ranking_busca_fts_ai AFTER INSERT ON ranking_buscacandidato BEGIN
+                INSERT INTO ranking_buscacandidato_fts(rowid, nome, contatos, observacoes, anotacoes)
+                VALUES (new.candidato_id, new.nome, new.contatos, new.observacoes, new.anotacoes);
+            END
+            """,
+            """
+            CREATE TRIGGER ranking_busca_fts_ad AFTER DELETE ON ranking_buscacandidato BEGIN
+                INSERT INTO ranking_buscacandidato_fts(ranking_buscacandidato_fts, rowid, nome, contatos, observacoes, anotacoes)
+                VALUES ('delete', old.candidato_id, old.nome, old.contatos, old.observacoes, old.anotacoes);
+            END
+            """,
+            """
+            CREATE TRIGGER ranking_busca_fts_au AFTER UPDATE ON ranking_buscacandidato BEGIN
+                INSERT INTO ranking_buscacandidato_fts(ranking_buscacandidato_fts, rowid, nome, contatos, observacoes, anotacoes)
+                VALUES ('delete', old.candidato_id, old.nome, old.contatos, old.observacoes, old.anotacoes);
+                INSERT INTO ranking_buscacandidato_fts(rowid, nome, contatos, observacoes, anotacoes)
+                VALUES (new.candidato_id, new.nome, new.contatos, new.observacoes, new.anotacoes);
+            END
+            """,
+        ],
+        [
+            'DROP TRIGGER IF EXISTS ranking_busca_fts_au',
+            'DROP TRIGGER IF EXISTS ranking_busca_fts_ad',
+            'DROP TRIGGER IF EXISTS ranking_busca_fts_ai',
+            'DROP TABLE IF EXISTS ranking_buscacandidato_fts',
+        ],
+    ),
+}
+
+
+def _executar(schema_editor, indice):
+    for sql in SQL_INDICE.get(schema_editor.connection.vendor, ([], []))[indice]:
+        schema_editor.execute(sql)
+
+
+def criar_indice(apps, schema_editor):
+    _executar(schema_editor, 0)
+
+
+def remover_indice(apps, schema_editor):
+    _executar(schema_editor, 1)
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ''.join(caractere for caractere in texto if not unicodedata.combining(caractere))
+
+
+def preencher_busca(apps, schema_editor):
+    Candidato = apps.get_model('ranking', 'Candidato')
+    RankingCandidato = apps.get_model('ranking', 'RankingCandidato')
+    AvaliacaoCriterio = apps.get_model('ranking', 'AvaliacaoCriterio')
+    BuscaCandidato = apps.get_model('ranking', 'BuscaCandidato')
+
+    observacoes = {}
+    for candidato_id, texto in RankingCandidato.objects.exclude(observacoes_gerais=None).values_list(
+        'candidato_id', 'observacoes_gerais'
+    ).iterator():
+        observacoes.setdefault(candidato_id, []).append(texto)
+    anotacoes = {}
+    for candidato_id, texto in AvaliacaoCriterio.objects.exclude(anotacao=None).values_list(
+        'ranking__candidato_id', 'anotacao'
+    ).iterator():
+        anotacoes.setdefault(candidato_id, []).append(texto)
+
+    linhas = []
+    for candidato_id, nome, email, telefone, texto in Candidato.objects.values_list(
+        'id', 'nome', 'email', 'telefone', 'observacoes'
+    ).iterator():
+        linhas.append(BuscaCandidato(
+            candidato_id=candidato_id,
+            nome=_normalizar(nome),
+            contatos=_normalizar(' '.join([
+                email, re.sub(r'\W+', ' ', email), telefone or '', re.sub(r'\D+', '', telefone or ''),
+            ])),
+            observacoes=_normalizar('\n'.join([texto or ''] + observacoes.get(candidato_id, []))),
+            anotacoes=_normalizar('\n'.join(anotacoes.get(candidato_id, []))),
+        ))
+        if len(linhas) >= 1000:
+            BuscaCandidato.objects.bulk_create(linhas)
+            linhas = []
+    BuscaCandidato.objects.bulk_create(linhas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0009_rankingcandidato_tier_fixado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuscaCandidato',
+            fields=[
+                ('candidato', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busca', serialize=False, to='ranking.candidato', verbose_name='Candidato')),
+                ('nome', models.CharField(max_length=200, verbose_name='Nome')),
+                ('contatos', models.TextField(blank=True, default='', verbose_name='E-mail e Telefone')),
+                ('observacoes', models.TextField(blank=True, default='', verbose_name='Observações')),
+                ('anotacoes', models.TextField(blank=True, default='', verbose_name='Anotações das Avaliações')),
+            ],
+            options={
+                'verbose_name': 'Índice de Busca do Candidato',
+                'verbose_name_plural': 'Índice de Busca dos Candidatos',
+            },
+        ),
+        migrations.RunPython(criar_indice, remover_indice),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+    ]
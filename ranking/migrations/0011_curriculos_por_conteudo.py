@@ -0,0 +1,131 @@
+# Generated by Django 5.2.9 on 2026-10-18 03:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# O índice textual da busca (ver 0010) ganha a coluna "curriculo". No SQLite a
+# tabela é recriada ao adicionar a coluna, o que apagaria os triggers: o índice
+# é desfeito antes e recriado depois, já com a nova coluna
+PESOS_POSTGRES = {'nome': 'A', 'contatos': 'B', 'observacoes': 'C', 'anotacoes': 'D', 'curriculo': 'D'}
+
+
+def _sql_indice(colunas):
+    lista = ', '.join(colunas)
+    novos = ', '.join(f'new.{coluna}' for coluna in colunas)
+    antigos = ', '.join(f'old.{coluna}' for coluna in colunas)
+    vetor = '\n || '.join(
+        f"setweight(to_tsvector('simple', {coluna}), '{PESOS_POSTGRES[coluna]}')" for coluna in colunas
+    )
+    return {
+        'postgresql': (
+            [
+                f'ALTER TABLE ranking_buscacandidato ADD COLUMN vetor tsvector GENERATED ALWAYS AS ({vetor}) STORED',
+                'CREATE INDEX ranking_busca_vetor_idx ON ranking_buscacandidato USING gin (vetor)',
+            ],
+            [
+                'DROP INDEX IF EXISTS ranking_busca_vetor_idx',
+                'ALTER TABLE ranking_buscacandidato DROP COLUMN IF EXISTS vetor',
+            ],
+        ),
+        'sqlite': (
+            [
+                f"""
+                CREATE VIRTUAL TABLE ranking_buscacandidato_fts USING fts5(
+                    {lista},
+                    content='ranking_buscacandidato', content_rowid='candidato_id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+                """,
+                f"""
+                CREATE TRIGGER ranking_busca_fts_ai AFTER INSERT ON ranking_buscacandidato BEGIN
+                    INSERT INTO ranking_buscacandidato_fts(rowid, {lista}) VALUES (new.candidato_id, {novos});
+                END
+                """,
+                f"""
+                CREATE TRIGGER ranking_busca_fts_ad AFTER DELETE ON ranking_buscacandidato BEGIN
+                    INSERT INTO ranking_buscacandidato_fts(ranking_buscacandidato_fts, rowid, {lista})
+                    VALUES ('delete', old.candidato_id, {antigos});
+                END
+                """,
+                f"""
+                CREATE TRIGGER ranking_busca_fts_au AFTER UPDATE ON ranking_buscacandidato BEGIN
+                    INSERT INTO ranking_buscacandidato_fts(ranking_buscacandidato_fts, rowid, {lista})
+                    VALUES ('delete', old.candidato_id, {antigos});
+                    INSERT INTO ranking_buscacandidato_fts(rowid, {lista}) VALUES (new.candidato_id, {novos});
+                END
+                """,
+                "INSERT INTO ranking_buscacandidato_fts(ranking_buscacandidato_fts) VALUES ('rebuild')",
+            ],
+            [
+                'DROP TRIGGER IF EXISTS ranking_busca_fts_au',
+                'DROP TRIGGER IF EXISTS ranking_busca_fts_ad',
+                'DROP TRIGGER IF EXISTS ranking_busca_fts_ai',
+                'DROP TABLE IF EXISTS ranking_buscacandidato_fts',
+            ],
+        ),
+    }
+
+
+COLUNAS_ANTIGAS = ['nome', 'contatos', 'observacoes', 'anotacoes']
+COLUNAS_NOVAS = COLUNAS_ANTIGAS + ['curriculo']
+
+
+def _executar(schema_editor, colunas, indice):
+    for sql in _sql_indice(colunas).get(schema_editor.connection.vendor, ([], []))[indice]:
+        schema_editor.execute(sql)
+
+
+def remover_indice_antigo(apps, schema_editor):
+    _executar(schema_editor, COLUNAS_ANTIGAS, 1)
+
+
+def recriar_indice_antigo(apps, schema_editor):
+    _executar(schema_editor, COLUNAS_ANTIGAS, 0)
+
+
+def criar_indice(apps, schema_editor):
+    _executar(schema_editor, COLUNAS_NOVAS, 0)
+
+
+def remover_indice(apps, schema_editor):
+    _executar(schema_editor, COLUNAS_NOVAS, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0010_busca_candidato'),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_indice_antigo, recriar_indice_antigo),
+        migrations.CreateModel(
+            name='ArquivoCurriculo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('arquivo', models.FileField(max_length=255, upload_to='', verbose_name='Arquivo')),
+                ('nome_original', models.CharField(max_length=255, verbose_name='Nome Original')),
+                ('tipo', models.CharField(max_length=10, verbose_name='Tipo')),
+                ('tamanho', models.PositiveBigIntegerField(verbose_name='Tamanho (bytes)')),
+                ('texto', models.TextField(blank=True, default='', verbose_name='Texto Extraído')),
+                ('extracao', models.CharField(choices=[('pendente', 'Pendente'), ('concluida', 'Concluída'), ('indisponivel', 'Indisponível'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Extração do Texto')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Arquivo de Currículo',
+                'verbose_name_plural': 'Arquivos de Currículo',
+            },
+        ),
+        migrations.AddField(
+            model_name='buscacandidato',
+            name='curriculo',
+            field=models.TextField(blank=True, default='', verbose_name='Texto do Currículo'),
+        ),
+        migrations.AddField(
+            model_name='candidato',
+            name='arquivo_curriculo',
+            field=models.ForeignKey(blank=True, help_text='Conteúdo armazenado uma única vez, compartilhado por candidatos com o mesmo arquivo', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='candidatos', to='ranking.arquivocurriculo', verbose_name='Arquivo do Currículo'),
+        ),
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
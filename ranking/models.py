@@ -1,8 +1,29 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
 from django.core.validators import EmailValidator, RegexValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
 
+def _decimal(valor):
+    """Normaliza notas e pesos (que podem chegar como float das views) para Decimal com 2 casas"""
+    return Decimal(str(valor)).quantize(Decimal('0.01'))
+
+
+class _Divisao(models.Func):
+    """Divisão de decimais; no SQLite, somas inteiras (ex.: 11 / 2) cairiam em divisão inteira"""
+    arg_joiner = ' / '
+    template = '(%(expressions)s)'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        numerador, denominador = self.get_source_expressions()
+        clone = self.copy()
+        clone.set_source_expressions([Cast(numerador, models.FloatField()), denominador])
+        return clone.as_sql(compiler, connection, **extra_context)
+
+
 class Candidato(models.Model):
     """Model para armazenar informações dos candidatos"""
     
@@ -42,6 +63,15 @@ class Candidato(models.Model):
         verbose_name='Currículo',
         help_text='Arquivo do currículo (PDF, DOC, DOCX)'
     )
+    arquivo_curriculo = models.ForeignKey(
+        'ArquivoCurriculo',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='candidatos',
+        verbose_name='Arquivo do Currículo',
+        help_text='Conteúdo armazenado uma única vez, compartilhado por candidatos com o mesmo arquivo'
+    )
     observacoes = models.TextField(
         blank=True,
         null=True,
@@ -65,6 +95,24 @@ class Candidato(models.Model):
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        """Invalida o quadro dos processos em que o candidato aparece e atualiza o índice de busca"""
+        from .busca import indexar_candidatos
+        criando = self._state.adding
+        super().save(*args, **kwargs)
+        indexar_candidatos([self.pk])
+        if not criando:
+            ProcessoSeletivo.invalidar_quadros(
+                RankingCandidato.objects.filter(candidato_id=self.pk).values('processo_seletivo_id')
+            )
+
+    def delete(self, *args, **kwargs):
+        """Invalida o quadro dos processos em que o candidato aparecia"""
+        processo_ids = list(self.rankings.values_list('processo_seletivo_id', flat=True))
+        resultado = super().delete(*args, **kwargs)
+        ProcessoSeletivo.invalidar_quadros(processo_ids)
+        return resultado
+
 
 class ProcessoSeletivo(models.Model):
     """Model para os processos seletivos"""
@@ -113,6 +161,12 @@ class ProcessoSeletivo(models.Model):
         verbose_name='Data de Fim',
         help_text='Data prevista para encerramento'
     )
+    versao_quadro = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Versão do Quadro',
+        help_text='Incrementada a cada alteração na ordenação do quadro de ranking'
+    )
     criado_em = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Criado em'
@@ -126,6 +180,11 @@ class ProcessoSeletivo(models.Model):
         verbose_name = 'Processo Seletivo'
         verbose_name_plural = 'Processos Seletivos'
         ordering = ['-data_inicio']
+        indexes = [
+            # Paginação por cursor da listagem (com e sem filtro de status)
+            models.Index(fields=['-criado_em', '-id'], name='processo_criado_idx'),
+            models.Index(fields=['status', '-criado_em', '-id'], name='processo_status_criado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.vaga}"
@@ -135,6 +194,17 @@ class ProcessoSeletivo(models.Model):
         """Verifica se o processo seletivo está ativo"""
         return self.status in ['aberto', 'em_andamento']
 
+    @classmethod
+    def incrementar_versao_quadro(cls, processo_id):
+        """Incrementa atomicamente a versão do quadro e retorna o novo valor"""
+        cls.objects.filter(pk=processo_id).update(versao_quadro=F('versao_quadro') + 1)
+        return cls.objects.filter(pk=processo_id).values_list('versao_quadro', flat=True).first()
+
+    @classmethod
+    def invalidar_quadros(cls, processo_ids):
+        """Incrementa a versão do quadro dos processos (lista de IDs ou subquery), invalidando seu cache"""
+        cls.objects.filter(pk__in=processo_ids).update(versao_quadro=F('versao_quadro') + 1)
+
 
 class Criterio(models.Model):
     """Model para critérios de avaliação personalizados por processo seletivo"""
@@ -187,6 +257,94 @@ class Criterio(models.Model):
     def __str__(self):
         return f"{self.nome} - {self.processo_seletivo.titulo}"
 
+    def save(self, *args, propagar_peso=True, **kwargs):
+        """Propaga mudanças de peso para as médias armazenadas nos rankings
+
+        Com ``propagar_peso=False`` as médias ficam para quem chamou
+        recalcular (ex.: a tarefa ``recalcular_medias``, em processos grandes).
+        """
+        with transaction.atomic():
+            peso_anterior = None
+            if self.pk:
+                peso_anterior = Criterio.objects.filter(pk=self.pk).values_list('peso', flat=True).first()
+            super().save(*args, **kwargs)
+            ProcessoSeletivo.invalidar_quadros([self.processo_seletivo_id])
+
+            if propagar_peso and peso_anterior is not None and _decimal(self.peso) != peso_anterior:
+                delta_peso = _decimal(self.peso) - peso_anterior
+                nota = AvaliacaoCriterio.objects.filter(
+                    ranking=OuterRef('pk'), criterio=self
+                ).values('nota')[:1]
+                RankingCandidato.objects.filter(avaliacoes_criterios__criterio=self).aplicar_delta(
+                    Subquery(nota) * Value(delta_peso),
+                    Value(delta_peso),
+                )
+
+    def delete(self, *args, **kwargs):
+        """Remove a contribuição do critério das médias antes de apagar as avaliações em cascata"""
+        from .busca import indexar_candidatos
+        with transaction.atomic():
+            # As anotações feitas neste critério saem do índice de busca
+            anotados = list(self.avaliacoes.filter(anotacao__gt='').values_list('ranking__candidato_id', flat=True))
+            nota = AvaliacaoCriterio.objects.filter(
+                ranking=OuterRef('pk'), criterio=self
+            ).values('nota')[:1]
+            peso = _decimal(self.peso)
+            RankingCandidato.objects.filter(avaliacoes_criterios__criterio=self).aplicar_delta(
+                -Subquery(nota) * Value(peso),
+                Value(-peso),
+            )
+            ProcessoSeletivo.invalidar_quadros([self.processo_seletivo_id])
+            resultado = super().delete(*args, **kwargs)
+            if anotados:
+                indexar_candidatos(anotados)
+            return resultado
+
+
+class RankingCandidatoQuerySet(models.QuerySet):
+    """Operações em lote sobre a média ponderada armazenada nos rankings"""
+
+    def aplicar_delta(self, delta_ponderado, delta_pesos):
+        """Soma os deltas às somas acumuladas e atualiza a média, sem ler as avaliações"""
+        decimal_field = models.DecimalField(max_digits=14, decimal_places=4)
+        self.update(
+            soma_ponderada=models.ExpressionWrapper(
+                F('soma_ponderada') + delta_ponderado, output_field=decimal_field
+            ),
+            soma_pesos=models.ExpressionWrapper(
+                F('soma_pesos') + delta_pesos, output_field=decimal_field
+            ),
+        )
+        return self.atualizar_media()
+
+    def atualizar_media(self):
+        """Recalcula media_ponderada a partir das somas acumuladas"""
+        pks = self.values('pk')
+        base = RankingCandidato.objects.filter(pk__in=pks)
+        atualizados = base.filter(soma_pesos__gt=0).update(
+            media_ponderada=Round(_Divisao(F('soma_ponderada'), F('soma_pesos')), 2)
+        )
+        atualizados += base.filter(soma_pesos__lte=0).update(
+            soma_ponderada=0, soma_pesos=0, media_ponderada=None
+        )
+        return atualizados
+
+    def recalcular_medias(self):
+        """Recalcula somas e médias do zero com um único UPDATE agregado sobre as avaliações"""
+        avaliacoes = AvaliacaoCriterio.objects.filter(
+            ranking=OuterRef('pk')
+        ).order_by().values('ranking')
+        soma_ponderada = avaliacoes.annotate(
+            total=Sum(F('nota') * F('criterio__peso'))
+        ).values('total')
+        soma_pesos = avaliacoes.annotate(total=Sum('criterio__peso')).values('total')
+        decimal_field = models.DecimalField(max_digits=14, decimal_places=4)
+        self.update(
+            soma_ponderada=Coalesce(Subquery(soma_ponderada), Value(Decimal('0')), output_field=decimal_field),
+            soma_pesos=Coalesce(Subquery(soma_pesos), Value(Decimal('0')), output_field=decimal_field),
+        )
+        return self.atualizar_media()
+
 
 class RankingCandidato(models.Model):
     """Model que liga candidato ao processo seletivo e armazena o tier/rank"""
@@ -220,10 +378,12 @@ class RankingCandidato(models.Model):
         verbose_name='Tier',
         help_text='Classificação do candidato no processo seletivo'
     )
-    ordem = models.PositiveIntegerField(
-        default=0,
+    ordem = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
         verbose_name='Ordem',
-        help_text='Ordem do candidato dentro do seu tier'
+        help_text='Chave de ordenação fracionária do candidato dentro do seu tier'
     )
     observacoes_gerais = models.TextField(
         blank=True,
@@ -237,6 +397,36 @@ class RankingCandidato(models.Model):
         verbose_name='Data da Avaliação',
         help_text='Data em que o candidato foi avaliado'
     )
+    tier_fixado = models.BooleanField(
+        default=False,
+        verbose_name='Tier Fixado',
+        help_text='Tier definido manualmente; o tier automático não altera este candidato'
+    )
+    soma_ponderada = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=0,
+        editable=False,
+        verbose_name='Soma Ponderada',
+        help_text='Soma de nota × peso das avaliações (mantida incrementalmente)'
+    )
+    soma_pesos = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=0,
+        editable=False,
+        verbose_name='Soma dos Pesos',
+        help_text='Soma dos pesos dos critérios avaliados (mantida incrementalmente)'
+    )
+    media_ponderada = models.DecimalField(
+        max_digits=4,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Média Ponderada',
+        help_text='Média ponderada das avaliações dos critérios'
+    )
     criado_em = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Criado em'
@@ -246,38 +436,77 @@ class RankingCandidato(models.Model):
         verbose_name='Atualizado em'
     )
 
+    objects = RankingCandidatoQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Ranking de Candidato'
         verbose_name_plural = 'Rankings de Candidatos'
         unique_together = ['candidato', 'processo_seletivo']
-        ordering = ['tier', 'ordem', '-data_avaliacao']
+        ordering = ['tier', 'ordem', 'id']
+        indexes = [
+            models.Index(fields=['processo_seletivo', 'media_ponderada'], name='ranking_processo_media_idx'),
+            models.Index(fields=['processo_seletivo', 'tier', 'ordem'], name='ranking_processo_ordem_idx'),
+        ]
 
     def __str__(self):
         tier_display = f"Tier {self.tier}" if self.tier else "Sem classificação"
         return f"{self.candidato.nome} - {self.processo_seletivo.titulo} ({tier_display})"
 
+    # Mantidos direto no banco pelas avaliações; um save() comum não deve regravá-los
+    CAMPOS_MEDIA = ('soma_ponderada', 'soma_pesos', 'media_ponderada')
+
     def save(self, *args, **kwargs):
-        """Atualiza a data de avaliação quando um tier é atribuído"""
+        """Atualiza a data de avaliação quando um tier é atribuído e posiciona novos cards no fim do tier"""
+        from .busca import indexar_candidatos
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # A instância pode ter somas desatualizadas (avaliações gravadas depois de carregá-la)
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_MEDIA
+            ]
         if self.tier and not self.data_avaliacao:
             self.data_avaliacao = timezone.now()
+        if not self.ordem:
+            from .ordenacao import chave_entre
+            ultima = RankingCandidato.objects.filter(
+                processo_seletivo_id=self.processo_seletivo_id, tier=self.tier
+            ).exclude(pk=self.pk).order_by('-ordem').values_list('ordem', flat=True).first()
+            self.ordem = chave_entre(ultima or None, None)
+        # As observações gerais entram no índice de busca do candidato
+        observacoes_alteradas = (
+            kwargs.get('update_fields') is None or 'observacoes_gerais' in kwargs['update_fields']
+        ) and (self.observacoes_gerais or '') != (getattr(self, '_valores_banco', {}).get('observacoes_gerais') or '')
         super().save(*args, **kwargs)
+        self._guardar_valores_banco()
+        ProcessoSeletivo.invalidar_quadros([self.processo_seletivo_id])
+        if observacoes_alteradas:
+            indexar_candidatos([self.candidato_id])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._guardar_valores_banco()
+        return instancia
+
+    def _guardar_valores_banco(self):
+        """Guarda tier, data de avaliação (estatísticas do dashboard) e observações (busca) como estão no banco"""
+        self._valores_banco = {
+            campo: self.__dict__[campo]
+            for campo in ('tier', 'data_avaliacao', 'observacoes_gerais')
+            if campo in self.__dict__
+        }
+
+    def delete(self, *args, **kwargs):
+        """Invalida o quadro do processo ao remover o candidato dele"""
+        from .busca import indexar_candidatos
+        resultado = super().delete(*args, **kwargs)
+        ProcessoSeletivo.invalidar_quadros([self.processo_seletivo_id])
+        indexar_candidatos([self.candidato_id])
+        return resultado
     
     def calcular_media_criterios(self):
-        """Calcula a média ponderada das avaliações dos critérios"""
-        avaliacoes = self.avaliacoes_criterios.all()
-        if not avaliacoes.exists():
-            return None
-        
-        soma_ponderada = sum(
-            avaliacao.nota * avaliacao.criterio.peso 
-            for avaliacao in avaliacoes
-        )
-        soma_pesos = sum(avaliacao.criterio.peso for avaliacao in avaliacoes)
-        
-        if soma_pesos == 0:
-            return None
-        
-        return round(soma_ponderada / soma_pesos, 2)
+        """Retorna a média ponderada das avaliações dos critérios (armazenada, sem consultas)"""
+        return self.media_ponderada
 
 
 class AvaliacaoCriterio(models.Model):
@@ -326,6 +555,65 @@ class AvaliacaoCriterio(models.Model):
     def __str__(self):
         return f"{self.ranking.candidato.nome} - {self.criterio.nome}: {self.nota}"
 
+    def save(self, *args, **kwargs):
+        """Atualiza a média ponderada do ranking (e o índice de busca, se a anotação mudou) na mesma transação"""
+        from .busca import indexar_candidatos
+        with transaction.atomic():
+            anterior = None
+            if self.pk:
+                anterior = AvaliacaoCriterio.objects.filter(pk=self.pk).values(
+                    'ranking_id', 'criterio_id', 'nota', 'anotacao'
+                ).first()
+            super().save(*args, **kwargs)
+            ProcessoSeletivo.invalidar_quadros(
+                RankingCandidato.objects.filter(pk=self.ranking_id).values('processo_seletivo_id')
+            )
+            ranking_ids = [self.ranking_id] if self.anotacao else []
+            if anterior and (anterior['anotacao'] or '', anterior['ranking_id']) != (self.anotacao or '', self.ranking_id):
+                ranking_ids = [self.ranking_id, anterior['ranking_id']]
+            elif anterior:
+                ranking_ids = []
+            if ranking_ids:
+                indexar_candidatos(
+                    RankingCandidato.objects.filter(pk__in=ranking_ids).values_list('candidato_id', flat=True)
+                )
+
+            if anterior and (anterior['ranking_id'], anterior['criterio_id']) != (self.ranking_id, self.criterio_id):
+                RankingCandidato.objects.filter(
+                    pk__in=[anterior['ranking_id'], self.ranking_id]
+                ).recalcular_medias()
+                return
+
+            peso = _decimal(self.criterio.peso)
+            nota = _decimal(self.nota)
+            if anterior:
+                delta_ponderado = (nota - anterior['nota']) * peso
+                delta_pesos = Decimal('0')
+            else:
+                delta_ponderado = nota * peso
+                delta_pesos = peso
+            RankingCandidato.objects.filter(pk=self.ranking_id).aplicar_delta(
+                Value(delta_ponderado), Value(delta_pesos)
+            )
+
+    def delete(self, *args, **kwargs):
+        """Remove a contribuição da avaliação da média ponderada do ranking (e a anotação do índice de busca)"""
+        from .busca import indexar_candidatos
+        with transaction.atomic():
+            anterior = AvaliacaoCriterio.objects.filter(pk=self.pk).values('nota', 'anotacao').first()
+            resultado = super().delete(*args, **kwargs)
+            if anterior and anterior['anotacao']:
+                indexar_candidatos(RankingCandidato.objects.filter(pk=self.ranking_id).values_list('candidato_id', flat=True))
+            ProcessoSeletivo.invalidar_quadros(
+                RankingCandidato.objects.filter(pk=self.ranking_id).values('processo_seletivo_id')
+            )
+            if anterior:
+                peso = _decimal(self.criterio.peso)
+                RankingCandidato.objects.filter(pk=self.ranking_id).aplicar_delta(
+                    Value(-anterior['nota'] * peso), Value(-peso)
+                )
+            return resultado
+
     def clean(self):
         """Validação para garantir que o critério pertence ao processo seletivo correto"""
         from django.core.exceptions import ValidationError
@@ -333,3 +621,162 @@ class AvaliacaoCriterio(models.Model):
             raise ValidationError(
                 'O critério deve pertencer ao mesmo processo seletivo do ranking.'
             )
+
+
+class EstatisticasDashboard(models.Model):
+    """Linha única com os contadores do dashboard, mantida por sinais (ver ranking/signals.py)"""
+    
+    ID_UNICO = 1
+    
+    processos_ativos = models.PositiveIntegerField(default=0, verbose_name='Processos Ativos')
+    candidatos = models.PositiveIntegerField(default=0, verbose_name='Candidatos')
+    rankings_pendentes = models.PositiveIntegerField(default=0, verbose_name='Rankings sem Tier')
+    tier_s = models.PositiveIntegerField(default=0, verbose_name='Tier S')
+    tier_a = models.PositiveIntegerField(default=0, verbose_name='Tier A')
+    tier_b = models.PositiveIntegerField(default=0, verbose_name='Tier B')
+    tier_c = models.PositiveIntegerField(default=0, verbose_name='Tier C')
+    tier_d = models.PositiveIntegerField(default=0, verbose_name='Tier D')
+    tier_f = models.PositiveIntegerField(default=0, verbose_name='Tier F')
+    reconstruido_em = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Reconstruído em',
+        help_text='Última reconstrução completa a partir dos dados'
+    )
+
+    class Meta:
+        verbose_name = 'Estatísticas do Dashboard'
+        verbose_name_plural = 'Estatísticas do Dashboard'
+
+    def __str__(self):
+        return f"Estatísticas (reconstruídas em {self.reconstruido_em:%d/%m/%Y %H:%M})"
+
+
+class AvaliacoesDiarias(models.Model):
+    """Quantidade de rankings que receberam o primeiro tier em cada dia"""
+    
+    dia = models.DateField(unique=True, verbose_name='Dia')
+    total = models.IntegerField(default=0, verbose_name='Total')
+
+    class Meta:
+        verbose_name = 'Avaliações do Dia'
+        verbose_name_plural = 'Avaliações por Dia'
+        ordering = ['-dia']
+
+    def __str__(self):
+        return f"{self.dia:%d/%m/%Y}: {self.total}"
+
+
+class BuscaCandidato(models.Model):
+    """Texto buscável de um candidato (sem acentos, em minúsculas), indexado pelo banco (ver ranking/busca.py)"""
+    
+    candidato = models.OneToOneField(
+        Candidato,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='busca',
+        verbose_name='Candidato'
+    )
+    nome = models.CharField(max_length=200, verbose_name='Nome')
+    contatos = models.TextField(blank=True, default='', verbose_name='E-mail e Telefone')
+    observacoes = models.TextField(blank=True, default='', verbose_name='Observações')
+    anotacoes = models.TextField(blank=True, default='', verbose_name='Anotações das Avaliações')
+    curriculo = models.TextField(blank=True, default='', verbose_name='Texto do Currículo')
+
+    class Meta:
+        verbose_name = 'Índice de Busca do Candidato'
+        verbose_name_plural = 'Índice de Busca dos Candidatos'
+
+    def __str__(self):
+        return self.nome
+
+
+class ArquivoCurriculo(models.Model):
+    """Arquivo de currículo endereçado pelo conteúdo (SHA-256): o mesmo arquivo é gravado uma única vez"""
+    
+    EXTRACAO_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('concluida', 'Concluída'),
+        ('indisponivel', 'Indisponível'),
+        ('erro', 'Erro'),
+    ]
+    
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    arquivo = models.FileField(max_length=255, verbose_name='Arquivo')
+    nome_original = models.CharField(max_length=255, verbose_name='Nome Original')
+    tipo = models.CharField(max_length=10, verbose_name='Tipo')
+    tamanho = models.PositiveBigIntegerField(verbose_name='Tamanho (bytes)')
+    texto = models.TextField(blank=True, default='', verbose_name='Texto Extraído')
+    extracao = models.CharField(
+        max_length=20,
+        choices=EXTRACAO_CHOICES,
+        default='pendente',
+        verbose_name='Extração do Texto'
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    
+    class Meta:
+        verbose_name = 'Arquivo de Currículo'
+        verbose_name_plural = 'Arquivos de Currículo'
+    
+    def __str__(self):
+        return f"{self.nome_original} ({self.sha256[:12]})"
+
+
+class Tarefa(models.Model):
+    """Operação pesada executada fora da requisição pelos processos do ``run_workers`` (ver ranking/tarefas.py)"""
+    
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+    
+    tipo = models.CharField(max_length=50, verbose_name='Tipo')
+    parametros = models.JSONField(default=dict, blank=True, verbose_name='Parâmetros')
+    processo_seletivo = models.ForeignKey(
+        ProcessoSeletivo,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tarefas',
+        verbose_name='Processo Seletivo'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name='Status'
+    )
+    progresso = models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')
+    mensagem = models.CharField(max_length=200, blank=True, default='', verbose_name='Mensagem')
+    resultado = models.JSONField(null=True, blank=True, verbose_name='Resultado')
+    erro = models.TextField(blank=True, default='', verbose_name='Erro')
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')
+    trabalhador = models.CharField(max_length=100, blank=True, default='', verbose_name='Trabalhador')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    iniciado_em = models.DateTimeField(null=True, blank=True, verbose_name='Iniciado em')
+    batimento_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Último Sinal',
+        help_text='Atualizado pelo trabalhador a cada progresso; parado há muito tempo indica tarefa abandonada'
+    )
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name='Concluído em')
+    
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-criado_em']
+        indexes = [
+            # A fila: só as pendentes, na ordem de chegada
+            models.Index(fields=['id'], condition=Q(status='pendente'), name='ranking_tarefa_pendentes_idx'),
+            models.Index(fields=['status', 'batimento_em'], name='ranking_tarefa_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def finalizada(self):
+        return self.status in ('concluida', 'erro')
@@ -0,0 +1,150 @@
+"""
+Chaves de ordenação fracionárias (estilo LexoRank) para os cards do quadro.
+
+Cada RankingCandidato guarda em ``ordem`` uma string que, comparada
+lexicograficamente, define sua posição dentro do tier. Para mover um card
+basta gerar uma chave entre as dos vizinhos, gravando apenas a própria linha.
+Quando as chaves ficam longas demais, o tier é rebalanceado em segundo plano.
+"""
+import logging
+import threading
+
+from django.db import connection, transaction
+
+from .eventos import publicar_evento
+
+logger = logging.getLogger(__name__)
+
+# Apenas dígitos e minúsculas: a ordem é a mesma em qualquer collation comum
+ALFABETO = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(ALFABETO)
+
+# Acima deste tamanho a chave dispara o rebalanceamento do tier
+TAMANHO_MAXIMO_CHAVE = 16
+
+
+def chave_entre(antes=None, depois=None):
+    """Gera uma chave estritamente entre ``antes`` e ``depois`` (None = sem limite)"""
+    antes = antes or ''
+    if depois is not None and antes >= depois:
+        raise ValueError(f"Chaves fora de ordem: {antes!r} >= {depois!r}")
+
+    chave = []
+    posicao = 0
+    while True:
+        digito_antes = ALFABETO.index(antes[posicao]) if posicao < len(antes) else 0
+        if depois is not None and posicao < len(depois):
+            digito_depois = ALFABETO.index(depois[posicao])
+        else:
+            digito_depois = BASE
+
+        if digito_depois - digito_antes > 1:
+            chave.append(ALFABETO[(digito_antes + digito_depois) // 2])
+            return ''.join(chave)
+
+        chave.append(ALFABETO[digito_antes])
+        if digito_depois > digito_antes:
+            # Já ficamos abaixo de "depois": daqui em diante o limite superior é livre
+            depois = None
+        posicao += 1
+
+
+def chaves_distribuidas(quantidade):
+    """Gera ``quantidade`` chaves crescentes, curtas e igualmente espaçadas"""
+    if quantidade <= 0:
+        return []
+
+    tamanho = 1
+    while BASE ** tamanho < (quantidade + 1) * BASE:
+        tamanho += 1
+
+    passo = BASE ** tamanho // (quantidade + 1)
+    chaves = []
+    for indice in range(1, quantidade + 1):
+        valor = indice * passo
+        digitos = []
+        for _ in range(tamanho):
+            valor, resto = divmod(valor, BASE)
+            digitos.append(ALFABETO[resto])
+        chaves.append(''.join(reversed(digitos)).rstrip('0'))
+    return chaves
+
+
+def chaves_apos(antes, quantidade):
+    """Gera ``quantidade`` chaves crescentes, todas depois de ``antes`` (para inserções em lote no fim do tier)"""
+    base = chave_entre(antes or None, None)
+    return [base + sufixo for sufixo in chaves_distribuidas(quantidade)]
+
+
+def chave_para_posicao(processo_id, tier, antes_id=None, depois_id=None, excluir_id=None):
+    """Calcula a chave para um card solto entre os cards ``antes_id`` e ``depois_id`` de um tier
+
+    Vizinhos desconhecidos (ou que já saíram do tier) são ignorados; sem
+    vizinhos, o card vai para o fim do tier.
+    """
+    from .models import RankingCandidato
+
+    tier_qs = RankingCandidato.objects.filter(processo_seletivo_id=processo_id, tier=tier)
+    if excluir_id:
+        tier_qs = tier_qs.exclude(pk=excluir_id)
+
+    vizinhos = {}
+    ids = [pk for pk in (antes_id, depois_id) if pk]
+    if ids:
+        vizinhos = dict(tier_qs.filter(pk__in=ids).values_list('pk', 'ordem'))
+    antes = vizinhos.get(antes_id)
+    depois = vizinhos.get(depois_id)
+
+    if antes is None and depois is None:
+        antes = tier_qs.order_by('-ordem').values_list('ordem', flat=True).first()
+    elif depois is None or (antes is not None and antes >= depois):
+        # Vizinho de baixo ausente ou desatualizado: usar o próximo card real
+        depois = tier_qs.filter(ordem__gt=antes).order_by('ordem').values_list('ordem', flat=True).first()
+
+    return chave_entre(antes or None, depois or None)
+
+
+def precisa_rebalancear(chave):
+    """Indica se a chave cresceu além do limite"""
+    return len(chave or '') > TAMANHO_MAXIMO_CHAVE
+
+
+def rebalancear_tier(processo_id, tier):
+    """Redistribui as chaves de um tier mantendo a ordem atual; retorna quantas linhas mudaram"""
+    from .models import ProcessoSeletivo, RankingCandidato
+
+    with transaction.atomic():
+        rankings = list(
+            RankingCandidato.objects.select_for_update()
+            .filter(processo_seletivo_id=processo_id, tier=tier)
+            .order_by('ordem', 'id')
+            .only('id', 'ordem')
+        )
+
+        alterados = []
+        for ranking, chave in zip(rankings, chaves_distribuidas(len(rankings))):
+            if ranking.ordem != chave:
+                ranking.ordem = chave
+                alterados.append(ranking)
+
+        if alterados:
+            RankingCandidato.objects.bulk_update(alterados, ['ordem'], batch_size=500)
+            ProcessoSeletivo.incrementar_versao_quadro(processo_id)
+            # As chaves guardadas nos cards das abas abertas ficaram velhas
+            publicar_evento(processo_id, 'quadro')
+
+    return len(alterados)
+
+
+def agendar_rebalanceamento(processo_id, tier):
+    """Rebalanceia o tier numa thread separada depois que a transação atual confirmar"""
+
+    def executar():
+        try:
+            rebalancear_tier(processo_id, tier)
+        except Exception:
+            logger.exception('Falha ao rebalancear tier %s do processo %s', tier, processo_id)
+        finally:
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=executar, daemon=True).start())
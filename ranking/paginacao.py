@@ -0,0 +1,71 @@
+"""
+Paginação por cursor (keyset).
+
+Em vez de OFFSET, cada página guarda os valores da chave de ordenação do
+último item e a próxima página filtra "depois desse item". O custo de cada
+página depende só do tamanho da página, não de quantas já foram lidas.
+
+``PaginadorEstimado`` é um Paginator para o admin de tabelas muito grandes:
+sem filtros, no PostgreSQL, usa a contagem estimada do planner em vez de
+``COUNT(*)``.
+"""
+import base64
+import binascii
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def codificar_cursor(*valores):
+    """Empacota os valores da chave de ordenação do último item num token opaco para a URL"""
+    dados = json.dumps(valores, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, quantidade):
+    """Desfaz ``codificar_cursor``; retorna None para cursor ausente ou inválido"""
+    if not cursor:
+        return None
+    try:
+        dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(dados)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        return None
+    return valores
+
+
+def fatiar_pagina(queryset, tamanho):
+    """Lê uma página (um item a mais para saber se há próxima) e indica se existe continuação"""
+    itens = list(queryset[:tamanho + 1])
+    return itens[:tamanho], len(itens) > tamanho
+
+
+def linhas_estimadas(model, using='default'):
+    """Número de linhas da tabela segundo as estatísticas do PostgreSQL (0 se indisponível)"""
+    conexao = connections[using]
+    if conexao.vendor != 'postgresql':
+        return 0
+    with conexao.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [model._meta.db_table])
+        linha = cursor.fetchone()
+    return max(linha[0], 0) if linha else 0
+
+
+class PaginadorEstimado(Paginator):
+    """Paginator que troca o COUNT(*) pela estimativa do banco em tabelas grandes sem filtro"""
+
+    # Abaixo disso a contagem exata é barata e a estimativa não compensa
+    MINIMO_ESTIMATIVA = 100000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimativa = linhas_estimadas(self.object_list.model, self.object_list.db)
+            if estimativa >= self.MINIMO_ESTIMATIVA:
+                return estimativa
+        return super().count
@@ -0,0 +1,49 @@
+"""
+Sinais que mantêm a tabela materializada de estatísticas do dashboard.
+
+Conectados em ``RankingConfig.ready`` apenas quando
+``RANKING_ESTATISTICAS_MATERIALIZADAS`` está ligado. Não há receptores para
+AvaliacaoCriterio: assim o Django continua apagando avaliações em cascata
+com um único DELETE, sem carregar cada linha na memória.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import estatisticas
+from .models import ProcessoSeletivo, Candidato, RankingCandidato
+
+
+@receiver([post_save, post_delete], sender=ProcessoSeletivo, dispatch_uid='estatisticas_processo')
+def processo_alterado(sender, instance, **kwargs):
+    estatisticas.atualizar_processos_ativos()
+
+
+@receiver(post_save, sender=Candidato, dispatch_uid='estatisticas_candidato_criado')
+def candidato_criado(sender, instance, created, **kwargs):
+    if created:
+        estatisticas.ajustar_contadores(candidatos=1)
+
+
+@receiver(post_delete, sender=Candidato, dispatch_uid='estatisticas_candidato_removido')
+def candidato_removido(sender, instance, **kwargs):
+    estatisticas.ajustar_contadores(candidatos=-1)
+
+
+@receiver(post_save, sender=RankingCandidato, dispatch_uid='estatisticas_ranking_salvo')
+def ranking_salvo(sender, instance, created, update_fields=None, **kwargs):
+    banco = getattr(instance, '_valores_banco', {})
+
+    if created:
+        estatisticas.ajustar_contadores(**{estatisticas.campo_tier(instance.tier): 1})
+    elif 'tier' in banco and (update_fields is None or 'tier' in update_fields):
+        estatisticas.registrar_mudancas_tier([(banco['tier'], instance.tier)])
+
+    if instance.data_avaliacao and (created or ('data_avaliacao' in banco and not banco['data_avaliacao'])):
+        estatisticas.registrar_avaliacoes(instance.data_avaliacao)
+
+
+@receiver(post_delete, sender=RankingCandidato, dispatch_uid='estatisticas_ranking_removido')
+def ranking_removido(sender, instance, **kwargs):
+    estatisticas.ajustar_contadores(**{estatisticas.campo_tier(instance.tier): -1})
+    if instance.data_avaliacao:
+        estatisticas.registrar_avaliacoes(instance.data_avaliacao, -1)
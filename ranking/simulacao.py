@@ -0,0 +1,114 @@
+"""
+Simulação de pesos dos critérios ("e se?"), sem gravar nada.
+
+A matriz candidato × critério de notas de um processo é montada uma vez com
+NumPy (NaN onde não há avaliação) e fica no cache sob a versão do quadro, que
+toda escrita em rankings, avaliações ou critérios incrementa. Cada simulação
+aplica um vetor de pesos à matriz inteira numa única passada:
+
+    média = (notas · pesos) / (avaliados · pesos)
+
+e devolve, para cada ranking, a média simulada, a posição geral por média e
+quanto ela mudou em relação aos pesos atuais. Mesmo com dezenas de milhares
+de candidatos a conta leva poucos milissegundos.
+"""
+import numpy as np
+
+from .cache import obter_matriz
+from .models import AvaliacaoCriterio, Criterio, RankingCandidato
+
+
+class MatrizNotas:
+    """Notas de um processo em arrays: uma linha por ranking (IDs crescentes), uma coluna por critério"""
+
+    def __init__(self, ranking_ids, criterio_ids, pesos, notas):
+        self.ranking_ids = ranking_ids
+        self.criterio_ids = criterio_ids
+        self.pesos = pesos
+        self.notas = notas
+        self.avaliados = ~np.isnan(notas)
+        self.notas_zeradas = np.where(self.avaliados, notas, 0.0)
+        self.medias_atuais = self.medias(pesos)
+        self.posicoes_atuais = self.posicoes(self.medias_atuais)
+
+    def medias(self, pesos):
+        """Média ponderada de cada ranking com ``pesos`` (NaN para quem não tem avaliação com peso)"""
+        soma_ponderada = self.notas_zeradas @ pesos
+        soma_pesos = self.avaliados @ pesos
+        medias = np.full(len(self.ranking_ids), np.nan)
+        np.divide(soma_ponderada, soma_pesos, out=medias, where=soma_pesos > 0)
+        return medias
+
+    def posicoes(self, medias):
+        """Posição (1 = maior média) de cada ranking; sem média vai para o fim, empates pelo ID"""
+        chave = np.where(np.isnan(medias), -np.inf, medias)
+        ordem = np.lexsort((self.ranking_ids, -chave))
+        posicoes = np.empty(len(ordem), dtype=np.int64)
+        posicoes[ordem] = np.arange(1, len(ordem) + 1)
+        return posicoes
+
+
+def montar_matriz(processo):
+    """Lê rankings, critérios e avaliações do processo (3 consultas) e monta a MatrizNotas"""
+    ranking_ids = np.fromiter(
+        RankingCandidato.objects.filter(processo_seletivo=processo).order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    criterios = list(
+        Criterio.objects.filter(processo_seletivo=processo).order_by('ordem', 'nome').values_list('id', 'peso')
+    )
+    criterio_ids = [criterio_id for criterio_id, _ in criterios]
+    pesos = np.array([float(peso) for _, peso in criterios], dtype=np.float64)
+
+    notas = np.full((len(ranking_ids), len(criterio_ids)), np.nan)
+    avaliacoes = list(
+        AvaliacaoCriterio.objects.filter(ranking__processo_seletivo=processo).values_list(
+            'ranking_id', 'criterio_id', 'nota'
+        ).order_by()
+    )
+    if avaliacoes:
+        linhas, colunas, valores = zip(*avaliacoes)
+        coluna_por_criterio = {criterio_id: indice for indice, criterio_id in enumerate(criterio_ids)}
+        notas[
+            np.searchsorted(ranking_ids, np.array(linhas, dtype=np.int64)),
+            [coluna_por_criterio[criterio_id] for criterio_id in colunas],
+        ] = np.array(valores, dtype=np.float64)
+
+    return MatrizNotas(ranking_ids, criterio_ids, pesos, notas)
+
+
+def simular(processo, pesos_propostos):
+    """Aplica ``pesos_propostos`` ({criterio_id: peso}, os ausentes mantêm o peso atual) à matriz do processo
+
+    Retorna um dict de listas alinhadas por ranking (IDs crescentes): médias
+    atuais e simuladas, posições e variação de posição (positiva = subiu).
+    """
+    matriz = obter_matriz(processo, montar_matriz)
+
+    pesos = matriz.pesos.copy()
+    for indice, criterio_id in enumerate(matriz.criterio_ids):
+        if criterio_id in pesos_propostos:
+            pesos[indice] = pesos_propostos[criterio_id]
+
+    medias = matriz.medias(pesos)
+    posicoes = matriz.posicoes(medias)
+
+    return {
+        'criterios': [
+            {'id': criterio_id, 'peso_atual': float(atual), 'peso': float(peso)}
+            for criterio_id, atual, peso in zip(matriz.criterio_ids, matriz.pesos, pesos)
+        ],
+        'ranking_ids': matriz.ranking_ids.tolist(),
+        'medias_atuais': _lista(matriz.medias_atuais),
+        'medias': _lista(medias),
+        'posicoes_atuais': matriz.posicoes_atuais.tolist(),
+        'posicoes': posicoes.tolist(),
+        'variacoes': (matriz.posicoes_atuais - posicoes).tolist(),
+    }
+
+
+def _lista(medias):
+    """Médias com 2 casas arredondando meio para cima, como o ROUND do banco, e None no lugar de NaN (JSON)"""
+    # np.round arredonda meio para o par (8.125 -> 8.12); o epsilon absorve o erro de ponto flutuante
+    arredondadas = np.floor(medias * 100 + 0.5 + 1e-9) / 100
+    return [None if media != media else media for media in arredondadas.tolist()]
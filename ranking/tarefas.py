@@ -0,0 +1,307 @@
+"""
+Tarefas em segundo plano: fila no próprio banco, sem broker externo.
+
+Operações que percorrem um processo inteiro (recalcular as médias depois de
+mudar o peso de um critério, importar um CSV grande, aplicar o tier
+automático, gerar o XLSX) viram uma linha em ``Tarefa`` e a requisição
+responde na hora, com um fragmento HTMX que acompanha o progresso. Quem
+executa é o comando ``run_workers``: um grupo de processos, cada um
+repetindo "reivindicar a próxima pendente, executar, gravar o resultado".
+
+A reivindicação é segura entre processos e máquinas:
+
+- PostgreSQL (e outros bancos com ``SKIP LOCKED``): ``SELECT ... FOR UPDATE
+  SKIP LOCKED`` na pendente mais antiga; cada trabalhador pula as linhas que
+  outro já travou, sem esperar por elas;
+- SQLite: ``UPDATE ... WHERE id = ? AND status = 'pendente'`` (troca
+  condicional); quem atualiza a linha ganha, quem não atualiza tenta a
+  próxima. As escritas do SQLite já são serializadas.
+
+O trabalhador grava o progresso (e um batimento) durante a execução. Uma
+tarefa em execução sem batimento há ``RANKING_TAREFAS_ABANDONO`` segundos
+(trabalhador morto ou reiniciado) volta para a fila, até
+``MAXIMO_TENTATIVAS`` vezes; por isso as tarefas são idempotentes.
+
+Um tipo de tarefa é uma função registrada com ``@tarefa('<tipo>')``, que
+recebe a Tarefa, uma função de progresso e os parâmetros (JSON) e retorna o
+resultado (JSON), com um ``resumo`` legível.
+"""
+import logging
+import os
+import socket
+import tempfile
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .autotier import aplicar_tiers
+from .eventos import publicar_evento
+from .exportacao import gerar_csv, gravar_xlsx
+from .importacao import abrir_texto, importar_candidatos
+from .models import ProcessoSeletivo, RankingCandidato, Tarefa
+
+logger = logging.getLogger(__name__)
+
+# Tipo -> função que executa a tarefa
+TIPOS = {}
+
+# Vezes que uma tarefa abandonada volta para a fila antes de ser dada como erro
+MAXIMO_TENTATIVAS = 3
+
+# Intervalo mínimo (s) entre duas gravações de progresso da mesma tarefa
+INTERVALO_PROGRESSO = 0.5
+
+# Erros de importação guardados no resultado da tarefa
+MAXIMO_ERROS_RESULTADO = 50
+
+TAMANHO_LOTE = 1000
+
+
+def tarefa(tipo):
+    """Registra a função decorada como executora das tarefas do ``tipo``"""
+    def registrar(funcao):
+        TIPOS[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def enfileirar(tipo, processo=None, **parametros):
+    """Cria a tarefa pendente; os trabalhadores só a enxergam depois do commit"""
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+    return Tarefa.objects.create(tipo=tipo, processo_seletivo=processo, parametros=parametros)
+
+
+def processo_grande(processo):
+    """Se as operações em lote do processo devem ir para a fila em vez de rodar na requisição"""
+    return processo.rankings.count() >= getattr(settings, 'RANKING_TAREFAS_MINIMO_RANKINGS', 2000)
+
+
+def identificar():
+    """Nome do trabalhador gravado nas tarefas que ele reivindica"""
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+class Progresso:
+    """Grava o andamento e o batimento da tarefa, no máximo a cada ``INTERVALO_PROGRESSO`` segundos"""
+
+    def __init__(self, tarefa):
+        self.tarefa = tarefa
+        self._ultima_gravacao = 0.0
+
+    def __call__(self, feitos, total, mensagem=''):
+        agora = time.monotonic()
+        if agora - self._ultima_gravacao < INTERVALO_PROGRESSO:
+            return
+        self._ultima_gravacao = agora
+        # 100% só quando a tarefa termina de fato
+        percentual = min(99, feitos * 100 // total) if total else 0
+        try:
+            Tarefa.objects.filter(id=self.tarefa.id).update(
+                progresso=percentual, mensagem=mensagem[:200], batimento_em=timezone.now()
+            )
+        except DatabaseError:
+            # O progresso é só informativo: a tarefa segue
+            logger.warning('Não foi possível gravar o progresso da tarefa %s', self.tarefa.id, exc_info=True)
+
+
+def reivindicar(trabalhador):
+    """Marca a pendente mais antiga como em execução por ``trabalhador`` e a retorna (ou None)"""
+    agora = timezone.now()
+    marcar = {
+        'status': 'executando',
+        'trabalhador': trabalhador,
+        'iniciado_em': agora,
+        'batimento_em': agora,
+        'tentativas': F('tentativas') + 1,
+    }
+    pendentes = Tarefa.objects.filter(status='pendente').order_by('id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            tarefa_id = pendentes.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if tarefa_id is None:
+                return None
+            Tarefa.objects.filter(id=tarefa_id).update(**marcar)
+        return Tarefa.objects.get(id=tarefa_id)
+
+    while True:
+        tarefa_id = pendentes.values_list('id', flat=True).first()
+        if tarefa_id is None:
+            return None
+        # Outro trabalhador pode ter levado esta entre a leitura e o UPDATE: tentar a próxima
+        if Tarefa.objects.filter(id=tarefa_id, status='pendente').update(**marcar):
+            return Tarefa.objects.get(id=tarefa_id)
+
+
+def executar(tarefa):
+    """Executa a tarefa reivindicada e grava o resultado ou o erro (com o traceback)"""
+    # Só o trabalhador que a reivindicou grava o desfecho (ela pode ter sido dada como abandonada)
+    linha = Tarefa.objects.filter(id=tarefa.id, status='executando', trabalhador=tarefa.trabalhador)
+    try:
+        funcao = TIPOS.get(tarefa.tipo)
+        if funcao is None:
+            raise ValueError(f'Tipo de tarefa desconhecido: {tarefa.tipo}')
+        resultado = funcao(tarefa, Progresso(tarefa), **tarefa.parametros)
+    except Exception as erro:
+        logger.exception('Tarefa %s (%s) falhou', tarefa.id, tarefa.tipo)
+        linha.update(
+            status='erro',
+            mensagem=(str(erro) or type(erro).__name__)[:200],
+            erro=traceback.format_exc(),
+            concluido_em=timezone.now(),
+        )
+        return False
+    linha.update(
+        status='concluida',
+        progresso=100,
+        mensagem='',
+        resultado=resultado or {},
+        concluido_em=timezone.now(),
+    )
+    return True
+
+
+def trabalhar(trabalhador=None, intervalo=1.0, parada=None, ate_esvaziar=False):
+    """Executa tarefas da fila até ``parada`` (threading.Event) ser sinalizada; retorna quantas executou
+
+    Com ``ate_esvaziar``, volta assim que não houver mais pendentes.
+    """
+    trabalhador = trabalhador or identificar()
+    executadas = 0
+    while parada is None or not parada.is_set():
+        # Conexões quebradas ou vencidas são renovadas entre uma tarefa e outra (nunca dentro de um atomic de fora)
+        if not connection.in_atomic_block:
+            close_old_connections()
+        try:
+            tarefa = reivindicar(trabalhador)
+            if tarefa is not None:
+                executar(tarefa)
+                executadas += 1
+                continue
+        except DatabaseError:
+            # Banco fora do ar ou travado: tentar de novo no próximo ciclo, sem derrubar o processo
+            # (uma tarefa que não teve o desfecho gravado volta para a fila como abandonada)
+            logger.exception('Falha ao acessar a fila de tarefas')
+        else:
+            if ate_esvaziar:
+                break
+        if parada is None:
+            time.sleep(intervalo)
+        else:
+            parada.wait(intervalo)
+    return executadas
+
+
+def recuperar_abandonadas():
+    """Devolve à fila as tarefas sem batimento recente (ou as encerra com erro, após MAXIMO_TENTATIVAS)"""
+    agora = timezone.now()
+    limite = agora - timedelta(seconds=getattr(settings, 'RANKING_TAREFAS_ABANDONO', 600))
+    abandonadas = Tarefa.objects.filter(status='executando', batimento_em__lt=limite)
+    reenfileiradas = abandonadas.filter(tentativas__lt=MAXIMO_TENTATIVAS).update(
+        status='pendente', trabalhador='', mensagem='Reenfileirada: o trabalhador parou de responder'
+    )
+    # As que sobraram já esgotaram as tentativas
+    abandonadas.update(status='erro', mensagem='O trabalhador parou de responder', concluido_em=agora)
+    return reenfileiradas
+
+
+def limpar_antigas():
+    """Apaga as tarefas finalizadas há mais de ``RANKING_TAREFAS_RETENCAO_DIAS`` dias e os arquivos gerados"""
+    limite = timezone.now() - timedelta(days=getattr(settings, 'RANKING_TAREFAS_RETENCAO_DIAS', 7))
+    antigas = Tarefa.objects.filter(status__in=['concluida', 'erro'], concluido_em__lt=limite)
+    for resultado in antigas.exclude(resultado__isnull=True).values_list('resultado', flat=True):
+        if isinstance(resultado, dict) and resultado.get('arquivo'):
+            default_storage.delete(resultado['arquivo'])
+    return antigas.delete()[0]
+
+
+def manutencao():
+    """Rotina periódica do ``run_workers``: abandonadas de volta à fila e limpeza das antigas"""
+    reenfileiradas = recuperar_abandonadas()
+    if reenfileiradas:
+        logger.warning('%s tarefa(s) abandonada(s) de volta à fila', reenfileiradas)
+    limpar_antigas()
+
+
+# Tipos de tarefa
+
+@tarefa('recalcular_medias')
+def _recalcular_medias(tarefa, progresso, processo_id):
+    """Recalcula do zero as médias do processo, em lotes (uma transação curta por lote)"""
+    ranking_ids = list(
+        RankingCandidato.objects.filter(processo_seletivo_id=processo_id).order_by('id').values_list('id', flat=True)
+    )
+    for inicio in range(0, len(ranking_ids), TAMANHO_LOTE):
+        with transaction.atomic():
+            RankingCandidato.objects.filter(id__in=ranking_ids[inicio:inicio + TAMANHO_LOTE]).recalcular_medias()
+        progresso(inicio + TAMANHO_LOTE, len(ranking_ids), 'Recalculando as médias')
+    ProcessoSeletivo.invalidar_quadros([processo_id])
+    publicar_evento(processo_id, 'quadro')
+    return {'resumo': f'{len(ranking_ids)} média(s) recalculada(s).'}
+
+
+@tarefa('importar_candidatos')
+def _importar_candidatos(tarefa, progresso, processo_id, arquivo):
+    """Importa o CSV guardado em ``arquivo`` (no storage) e o apaga ao terminar"""
+    processo = ProcessoSeletivo.objects.get(id=processo_id)
+    tamanho = default_storage.size(arquivo)
+    try:
+        with default_storage.open(arquivo, 'rb') as binario:
+            resultado = importar_candidatos(
+                processo,
+                abrir_texto(binario),
+                progresso=lambda parcial: progresso(
+                    binario.tell(), tamanho, f'{parcial.linhas} linha(s) processada(s)'
+                ),
+            )
+    finally:
+        default_storage.delete(arquivo)
+    publicar_evento(processo.id, 'quadro')
+    return {
+        'resumo': (
+            f'{resultado.linhas} linha(s): {resultado.adicionados_ao_processo} adicionado(s) ao processo, '
+            f'{resultado.candidatos_criados} candidato(s) novo(s), {resultado.ja_no_processo} já no processo, '
+            f'{resultado.total_erros} com erro.'
+        ),
+        'erros': resultado.erros[:MAXIMO_ERROS_RESULTADO],
+        'erros_omitidos': resultado.total_erros - min(len(resultado.erros), MAXIMO_ERROS_RESULTADO),
+    }
+
+
+@tarefa('aplicar_auto_tier')
+def _aplicar_auto_tier(tarefa, progresso, processo_id, metodo, parametros=None, incluir_fixados=False):
+    processo = ProcessoSeletivo.objects.get(id=processo_id)
+    progresso(0, 1, 'Calculando os tiers')
+    proposta = aplicar_tiers(processo, metodo, parametros, incluir_fixados)
+    if proposta.mudancas:
+        publicar_evento(processo.id, 'quadro')
+    resumo = f'{len(proposta.mudancas)} candidato(s) mudaram de tier.'
+    if proposta.fixados:
+        resumo += f' {proposta.fixados} candidato(s) com tier fixado manualmente foram mantidos.'
+    return {'resumo': resumo}
+
+
+@tarefa('exportar_ranking')
+def _exportar_ranking(tarefa, progresso, processo_id, formato='xlsx'):
+    """Gera a planilha no storage (``exportacoes/``); o resultado aponta o arquivo para download"""
+    processo = ProcessoSeletivo.objects.get(id=processo_id)
+    nome_arquivo = f'ranking-{slugify(processo.titulo) or processo.id}.{formato}'
+    progresso(0, 1, 'Gerando o arquivo')
+    with tempfile.TemporaryFile() as temporario:
+        if formato == 'xlsx':
+            gravar_xlsx(processo, temporario)
+        else:
+            for pedaco in gerar_csv(processo):
+                temporario.write(pedaco.encode('utf-8'))
+        temporario.seek(0)
+        caminho = default_storage.save(f'exportacoes/{tarefa.id}/{nome_arquivo}', File(temporario))
+    return {'resumo': 'Arquivo pronto para download.', 'arquivo': caminho, 'nome_arquivo': nome_arquivo}
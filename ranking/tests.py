@@ -1,3 +1,1408 @@
-from django.test import TestCase
+import asyncio
+import codecs
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from datetime import date, timedelta
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import CriterioAdmin
+from .autotier import aplicar_tiers, indices_por_agrupamento, indices_por_limiares, indices_por_quantis
+from .benchmark import executar_benchmark, semear
+from .busca import RESULTADOS_POR_PAGINA, buscar
+from .cache import chave_quadro
+from .eventos import BrokerMemoria, obter_broker
+from .estatisticas import calcular_estatisticas, obter_estatisticas, reconstruir_estatisticas
+from .importacao import importar_candidatos
+from .models import (
+    ArquivoCurriculo, ProcessoSeletivo, Candidato, RankingCandidato, Criterio, AvaliacaoCriterio, AvaliacoesDiarias,
+    Tarefa,
+)
+from .ordenacao import chave_entre, chave_para_posicao, chaves_apos, chaves_distribuidas, rebalancear_tier
+from .tarefas import enfileirar, executar, recuperar_abandonadas, reivindicar, trabalhar
+from .views import CARDS_POR_PAGINA, PROCESSOS_POR_PAGINA
+
+
+def criar_processo(num_candidatos=1, num_criterios=1, avaliar=True):
+    """Cria um processo com candidatos, critérios e (opcionalmente) todas as avaliações"""
+    processo = ProcessoSeletivo.objects.create(
+        titulo='Processo de Teste',
+        descricao='Descrição',
+        vaga='Desenvolvedor',
+        data_inicio=date.today(),
+    )
+    criterios = [
+        Criterio.objects.create(processo_seletivo=processo, nome=f'Critério {i}', peso=i + 1, ordem=i)
+        for i in range(num_criterios)
+    ]
+    rankings = []
+    for i in range(num_candidatos):
+        candidato = Candidato.objects.create(
+            nome=f'Candidato {processo.id}-{i}',
+            email=f'candidato{processo.id}-{i}@exemplo.com',
+        )
+        ranking = RankingCandidato.objects.create(candidato=candidato, processo_seletivo=processo)
+        if avaliar:
+            for criterio in criterios:
+                AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterio, nota=7)
+        rankings.append(ranking)
+    return processo, criterios, rankings
+
+
+class AvaliarCandidatoModalTests(TestCase):
+
+    def contar_consultas(self, ranking):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('avaliar_candidato_modal', args=[ranking.id]))
+        self.assertEqual(response.status_code, 200)
+        return len(consultas), response
+
+    def test_numero_de_consultas_nao_depende_dos_criterios(self):
+        _, _, (ranking_pequeno,) = criar_processo(num_criterios=1)
+        _, _, (ranking_grande,) = criar_processo(num_criterios=12)
+
+        consultas_pequeno, _ = self.contar_consultas(ranking_pequeno)
+        consultas_grande, _ = self.contar_consultas(ranking_grande)
+
+        self.assertEqual(consultas_pequeno, consultas_grande)
+        # ETag, ranking com candidato e processo, critérios com avaliações
+        self.assertEqual(consultas_grande, 3)
+
+    def test_media_ponderada_calculada_das_mesmas_linhas(self):
+        _, criterios, (ranking,) = criar_processo(num_criterios=2, avaliar=False)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=10)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[1], nota=4)
+
+        _, response = self.contar_consultas(ranking)
+
+        # (10 * 1 + 4 * 2) / 3
+        self.assertEqual(str(response.context['media_ponderada']), '6.00')
+        self.assertIsNotNone(response.context['criterios'][0]['avaliacao'])
+
+    def test_criterio_sem_avaliacao(self):
+        _, _, (ranking,) = criar_processo(num_criterios=3, avaliar=False)
+
+        _, response = self.contar_consultas(ranking)
+
+        self.assertIsNone(response.context['media_ponderada'])
+        self.assertEqual(len(response.context['criterios']), 3)
+        self.assertTrue(all(c['avaliacao'] is None for c in response.context['criterios']))
+
+
+class MediaPonderadaArmazenadaTests(TestCase):
+
+    def assertMediaConsistente(self, ranking, media):
+        """A média mantida pelos deltas bate com a esperada e com o recálculo do zero"""
+        armazenado = RankingCandidato.objects.filter(pk=ranking.pk).values(*RankingCandidato.CAMPOS_MEDIA).get()
+        RankingCandidato.objects.filter(pk=ranking.pk).recalcular_medias()
+        recalculado = RankingCandidato.objects.filter(pk=ranking.pk).values(*RankingCandidato.CAMPOS_MEDIA).get()
+        self.assertEqual(armazenado, recalculado)
+        self.assertEqual(str(armazenado['media_ponderada']) if media is not None else None, media)
+
+    def test_criar_alterar_e_apagar_avaliacao(self):
+        _, criterios, (ranking,) = criar_processo(num_criterios=2, avaliar=False)
+
+        avaliacao = AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=7)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[1], nota=4)
+        # (7 * 1 + 4 * 2) / 3
+        self.assertMediaConsistente(ranking, '5.00')
+
+        avaliacao.nota = 10
+        avaliacao.save()
+        self.assertMediaConsistente(ranking, '6.00')
+
+        avaliacao.delete()
+        self.assertMediaConsistente(ranking, '4.00')
+
+        AvaliacaoCriterio.objects.get(ranking=ranking, criterio=criterios[1]).delete()
+        self.assertMediaConsistente(ranking, None)
+
+    def test_media_de_somas_inteiras_nao_e_truncada(self):
+        _, criterios, (ranking,) = criar_processo(num_criterios=2, avaliar=False)
+        Criterio.objects.filter(pk=criterios[1].pk).update(peso=1)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=5)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=Criterio.objects.get(pk=criterios[1].pk), nota=6)
+
+        self.assertMediaConsistente(ranking, '5.50')
+
+    def test_mudanca_de_peso_do_criterio(self):
+        _, criterios, (ranking,) = criar_processo(num_criterios=2, avaliar=False)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=10)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[1], nota=4)
+
+        criterios[1].peso = 4
+        criterios[1].save()
+
+        # (10 * 1 + 4 * 4) / 5
+        self.assertMediaConsistente(ranking, '5.20')
+
+    def test_exclusao_de_criterio(self):
+        _, criterios, (ranking,) = criar_processo(num_criterios=2, avaliar=False)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=10)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[1], nota=4)
+
+        criterios[1].delete()
+
+        self.assertMediaConsistente(ranking, '10.00')
+
+    def test_exclusao_de_criterios_em_lote_no_admin(self):
+        processo, criterios, (ranking,) = criar_processo(num_criterios=2, avaliar=False)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=10)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[1], nota=4)
+        versao = processo.versao_quadro
+
+        CriterioAdmin(Criterio, admin.site).delete_queryset(None, Criterio.objects.filter(pk=criterios[0].pk))
+
+        self.assertMediaConsistente(ranking, '4.00')
+        processo.refresh_from_db()
+        self.assertGreater(processo.versao_quadro, versao)
+
+    def test_instancia_desatualizada_nao_sobrescreve_a_media(self):
+        _, criterios, (ranking,) = criar_processo(num_criterios=1, avaliar=False)
+        desatualizado = RankingCandidato.objects.get(pk=ranking.pk)
+        AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=8)
+
+        desatualizado.tier = 'A'
+        desatualizado.save()
+
+        self.assertMediaConsistente(ranking, '8.00')
+        self.assertEqual(RankingCandidato.objects.get(pk=ranking.pk).tier, 'A')
+
+
+class SalvarAvaliacaoTests(TestCase):
+
+    def salvar(self, ranking, criterio, **dados):
+        return self.client.post(reverse('salvar_avaliacao', args=[ranking.id, criterio.id]), dados)
+
+    def test_fragmentos_da_nota_salva(self):
+        _, criterios, (ranking,) = criar_processo(num_criterios=2, avaliar=False)
+        self.salvar(ranking, criterios[0], nota='9')
+
+        response = self.salvar(ranking, criterios[1], nota='4')
+        html = response.content.decode()
+
+        self.assertIn(f'id="criterio-avaliacao-{criterios[1].id}"', html)
+        self.assertNotIn(f'id="criterio-avaliacao-{criterios[0].id}"', html)
+        # Média ponderada: (9 * 1 + 4 * 2) / 3
+        media = re.search(r'<div id="media-ponderada" hx-swap-oob="true">(.*?)</div>\s*</div>', html, re.S).group(1)
+        self.assertIn('5,67', media)
+        notas = re.search(rf'<div id="card-notas-{ranking.id}"[^>]*hx-swap-oob="true">(.*?)</div>\s*</div>', html, re.S)
+        self.assertEqual(
+            re.findall(r'rounded-full (bg-\w+-\d+)" title="([^"]+)"', notas.group(1)),
+            [('bg-green-500', 'Critério 0: 9,00'), ('bg-red-500', 'Critério 1: 4,00')],
+        )
+
+    def test_anotacao_apagada(self):
+        _, (criterio,), (ranking,) = criar_processo(avaliar=False)
+        self.assertContains(self.salvar(ranking, criterio, nota='7', anotacao='Boa comunicação'), 'Boa comunicação')
+
+        response = self.salvar(ranking, criterio, nota='7', anotacao='  ')
+
+        self.assertIsNone(AvaliacaoCriterio.objects.get(ranking=ranking, criterio=criterio).anotacao)
+        self.assertNotContains(response, 'Boa comunicação')
+        self.assertNotContains(response, 'None</textarea>')
+
+    def test_nota_invalida_mostra_erro_no_fragmento(self):
+        _, (criterio,), (ranking,) = criar_processo(avaliar=False)
+
+        response = self.salvar(ranking, criterio, nota='11')
+
+        self.assertContains(response, 'Nota deve estar entre 0 e 10')
+        self.assertContains(response, 'Não avaliado')
+        self.assertFalse(AvaliacaoCriterio.objects.exists())
+
+    def test_criterio_de_outro_processo(self):
+        _, _, (ranking,) = criar_processo(avaliar=False)
+        _, (outro_criterio,), _ = criar_processo(num_candidatos=0)
+
+        response = self.salvar(ranking, outro_criterio, nota='7')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(AvaliacaoCriterio.objects.exists())
+
+
+class EstatisticasDashboardTests(TestCase):
+
+    def comparaveis(self, estatisticas):
+        campos = ['processos_ativos', 'candidatos', 'rankings_pendentes', 'rankings_completos',
+                  'avaliados_recentes', 'por_tier']
+        return {campo: estatisticas[campo] for campo in campos}
+
+    def test_calculo_ao_vivo_em_uma_consulta(self):
+        criar_processo(num_candidatos=3)
+
+        with CaptureQueriesContext(connection) as consultas:
+            estatisticas = calcular_estatisticas()
+
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(estatisticas['processos_ativos'], 1)
+        self.assertEqual(estatisticas['candidatos'], 3)
+        self.assertEqual(estatisticas['rankings_pendentes'], 3)
+
+    def test_linha_materializada_acompanha_as_alteracoes(self):
+        reconstruir_estatisticas()
+        processo, _, rankings = criar_processo(num_candidatos=4)
+
+        self.client.post(reverse('update_ranking_tier', args=[rankings[0].id]), {'tier': 'S'})
+        self.client.post(
+            reverse('reordenar_tiers', args=[processo.id]),
+            data=json.dumps({'colunas': {'A': [rankings[1].id, rankings[2].id], 'S': [rankings[0].id]}}),
+            content_type='application/json',
+        )
+        rankings[3].candidato.delete()
+        processo.status = 'finalizado'
+        processo.save()
+
+        with CaptureQueriesContext(connection) as consultas:
+            materializadas = obter_estatisticas()
+
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(self.comparaveis(materializadas), self.comparaveis(calcular_estatisticas()))
+        self.assertEqual(materializadas['tier_s'], 1)
+        self.assertEqual(materializadas['tier_a'], 2)
+        self.assertEqual(materializadas['avaliados_recentes'], 3)
+
+    def test_instancia_salva_varias_vezes(self):
+        reconstruir_estatisticas()
+        _, _, (ranking,) = criar_processo()
+
+        # Cada save() compara com o que o anterior gravou: tier, data e observações
+        ranking.tier = 'S'
+        ranking.observacoes_gerais = 'Perfil xilografico'
+        ranking.save()
+        ranking.tier = 'A'
+        ranking.save()
+        ranking.observacoes_gerais = ''
+        ranking.save()
+
+        materializadas = obter_estatisticas()
+        self.assertEqual(self.comparaveis(materializadas), self.comparaveis(calcular_estatisticas()))
+        self.assertEqual((materializadas['tier_s'], materializadas['tier_a']), (0, 1))
+        self.assertEqual(materializadas['avaliados_recentes'], 1)
+        self.assertEqual(buscar('xilografico')[0], [])
+
+
+class ProcessosListTests(TestCase):
+
+    def test_paginacao_por_cursor_percorre_todos_os_processos(self):
+        for _ in range(PROCESSOS_POR_PAGINA + 3):
+            criar_processo(num_candidatos=0)
+
+        response = self.client.get(reverse('processos_list'))
+        primeira = [p.id for p in response.context['processos']]
+        cursor = response.context['proximo_cursor']
+        self.assertEqual(len(primeira), PROCESSOS_POR_PAGINA)
+        self.assertIsNotNone(cursor)
+
+        response = self.client.get(reverse('processos_list'), {'cursor': cursor}, HTTP_HX_REQUEST='true')
+        segunda = [p.id for p in response.context['processos']]
+        self.assertTemplateUsed(response, 'ranking/partials/processos_pagina.html')
+        self.assertIsNone(response.context['proximo_cursor'])
+        self.assertEqual(sorted(primeira + segunda), sorted(ProcessoSeletivo.objects.values_list('id', flat=True)))
+
+    def test_contagens_por_tier_na_mesma_consulta(self):
+        processo, _, rankings = criar_processo(num_candidatos=3, num_criterios=2)
+        rankings[0].tier = 'S'
+        rankings[0].save()
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('processos_list'))
+
+        self.assertEqual(len(consultas), 1)
+        (item,) = response.context['processos']
+        self.assertEqual((item.total_candidatos, item.total_sem_tier, item.total_criterios), (3, 2, 2))
+        self.assertEqual(item.histograma_tiers[0]['total'], 1)
+
+
+class BuscaCandidatosTests(TestCase):
+
+    def setUp(self):
+        self.processo, self.criterios, _ = criar_processo(num_candidatos=0, num_criterios=1)
+        self.jose = Candidato.objects.create(nome='José Antônio', email='jose.antonio@exemplo.com', telefone='+5511988887777')
+        self.maria = Candidato.objects.create(
+            nome='Maria Souza', email='maria@exemplo.com', observacoes='Indicada pelo José'
+        )
+        self.ranking = RankingCandidato.objects.create(candidato=self.maria, processo_seletivo=self.processo, tier='A')
+
+    def ids(self, consulta, cursor=None):
+        return [candidato.id for candidato in buscar(consulta, cursor)[0]]
+
+    def test_relevancia_acentos_e_prefixos(self):
+        # O nome pesa mais que as observações; acentos e maiúsculas não importam
+        self.assertEqual(self.ids('jose'), [self.jose.id, self.maria.id])
+        self.assertEqual(self.ids('ANTÔN jos'), [self.jose.id])
+        self.assertEqual(self.ids('5511988'), [self.jose.id])
+        self.assertEqual(self.ids('souza exemplo'), [self.maria.id])
+        self.assertEqual(self.ids('souza inexistente'), [])
+        self.assertEqual(self.ids('  '), [])
+
+    def test_indice_acompanha_observacoes_e_anotacoes(self):
+        self.ranking.observacoes_gerais = 'Ótima em Python'
+        self.ranking.save()
+        avaliacao = AvaliacaoCriterio.objects.create(
+            ranking=self.ranking, criterio=self.criterios[0], nota=8, anotacao='Domina Kubernetes'
+        )
+        self.assertEqual(self.ids('otima pyth'), [self.maria.id])
+        self.assertEqual(self.ids('kubernetes'), [self.maria.id])
+
+        avaliacao.anotacao = 'Conhece Docker'
+        avaliacao.save()
+        self.assertEqual(self.ids('kubernetes'), [])
+        self.assertEqual(self.ids('docker'), [self.maria.id])
+
+        self.criterios[0].delete()
+        self.assertEqual(self.ids('docker'), [])
+        self.ranking.delete()
+        self.assertEqual(self.ids('python'), [])
+
+        importar_candidatos(self.processo, io.StringIO('nome,email\nJoão Importado,joao@exemplo.com\n'))
+        self.assertEqual(len(self.ids('joao')), 1)
+
+    def test_paginacao_por_cursor(self):
+        for i in range(RESULTADOS_POR_PAGINA + 5):
+            Candidato.objects.create(nome=f'Ana {i}', email=f'ana{i}@exemplo.com')
+
+        response = self.client.get(reverse('buscar_candidatos'), {'q': 'ana'})
+        primeira = [candidato.id for candidato in response.context['resultados']]
+        cursor = response.context['proximo_cursor']
+        self.assertEqual(len(primeira), RESULTADOS_POR_PAGINA)
+        self.assertIsNotNone(cursor)
+
+        response = self.client.get(reverse('buscar_candidatos'), {'q': 'ana', 'cursor': cursor}, HTTP_HX_REQUEST='true')
+        segunda = [candidato.id for candidato in response.context['resultados']]
+        self.assertTemplateUsed(response, 'ranking/partials/busca_pagina.html')
+        self.assertIsNone(response.context['proximo_cursor'])
+        self.assertEqual(
+            sorted(primeira + segunda), sorted(Candidato.objects.filter(nome__startswith='Ana').values_list('id', flat=True))
+        )
+
+
+def docx(texto):
+    """DOCX mínimo com um parágrafo (data fixa no zip: mesmo texto, mesmos bytes)"""
+    conteudo = io.BytesIO()
+    with zipfile.ZipFile(conteudo, 'w') as pacote:
+        pacote.writestr(zipfile.ZipInfo('word/document.xml', date_time=(2024, 1, 1, 0, 0, 0)), (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body><w:p><w:r><w:t>{texto}</w:t></w:r></w:p></w:body></w:document>'
+        ))
+    return conteudo.getvalue()
+
+
+@override_settings(RANKING_CURRICULOS_WORKERS=0)
+class CurriculosTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        configuracao = override_settings(MEDIA_ROOT=self.media.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        _, _, self.rankings = criar_processo(num_candidatos=2, num_criterios=0)
+
+    def enviar(self, ranking, nome, conteudo):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('candidato_curriculo', args=[ranking.candidato_id]), {
+                'ranking_id': ranking.id,
+                'curriculo': SimpleUploadedFile(nome, conteudo),
+            })
+
+    def test_mesmo_conteudo_gravado_uma_vez_e_indexado(self):
+        for ranking in self.rankings:
+            response = self.enviar(ranking, 'cv.docx', docx('Experiência com Kubernetes'))
+            self.assertIsNone(response.context['erro'])
+
+        (arquivo,) = ArquivoCurriculo.objects.all()
+        self.assertEqual(arquivo.candidatos.count(), 2)
+        self.assertEqual((arquivo.extracao, arquivo.texto), ('concluida', 'Experiência com Kubernetes'))
+        self.assertEqual(len(os.listdir(os.path.dirname(arquivo.arquivo.path))), 1)
+        self.assertEqual(len(buscar('experiencia kubern')[0]), 2)
+
+        # Trocar o currículo só apaga o anterior quando ninguém mais o usa
+        self.enviar(self.rankings[0], 'novo.docx', docx('Python'))
+        self.assertTrue(ArquivoCurriculo.objects.filter(id=arquivo.id).exists())
+        self.enviar(self.rankings[1], 'novo.docx', docx('Python'))
+        self.assertFalse(ArquivoCurriculo.objects.filter(id=arquivo.id).exists())
+        self.assertFalse(os.path.exists(arquivo.arquivo.path))
+
+    def test_tipo_e_tamanho_validados_durante_o_envio(self):
+        erros = {
+            'cv.txt': (docx('x'), 'PDF, DOC ou DOCX'),
+            'cv.pdf': (docx('x'), 'não corresponde'),
+        }
+        for nome, (conteudo, erro) in erros.items():
+            with self.subTest(nome):
+                self.assertIn(erro, self.enviar(self.rankings[0], nome, conteudo).context['erro'])
+        with override_settings(RANKING_CURRICULOS_MAX_MB=0):
+            self.assertIn('no máximo', self.enviar(self.rankings[0], 'cv.pdf', b'%PDF-1.4').context['erro'])
+        self.assertFalse(ArquivoCurriculo.objects.exists())
+
+
+class CacheQuadroTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_escrita_muda_a_chave_e_o_quadro_e_renderizado_de_novo(self):
+        processo, _, (ranking,) = criar_processo()
+        url = reverse('processo_ranking', args=[processo.id])
+        self.assertContains(self.client.get(url), 'bg-yellow-500')
+
+        # Mesma versão: o quadro sai do cache, sem ser montado de novo
+        processo.refresh_from_db()
+        chave = chave_quadro(processo)
+        cache.set(chave, {'html': '<p id="quadro-do-cache"></p>'})
+        self.assertContains(self.client.get(url), 'quadro-do-cache')
+
+        avaliacao = ranking.avaliacoes_criterios.get()
+        avaliacao.nota = 9
+        avaliacao.save()
+
+        processo.refresh_from_db()
+        self.assertNotEqual(chave_quadro(processo), chave)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'quadro-do-cache')
+        self.assertContains(response, 'bg-green-500')
+        self.assertNotContains(response, 'bg-yellow-500')
+
+    def test_html_cacheado_nao_tem_dados_da_requisicao(self):
+        processo, _, _ = criar_processo()
+        processo.refresh_from_db()
+        url = reverse('processo_ranking', args=[processo.id])
+        tokens = []
+        for cliente in (Client(), Client()):
+            html = cliente.get(url).content.decode()
+            tokens.append(re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', html).group(1))
+            quadro = cache.get(chave_quadro(processo))['html']
+            # O quadro compartilhado entre sessões vai igual para as duas, cada uma com seu token
+            self.assertIn(quadro, html)
+
+        self.assertNotEqual(tokens[0], tokens[1])
+        self.assertNotIn('csrf', quadro.lower())
+        for token in tokens:
+            self.assertNotIn(token, quadro)
+
+
+class QuadroPaginadoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_colunas_carregadas_em_paginas_sem_repeticao(self):
+        processo, _, rankings = criar_processo(num_candidatos=CARDS_POR_PAGINA + 5, num_criterios=2)
+        RankingCandidato.objects.filter(processo_seletivo=processo).update(tier='A')
+
+        response = self.client.get(reverse('processo_ranking', args=[processo.id]))
+        html = response.content.decode()
+        self.assertEqual(len(re.findall(r'data-ranking-id="\d+"', html)), CARDS_POR_PAGINA)
+
+        cursor = re.search(r'tier/A/cards/\?cursor=([\w-]+)', html).group(1)
+        response = self.client.get(reverse('tier_cards', args=[processo.id, 'A']), {'cursor': cursor})
+        self.assertEqual(len(response.context['coluna']['rankings']), 5)
+        self.assertIsNone(response.context['coluna']['proximo_cursor'])
+
+        carregados = re.findall(r'data-ranking-id="(\d+)"', html + response.content.decode())
+        self.assertEqual(sorted(map(int, carregados)), sorted(r.id for r in rankings))
+
+    def test_bolinhas_das_notas_no_card(self):
+        processo, criterios, (ranking,) = criar_processo(num_criterios=4, avaliar=False)
+        for criterio, nota in zip(criterios, [9, '6.5', 0]):
+            AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterio, nota=nota)
+
+        response = self.client.get(reverse('processo_ranking', args=[processo.id]))
+        bolinhas = re.findall(r'rounded-full (bg-\w+-\d+)" title="([^"]+)"', response.content.decode())
+        self.assertEqual(bolinhas, [
+            ('bg-green-500', 'Critério 0: 9,00'),
+            ('bg-yellow-500', 'Critério 1: 6,50'),
+            # Nota zero é avaliada (vermelha), não "Não avaliado"
+            ('bg-red-500', 'Critério 2: 0,00'),
+            ('bg-gray-300', 'Critério 3: Não avaliado'),
+        ])
+
+    def test_tier_invalido(self):
+        processo, _, _ = criar_processo()
+        response = self.client.get(reverse('tier_cards', args=[processo.id, 'X']))
+        self.assertEqual(response.status_code, 400)
+
+
+class OrdenacaoTests(TestCase):
+
+    def assertChavesValidas(self, chaves):
+        """Chaves estritamente crescentes e sem '0' no fim (senão nada caberia logo antes delas)"""
+        self.assertEqual(chaves, sorted(set(chaves)))
+        for chave in chaves:
+            self.assertTrue(chave and not chave.endswith('0'), chave)
+
+    def test_chave_entre_limites(self):
+        casos = [(None, None), ('a', None), (None, 'a'), (None, '1'), ('a', 'b'), ('az', 'b'), ('a', 'a1'), ('azz', 'b')]
+        for antes, depois in casos:
+            with self.subTest(antes=antes, depois=depois):
+                chave = chave_entre(antes, depois)
+                self.assertChavesValidas([c for c in (antes, chave, depois) if c is not None])
+
+        for antes, depois in [('b', 'a'), ('a', 'a')]:
+            with self.subTest(antes=antes, depois=depois), self.assertRaises(ValueError):
+                chave_entre(antes, depois)
+
+    def test_insercoes_repetidas_no_mesmo_ponto(self):
+        chaves = [chave_entre()]
+        chaves.append(chave_entre(chaves[0], None))
+        for _ in range(50):
+            chaves.insert(0, chave_entre(None, chaves[0]))
+            chaves.insert(2, chave_entre(chaves[1], chaves[2]))
+            chaves.append(chave_entre(chaves[-1], None))
+        self.assertChavesValidas(chaves)
+
+    def test_chaves_distribuidas_e_chaves_apos(self):
+        self.assertEqual(chaves_distribuidas(0), [])
+        for quantidade in (1, 35, 36, 1000):
+            with self.subTest(quantidade=quantidade):
+                chaves = chaves_distribuidas(quantidade)
+                self.assertEqual(len(chaves), quantidade)
+                self.assertChavesValidas(chaves)
+
+        for antes in (None, 'i', 'zz'):
+            with self.subTest(antes=antes):
+                chaves = chaves_apos(antes, 40)
+                self.assertChavesValidas(([antes] if antes else []) + chaves)
+
+    def test_chave_para_posicao(self):
+        processo, _, rankings = criar_processo(num_candidatos=3, avaliar=False)
+        for ranking, chave in zip(rankings, ['a', 'b', 'c']):
+            RankingCandidato.objects.filter(pk=ranking.pk).update(tier='A', ordem=chave)
+        primeiro, segundo, terceiro = (r.id for r in rankings)
+
+        self.assertTrue('a' < chave_para_posicao(processo.id, 'A', primeiro, segundo) < 'b')
+        # Sem vizinhos: fim do tier
+        self.assertTrue(chave_para_posicao(processo.id, 'A') > 'c')
+        # Vizinhos fora de ordem (quadro desatualizado): usa o próximo card real depois de "antes"
+        self.assertTrue('b' < chave_para_posicao(processo.id, 'A', segundo, primeiro) < 'c')
+        # Só o vizinho de baixo
+        self.assertTrue(chave_para_posicao(processo.id, 'A', None, primeiro) < 'a')
+        # Vizinhos de outro tier são ignorados: no tier vazio o card recebe a primeira chave
+        self.assertEqual(chave_para_posicao(processo.id, 'B', primeiro, segundo), chave_entre())
+
+    def test_rebalancear_tier_mantem_a_ordem(self):
+        processo, _, rankings = criar_processo(num_candidatos=4, avaliar=False)
+        chaves = ['0000000001', '00000000011', '0000000002', 'zzzzzzzzzzzzzzzzzzi']
+        for ranking, chave in zip(rankings, chaves):
+            RankingCandidato.objects.filter(pk=ranking.pk).update(tier='S', ordem=chave)
+        versao = processo.versao_quadro
+
+        self.assertEqual(rebalancear_tier(processo.id, 'S'), 4)
+
+        tier = list(RankingCandidato.objects.filter(processo_seletivo=processo, tier='S').order_by('ordem'))
+        self.assertEqual([r.id for r in tier], [r.id for r in rankings])
+        self.assertEqual([r.ordem for r in tier], chaves_distribuidas(4))
+        processo.refresh_from_db()
+        self.assertGreater(processo.versao_quadro, versao)
+        # Já distribuído: nada a regravar
+        self.assertEqual(rebalancear_tier(processo.id, 'S'), 0)
+
+
+class ReordenarTiersTests(TestCase):
+
+    def reordenar(self, processo, colunas):
+        return self.client.post(
+            reverse('reordenar_tiers', args=[processo.id]),
+            json.dumps({'colunas': colunas}),
+            content_type='application/json',
+        )
+
+    def ordem_da_coluna(self, processo, tier):
+        return list(
+            RankingCandidato.objects.filter(processo_seletivo=processo, tier=tier)
+            .order_by('ordem').values_list('id', flat=True)
+        )
+
+    def test_grava_a_ordem_das_colunas(self):
+        processo, _, rankings = criar_processo(num_candidatos=4)
+        ids = [r.id for r in rankings]
+
+        response = self.reordenar(processo, {'A': [ids[2], ids[0]], 'B': [ids[3], ids[1]]})
+
+        self.assertEqual(response.json()['atualizados'], 4)
+        self.assertEqual(self.ordem_da_coluna(processo, 'A'), [ids[2], ids[0]])
+        self.assertEqual(self.ordem_da_coluna(processo, 'B'), [ids[3], ids[1]])
+        processo.refresh_from_db()
+        self.assertEqual(response.json()['versao'], processo.versao_quadro)
+
+        # Mesma ordem de novo: nada a gravar, versão mantida
+        response = self.reordenar(processo, {'A': [ids[2], ids[0]]})
+        self.assertEqual(response.json(), {'success': True, 'atualizados': 0, 'versao': processo.versao_quadro})
+
+    def test_consultas_nao_dependem_do_tamanho_da_coluna(self):
+        # A primeira avaliação do dia cria a linha de AvaliacoesDiarias: fora da contagem
+        processo, _, (ranking,) = criar_processo()
+        self.reordenar(processo, {'S': [ranking.id]})
+
+        consultas = []
+        for quantidade in (3, 30):
+            processo, _, rankings = criar_processo(num_candidatos=quantidade)
+            with CaptureQueriesContext(connection) as capturadas:
+                response = self.reordenar(processo, {'S': [r.id for r in reversed(rankings)]})
+            self.assertEqual(response.json()['atualizados'], quantidade)
+            consultas.append(len(capturadas))
+
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_tier_invalido(self):
+        processo, _, (ranking,) = criar_processo()
+
+        response = self.reordenar(processo, {'X': [ranking.id]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(RankingCandidato.objects.get(pk=ranking.pk).tier)
+
+
+class ImportacaoCandidatosTests(TestCase):
+
+    def test_importa_em_lotes_reaproveitando_emails(self):
+        processo, _, (ranking,) = criar_processo(num_criterios=0)
+        existente = ranking.candidato
+        outro = Candidato.objects.create(nome='Outro', email='outro@exemplo.com')
+        conteudo = '\n'.join([
+            'Nome,Email,Telefone',
+            f'Já no processo,{existente.email},',
+            'Outro,outro@exemplo.com,',
+            'Novo 1,novo1@exemplo.com,+5511999999999',
+            'Sem email,,',
+            'Novo 2,novo2@exemplo.com,abc',
+            'Novo 3,novo3@exemplo.com,',
+            'Novo 1 de novo,novo1@exemplo.com,',
+        ])
+
+        resultado = importar_candidatos(processo, io.StringIO(conteudo), tamanho_lote=3)
+
+        self.assertEqual(resultado.linhas, 7)
+        self.assertEqual(resultado.candidatos_criados, 2)
+        self.assertEqual(resultado.adicionados_ao_processo, 3)
+        self.assertEqual([linha for linha, _ in resultado.erros], [5, 6])
+        self.assertEqual(Candidato.objects.get(email='novo1@exemplo.com').nome, 'Novo 1')
+
+        ordem = list(
+            RankingCandidato.objects.filter(processo_seletivo=processo, tier__isnull=True)
+            .order_by('ordem').values_list('candidato__email', flat=True)
+        )
+        self.assertEqual(ordem, [existente.email, outro.email, 'novo1@exemplo.com', 'novo3@exemplo.com'])
+
+    def test_upload_sem_coluna_obrigatoria(self):
+        processo, _, _ = criar_processo(num_candidatos=0)
+        arquivo = SimpleUploadedFile('candidatos.csv', b'nome,telefone\nFulano,\n', content_type='text/csv')
+
+        response = self.client.post(reverse('candidatos_importar', args=[processo.id]), {'arquivo': arquivo})
+
+        self.assertIn('email', response.context['error'])
+
+
+class ExportacaoRankingTests(TestCase):
+
+    def test_csv_pivotado_em_uma_consulta(self):
+        processo, criterios, rankings = criar_processo(num_candidatos=3, num_criterios=2, avaliar=False)
+        AvaliacaoCriterio.objects.create(ranking=rankings[1], criterio=criterios[1], nota=9)
+        rankings[1].tier = 'S'
+        rankings[1].save()
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('exportar_ranking', args=[processo.id]))
+            conteudo = b''.join(response.streaming_content).decode('utf-8-sig')
+
+        self.assertEqual(len(consultas), 3)
+        linhas = list(csv.reader(io.StringIO(conteudo)))
+        self.assertEqual(linhas[0], ['Tier', 'Posição', 'Nome', 'E-mail', 'Telefone', 'LinkedIn',
+                                     'Critério 0', 'Critério 1', 'Média Ponderada'])
+        self.assertEqual(len(linhas), 4)
+        self.assertEqual(linhas[1][:3], ['S', '1', rankings[1].candidato.nome])
+        self.assertEqual(linhas[1][6:], ['', '9.00', '9.00'])
+        self.assertEqual([linha[0] for linha in linhas[2:]], ['Sem tier', 'Sem tier'])
+
+    def test_csv_comeca_com_bom_utf8(self):
+        processo, _, _ = criar_processo(num_candidatos=2)
+
+        response = self.client.get(reverse('exportar_ranking', args=[processo.id]))
+        conteudo = b''.join(response.streaming_content)
+
+        # O Excel só lê o CSV como UTF-8 com o BOM, e ele deve vir uma única vez
+        self.assertTrue(conteudo.startswith(codecs.BOM_UTF8))
+        self.assertEqual(conteudo.count(codecs.BOM_UTF8), 1)
+        self.assertTrue(conteudo[len(codecs.BOM_UTF8):].startswith('Tier,'.encode()))
+
+
+class SimulacaoPesosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pesos_atuais_reproduzem_medias_armazenadas(self):
+        (processo_id,) = semear(candidatos=30, criterios=4, densidade=0.6, semente=3)
+
+        dados = self.client.get(reverse('simular_pesos', args=[processo_id])).json()
+
+        armazenadas = dict(
+            RankingCandidato.objects.filter(processo_seletivo_id=processo_id).values_list('id', 'media_ponderada')
+        )
+        self.assertEqual(dados['medias'], dados['medias_atuais'])
+        self.assertEqual(
+            dados['medias'],
+            [None if armazenadas[i] is None else float(armazenadas[i]) for i in dados['ranking_ids']],
+        )
+        self.assertEqual(set(dados['variacoes']), {0})
+
+    def test_simulacao_reordena_sem_gravar_e_usa_cache(self):
+        processo, criterios, rankings = criar_processo(num_candidatos=2, num_criterios=2, avaliar=False)
+        # Peso atual: critério 0 vale 1 e critério 1 vale 2
+        AvaliacaoCriterio.objects.create(ranking=rankings[0], criterio=criterios[0], nota=10)
+        AvaliacaoCriterio.objects.create(ranking=rankings[0], criterio=criterios[1], nota=4)
+        AvaliacaoCriterio.objects.create(ranking=rankings[1], criterio=criterios[0], nota=4)
+        AvaliacaoCriterio.objects.create(ranking=rankings[1], criterio=criterios[1], nota=8)
+        url = reverse('simular_pesos', args=[processo.id])
+
+        dados = self.client.get(url, {f'peso_{criterios[0].id}': '3', f'peso_{criterios[1].id}': '1'}).json()
+
+        self.assertEqual(dados['ranking_ids'], [rankings[0].id, rankings[1].id])
+        self.assertEqual(dados['medias_atuais'], [6.0, 6.67])
+        self.assertEqual(dados['medias'], [8.5, 5.0])
+        self.assertEqual(dados['posicoes'], [1, 2])
+        self.assertEqual(dados['variacoes'], [1, -1])
+        self.assertEqual(Criterio.objects.get(id=criterios[0].id).peso, 1)
+
+        # Matriz já no cache: só a consulta do processo
+        with self.assertNumQueries(1):
+            self.client.get(url, {f'peso_{criterios[1].id}': '0'})
+
+        self.assertEqual(self.client.get(url, {f'peso_{criterios[0].id}': 'x'}).status_code, 400)
+
+
+class AutoTierTests(TestCase):
+
+    def test_metodos_vetorizados(self):
+        medias = np.array([10, 9.5, 8.2, 7.1, 6.0, 5.0, 4.99, 2.0])
+
+        self.assertEqual(indices_por_limiares(medias, [9, 8, 7, 6, 5]).tolist(), [0, 0, 1, 2, 3, 4, 5, 5])
+        self.assertEqual(indices_por_quantis(medias, [25, 25, 25, 25, 0, 0]).tolist(), [0, 0, 1, 1, 2, 2, 3, 3])
+        # Médias empatadas nunca ficam em tiers diferentes
+        self.assertEqual(len(set(indices_por_quantis(np.full(10, 7.0), [10, 10, 20, 20, 20, 20]))), 1)
+        grupos = np.concatenate([np.full(10, 9.5), np.full(10, 7.0), np.full(5, 3.0)])
+        self.assertEqual(len(set(indices_por_agrupamento(grupos).tolist())), 3)
+        self.assertTrue((np.diff(indices_por_agrupamento(np.sort(grupos)[::-1])) >= 0).all())
+
+    def test_agrupamento_com_empates_e_poucos_valores(self):
+        casos = [
+            ([10, 10, 10], [0, 0, 0]),
+            ([6.5], [0]),
+            ([9, 9, 9, 1], [0, 0, 0, 1]),
+            ([7.5] * 5 + [2], [0] * 5 + [1]),
+        ]
+        for medias, esperado in casos:
+            with self.subTest(medias=medias):
+                self.assertEqual(indices_por_agrupamento(np.array(medias, dtype=float)).tolist(), esperado)
+
+    def test_previa_nao_grava_e_aplicar_respeita_fixados(self):
+        processo, criterios, rankings = criar_processo(num_candidatos=4, num_criterios=1, avaliar=False)
+        for ranking, nota in zip(rankings, [9.5, 8.5, 3, 7]):
+            AvaliacaoCriterio.objects.create(ranking=ranking, criterio=criterios[0], nota=nota)
+        # Arrastado à mão para D: fica fixado
+        self.client.post(reverse('update_ranking_tier', args=[rankings[3].id]), {'tier': 'D'})
+        dados = {'metodo': 'limiares', 'limiar_S': 9, 'limiar_A': 8, 'limiar_B': 7, 'limiar_C': 6, 'limiar_D': 5}
+
+        response = self.client.post(reverse('auto_tier', args=[processo.id]), {**dados, 'acao': 'previa'})
+
+        self.assertEqual(len(response.context['proposta'].mudancas), 3)
+        self.assertFalse(RankingCandidato.objects.filter(processo_seletivo=processo, tier__in=['S', 'A']).exists())
+
+        # Inclui o COUNT que decide entre aplicar na requisição ou numa tarefa
+        with self.assertNumQueries(11):
+            self.client.post(reverse('auto_tier', args=[processo.id]), {**dados, 'acao': 'aplicar'})
+
+        tiers = dict(RankingCandidato.objects.filter(processo_seletivo=processo).values_list('id', 'tier'))
+        self.assertEqual([tiers[r.id] for r in rankings], ['S', 'A', 'F', 'D'])
+        self.assertEqual(obter_estatisticas()['tier_s'], 1)
+
+        proposta = aplicar_tiers(processo, 'limiares', [10, 10, 10, 10, 10], incluir_fixados=True)
+        self.assertEqual(len(proposta.mudancas), 3)
+        self.assertEqual(RankingCandidato.objects.filter(processo_seletivo=processo, tier='F').count(), 4)
+
+    def test_reordenar_no_mesmo_tier_nao_fixa(self):
+        _, _, (primeiro, segundo) = criar_processo(num_candidatos=2)
+        RankingCandidato.objects.filter(pk__in=[primeiro.pk, segundo.pk]).update(tier='B')
+        RankingCandidato.objects.filter(pk=primeiro.pk).update(ordem='a')
+        RankingCandidato.objects.filter(pk=segundo.pk).update(ordem='b')
+
+        # Segundo card sobe uma posição dentro de B
+        response = self.client.post(
+            reverse('update_ranking_tier', args=[segundo.id]), {'tier': 'B', 'antes': '', 'depois': primeiro.id}
+        )
+
+        self.assertLess(response.json()['ordem'], 'a')
+        self.assertFalse(RankingCandidato.objects.get(pk=segundo.pk).tier_fixado)
+
+        self.client.post(reverse('update_ranking_tier', args=[segundo.id]), {'tier': 'C'})
+        self.assertTrue(RankingCandidato.objects.get(pk=segundo.pk).tier_fixado)
+
+
+@override_settings(RANKING_TAREFAS_MINIMO_RANKINGS=3, RANKING_TAREFAS_IMPORTACAO_KB=0)
+class TarefasTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        configuracao = override_settings(MEDIA_ROOT=self.media.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.processo, self.criterios, self.rankings = criar_processo(num_candidatos=3, num_criterios=2)
+
+    def progresso(self, tarefa):
+        return self.client.get(reverse('tarefa_progresso', args=[tarefa.id]), HTTP_HX_REQUEST='true')
+
+    def test_peso_alterado_em_processo_grande_recalcula_na_fila(self):
+        avaliacao = AvaliacaoCriterio.objects.get(ranking=self.rankings[0], criterio=self.criterios[0])
+        avaliacao.nota = 10
+        avaliacao.save()
+        criterio = self.criterios[0]
+
+        response = self.client.post(reverse('criterio_update', args=[criterio.id]), {
+            'nome': criterio.nome, 'peso': '5', 'ordem': 0,
+        })
+
+        tarefa = response.context['tarefa']
+        self.assertContains(response, 'hx-trigger="every 1s"')
+        # As médias só mudam quando a tarefa roda
+        self.rankings[0].refresh_from_db()
+        self.assertEqual(float(self.rankings[0].media_ponderada), 8.0)
+
+        self.assertEqual(trabalhar(ate_esvaziar=True), 1)
+
+        self.rankings[0].refresh_from_db()
+        self.assertEqual(float(self.rankings[0].media_ponderada), 9.14)
+        response = self.progresso(tarefa)
+        self.assertContains(response, '3 média(s) recalculada(s)')
+        self.assertNotContains(response, 'every 1s')
+
+    def test_reivindicacao_unica_erro_e_abandonadas(self):
+        tarefa = enfileirar('recalcular_medias', self.processo, processo_id=self.processo.id)
+        self.assertEqual(reivindicar('a').id, tarefa.id)
+        self.assertIsNone(reivindicar('b'))
+
+        # Sem sinal do trabalhador: volta para a fila e outro a executa
+        Tarefa.objects.filter(id=tarefa.id).update(batimento_em=timezone.now() - timedelta(hours=1))
+        self.assertEqual(recuperar_abandonadas(), 1)
+        tarefa = reivindicar('b')
+        self.assertEqual(tarefa.tentativas, 2)
+
+        falha = enfileirar('aplicar_auto_tier', self.processo, processo_id=self.processo.id, metodo='inexistente')
+        with self.assertLogs('ranking.tarefas', 'ERROR'):
+            call_command('run_workers', processos=0, ate_esvaziar=True, stdout=io.StringIO())
+        falha.refresh_from_db()
+        self.assertEqual((falha.status, falha.mensagem), ('erro', 'Método inválido: inexistente'))
+        self.assertIn('Traceback', falha.erro)
+
+        self.assertTrue(executar(tarefa))
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.progresso), ('concluida', 100))
+
+    def test_importacao_grande_e_exportacao_em_segundo_plano(self):
+        arquivo = SimpleUploadedFile('candidatos.csv', b'nome,email\nNova,nova@exemplo.com\n', content_type='text/csv')
+
+        response = self.client.post(reverse('candidatos_importar', args=[self.processo.id]), {'arquivo': arquivo})
+        tarefa = response.context['tarefa']
+        self.assertEqual(len(os.listdir(os.path.join(self.media.name, 'tarefas', 'importacoes'))), 1)
+        trabalhar(ate_esvaziar=True)
+
+        self.assertContains(self.progresso(tarefa), '1 adicionado(s) ao processo')
+        self.assertEqual(self.processo.rankings.count(), 4)
+        self.assertEqual(os.listdir(os.path.join(self.media.name, 'tarefas', 'importacoes')), [])
+
+        exportacao = enfileirar('exportar_ranking', self.processo, processo_id=self.processo.id, formato='csv')
+        trabalhar(ate_esvaziar=True)
+        self.assertContains(self.progresso(exportacao), reverse('tarefa_arquivo', args=[exportacao.id]))
+        response = self.client.get(reverse('tarefa_arquivo', args=[exportacao.id]))
+        self.assertIn('nova@exemplo.com', b''.join(response.streaming_content).decode('utf-8'))
+
+
+class BenchmarkTests(TestCase):
+
+    def test_semear_e_medir_views(self):
+        (processo_id,) = semear(candidatos=30, criterios=3, densidade=1, semente=1)
+
+        self.assertEqual(RankingCandidato.objects.filter(processo_seletivo_id=processo_id).count(), 30)
+        self.assertEqual(AvaliacaoCriterio.objects.filter(ranking__processo_seletivo_id=processo_id).count(), 90)
+        self.assertFalse(RankingCandidato.objects.filter(
+            processo_seletivo_id=processo_id, media_ponderada__isnull=True
+        ).exists())
+
+        resultado = executar_benchmark(tamanhos=[10], criterios=2, repeticoes=1)
+
+        metricas = resultado['resultados']['10']
+        self.assertIn('processo_ranking', metricas)
+        for nome, valores in metricas.items():
+            self.assertEqual(valores['status'], 200, nome)
+            self.assertEqual(set(valores), {'status', 'tempo_ms', 'consultas', 'tempo_sql_ms', 'bytes'})
+        json.dumps(resultado)
+
+
+class ViewsAssincronasTests(TestCase):
+
+    async def test_leituras_assincronas(self):
+        processo, criterios, rankings = await sync_to_async(criar_processo)(num_candidatos=2, num_criterios=2)
+
+        response = await self.async_client.get(reverse('processo_ranking', args=[processo.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['processo'], processo)
+
+        response = await self.async_client.get(reverse('avaliar_candidato_modal', args=[rankings[0].id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.context['criterios']], [c.id for c in criterios])
+        self.assertEqual(str(response.context['media_ponderada']), '7.00')
+
+        response = await self.async_client.get(reverse('criterios_list_modal', args=[processo.id]))
+        self.assertEqual(list(response.context['criterios']), criterios)
+
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(processo, response.context['processos_recentes'])
+
+        response = await self.async_client.get(reverse('processo_ranking', args=[processo.id + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_condicional_responde_304_sem_renderizar(self):
+        processo, criterios, rankings = criar_processo(num_candidatos=2, num_criterios=2)
+        urls = [
+            reverse('processo_ranking', args=[processo.id]),
+            reverse('avaliar_candidato_modal', args=[rankings[0].id]),
+            reverse('criterios_list_modal', args=[processo.id]),
+        ]
+        # A primeira visita cria o cookie CSRF, que entra no ETag
+        self.client.get(urls[0])
+
+        for url in urls:
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response['Cache-Control'], 'private, no-cache')
+                etag = response['ETag']
+
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual((response.status_code, len(consultas)), (304, 1))
+                self.assertIsNone(response.context)
+
+                # Qualquer escrita no processo invalida as cópias
+                criterios[0].peso += 1
+                criterios[0].save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(RANKING_INSTRUMENTACAO=True)
+    async def test_instrumentacao_no_modo_assincrono(self):
+        processo, _, _ = await sync_to_async(criar_processo)()
+
+        with self.assertLogs('ranking.instrumentacao', 'DEBUG') as logs:
+            response = await self.async_client.get(reverse('processo_ranking', args=[processo.id]))
+
+        # As consultas do ORM assíncrono (feitas em outra thread) também são contadas
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="[1-9]\d* consultas"')
+        self.assertGreater(logs.records[0].instrumentacao['consultas'], 0)
+
+    async def test_aplicacao_asgi(self):
+        from tierlist.asgi import application
+
+        comunicador = ApplicationCommunicator(application, {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': reverse('processo_ranking', args=[0]), 'raw_path': b'',
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 1234), 'server': ('localhost', 80),
+        })
+        await comunicador.send_input({'type': 'http.request', 'body': b''})
+        inicio = await comunicador.receive_output(5)
+        await comunicador.wait(5)
+
+        self.assertEqual(inicio['type'], 'http.response.start')
+        self.assertEqual(inicio['status'], 404)
+
+
+class BrokerDeTeste(BrokerMemoria):
+    """Guarda os eventos publicados em vez de distribuí-los"""
+
+    def __init__(self):
+        super().__init__()
+        self.publicados = []
+
+    def publicar(self, processo_id, evento):
+        self.publicados.append((processo_id, evento))
+
+
+class QuadroAoVivoTests(TestCase):
+
+    def setUp(self):
+        obter_broker.cache_clear()
+        self.addCleanup(obter_broker.cache_clear)
+
+    @override_settings(RANKING_EVENTOS_BROKER='ranking.tests.BrokerDeTeste')
+    def test_escritas_publicam_eventos(self):
+        processo, criterios, rankings = criar_processo(num_candidatos=1, num_criterios=1)
+        cabecalho = {'HTTP_X_QUADRO_CLIENTE': 'aba-1'}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_ranking_tier', args=[rankings[0].id]), {'tier': 'S'}, **cabecalho)
+            self.client.post(reverse('salvar_avaliacao', args=[rankings[0].id, criterios[0].id]), {'nota': '9'})
+            self.client.post(reverse('candidato_create', args=[processo.id]), {
+                'nome': 'Nova Pessoa', 'email': 'nova@exemplo.com',
+            })
+            self.client.post(reverse('criterio_create', args=[processo.id]), {'nome': 'Novo', 'peso': '1'})
+
+        eventos = [evento for processo_id, evento in obter_broker().publicados if processo_id == processo.id]
+        self.assertEqual([evento['tipo'] for evento in eventos], ['tier', 'avaliacao', 'candidato', 'criterios'])
+        self.assertEqual(
+            {chave: eventos[0][chave] for chave in ('origem', 'ranking_id', 'de', 'para')},
+            {'origem': 'aba-1', 'ranking_id': rankings[0].id, 'de': 'unranked', 'para': 'S'},
+        )
+        self.assertEqual(eventos[0]['ordem'], RankingCandidato.objects.get(id=rankings[0].id).ordem)
+        self.assertTrue(eventos[2]['novo'])
+
+    async def test_stream_entrega_eventos_publicados(self):
+        processo, _, _ = await sync_to_async(criar_processo)()
+
+        response = await self.async_client.get(reverse('eventos_quadro', args=[processo.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        obter_broker().publicar(processo.id, {'tipo': 'tier', 'ranking_id': 1})
+        obter_broker().publicar(processo.id + 1, {'tipo': 'quadro'})
+        self.assertEqual(await anext(stream), b'data: {"tipo": "tier", "ranking_id": 1}\n\n')
+
+        # Desconexão do navegador: o Django cancela a tarefa que espera o próximo evento
+        proximo = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        proximo.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await proximo
+        self.assertEqual(obter_broker().total_assinantes(processo.id), 0)
+
+    def test_stream_desligado_sob_wsgi_e_card_avulso(self):
+        processo, _, (ranking,) = criar_processo()
+
+        self.assertEqual(self.client.get(reverse('eventos_quadro', args=[processo.id])).status_code, 204)
+
+        response = self.client.get(reverse('card_ranking', args=[ranking.id]))
+        self.assertEqual(response['X-Card-Tier'], 'unranked')
+        self.assertContains(response, f'data-ordem="{ranking.ordem}"')
+        self.assertContains(response, 'bg-yellow-500')
+
+
+class InstrumentacaoTests(TestCase):
+
+    @override_settings(RANKING_INSTRUMENTACAO=True, RANKING_INSTRUMENTACAO_LENTO_MS=0,
+                       RANKING_INSTRUMENTACAO_REPETICOES=2)
+    def test_server_timing_e_log_de_parcial(self):
+        _, criterios, rankings = criar_processo(num_candidatos=1, num_criterios=1)
+
+        with self.assertLogs('ranking.instrumentacao', 'WARNING') as logs:
+            response = self.client.post(
+                reverse('salvar_avaliacao', args=[rankings[0].id, criterios[0].id]),
+                {'nota': '8'},
+                HTTP_HX_REQUEST='true',
+            )
+
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="\d+ consultas"')
+        self.assertIn('desc="parcial salvar_avaliacao"', response['Server-Timing'])
+        dados = logs.records[0].instrumentacao
+        self.assertEqual((dados['view'], dados['tipo'], dados['status']), ('salvar_avaliacao', 'parcial', 200))
+        self.assertGreater(dados['consultas'], 0)
+        self.assertGreater(dados['template_ms'], 0)
+
+    def test_desligada_por_padrao(self):
+        response = self.client.get(reverse('processos_list'))
+
+        self.assertNotIn('Server-Timing', response)
+
+
+class ConsultasConstantesTests(TestCase):
+    """Cada rota deve fazer o mesmo número de consultas num quadro pequeno e num grande
+
+    Um template ou view que passe a acessar uma relação por candidato ou por
+    critério (N+1) quebra o teste, que mostra o SQL das duas execuções.
+    """
+
+    # (candidatos, critérios): o maior passa do tamanho de página das colunas
+    TAMANHOS = [(4, 2), (CARDS_POR_PAGINA * 3, 7)]
+
+    def setUp(self):
+        # Currículos enviados e arquivos exportados ficam fora do MEDIA_ROOT do projeto
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        configuracao = override_settings(MEDIA_ROOT=self.media.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def _medir(self, requisicao, candidatos, criterios):
+        """Semeia um processo do tamanho pedido e captura as consultas da requisição; desfaz tudo no fim"""
+        with transaction.atomic():
+            (processo_id,) = semear(candidatos=candidatos, criterios=criterios, densidade=0.8, semente=7)
+            processo = ProcessoSeletivo.objects.get(id=processo_id)
+            rankings = list(processo.rankings.order_by('tier', 'ordem', 'id'))
+            lista_criterios = list(processo.criterios.order_by('ordem'))
+            # Balde de hoje já existente nos dois tamanhos (senão a primeira avaliação do dia faz um INSERT a mais)
+            AvaliacoesDiarias.objects.get_or_create(dia=timezone.localdate(), defaults={'total': 0})
+            cache.clear()
+
+            with CaptureQueriesContext(connection) as consultas:
+                response = requisicao(processo, lista_criterios, rankings)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+
+        self.assertLess(response.status_code, 400)
+        return [consulta['sql'] for consulta in consultas]
+
+    def assertConsultasConstantes(self, requisicao):
+        # Execução de aquecimento: caches de processo (ContentType, permissões) não entram na conta
+        self._medir(requisicao, *self.TAMANHOS[0])
+        pequeno, grande = (self._medir(requisicao, *tamanho) for tamanho in self.TAMANHOS)
+        if len(pequeno) != len(grande):
+            self.fail(
+                f'{len(pequeno)} consultas no quadro pequeno e {len(grande)} no grande\n\n'
+                + '--- quadro pequeno\n' + '\n'.join(pequeno)
+                + '\n\n--- quadro grande\n' + '\n'.join(grande)
+            )
+
+    def test_paginas(self):
+        rotas = {
+            'processos_list': lambda p, c, r: self.client.get(reverse('processos_list')),
+            'dashboard': lambda p, c, r: self.client.get(reverse('dashboard')),
+            'buscar_candidatos': lambda p, c, r: self.client.get(reverse('buscar_candidatos'), {'q': 'candidato'}),
+            'processo_ranking': lambda p, c, r: self.client.get(reverse('processo_ranking', args=[p.id])),
+            'tier_cards': lambda p, c, r: self.client.get(reverse('tier_cards', args=[p.id, 'unranked'])),
+            'exportar_ranking': lambda p, c, r: self.client.get(reverse('exportar_ranking', args=[p.id])),
+            'auto_tier_form': lambda p, c, r: self.client.get(reverse('auto_tier_form', args=[p.id])),
+            'quadro': lambda p, c, r: self.client.get(reverse('quadro', args=[p.id])),
+            'card_ranking': lambda p, c, r: self.client.get(reverse('card_ranking', args=[r[0].id])),
+            'eventos_quadro': lambda p, c, r: self.client.get(reverse('eventos_quadro', args=[p.id])),
+            'simular_pesos': lambda p, c, r: self.client.get(
+                reverse('simular_pesos', args=[p.id]), {f'peso_{c[0].id}': '5'}
+            ),
+        }
+        for nome, requisicao in rotas.items():
+            with self.subTest(nome):
+                self.assertConsultasConstantes(requisicao)
+
+    def test_modais_e_formularios(self):
+        rotas = {
+            'candidato_create_form': lambda p, c, r: self.client.get(reverse('candidato_create_form', args=[p.id])),
+            'candidatos_importar_form': lambda p, c, r: self.client.get(
+                reverse('candidatos_importar_form', args=[p.id])
+            ),
+            'criterios_list_modal': lambda p, c, r: self.client.get(reverse('criterios_list_modal', args=[p.id])),
+            'criterio_create_form': lambda p, c, r: self.client.get(reverse('criterio_create_form', args=[p.id])),
+            'criterio_edit_form': lambda p, c, r: self.client.get(reverse('criterio_edit_form', args=[c[0].id])),
+            'avaliar_candidato_modal': lambda p, c, r: self.client.get(
+                reverse('avaliar_candidato_modal', args=[r[0].id])
+            ),
+        }
+        for nome, requisicao in rotas.items():
+            with self.subTest(nome):
+                self.assertConsultasConstantes(requisicao)
+
+    def test_escritas(self):
+        csv_importacao = 'nome,email\nNova Pessoa,nova@exemplo.com\nOutra Pessoa,outra@exemplo.com\n'
+        rotas = {
+            'processos_create': lambda p, c, r: self.client.post(reverse('processos_create'), {
+                'titulo': 'Novo', 'vaga': 'Vaga', 'descricao': 'Descrição', 'data_inicio': '2025-01-01',
+            }),
+            'candidato_create': lambda p, c, r: self.client.post(reverse('candidato_create', args=[p.id]), {
+                'nome': 'Nova Pessoa', 'email': 'nova@exemplo.com',
+            }),
+            'candidatos_importar': lambda p, c, r: self.client.post(reverse('candidatos_importar', args=[p.id]), {
+                'arquivo': SimpleUploadedFile('candidatos.csv', csv_importacao.encode(), content_type='text/csv'),
+            }),
+            'candidato_update': lambda p, c, r: self.client.post(
+                reverse('candidato_update', args=[r[0].candidato_id]),
+                {'nome': 'Nome Novo', 'email': 'nome.novo@exemplo.com', 'ranking_id': r[0].id},
+            ),
+            'update_ranking_tier': lambda p, c, r: self.client.post(
+                reverse('update_ranking_tier', args=[r[-1].id]),
+                {'tier': 'S', 'antes': '', 'depois': r[0].id},
+            ),
+            'reordenar_tiers': lambda p, c, r: self.client.post(
+                reverse('reordenar_tiers', args=[p.id]),
+                json.dumps({'colunas': {'A': [r[-1].id, r[-2].id]}}),
+                content_type='application/json',
+            ),
+            'criterio_create': lambda p, c, r: self.client.post(reverse('criterio_create', args=[p.id]), {
+                'nome': 'Novo critério', 'peso': '2',
+            }),
+            'criterio_update': lambda p, c, r: self.client.post(reverse('criterio_update', args=[c[0].id]), {
+                'nome': 'Critério renomeado', 'peso': '3',
+            }),
+            'criterio_delete': lambda p, c, r: self.client.delete(reverse('criterio_delete', args=[c[0].id])),
+            'salvar_avaliacao': lambda p, c, r: self.client.post(
+                reverse('salvar_avaliacao', args=[r[0].id, c[0].id]), {'nota': '6.5'}
+            ),
+            'auto_tier_previa': lambda p, c, r: self.client.post(
+                reverse('auto_tier', args=[p.id]), {'metodo': 'agrupamento', 'acao': 'previa'}
+            ),
+            'auto_tier_aplicar': lambda p, c, r: self.client.post(
+                reverse('auto_tier', args=[p.id]), {'metodo': 'quantis', 'acao': 'aplicar'}
+            ),
+            'salvar_observacoes': lambda p, c, r: self.client.post(
+                reverse('salvar_observacoes', args=[r[0].id]), {'observacoes_gerais': 'Boa entrevista'}
+            ),
+            'candidato_curriculo': lambda p, c, r: self.client.post(
+                reverse('candidato_curriculo', args=[r[0].candidato_id]),
+                {'ranking_id': r[0].id, 'curriculo': SimpleUploadedFile('cv.docx', docx('Experiência com Django'))},
+            ),
+        }
+        for nome, requisicao in rotas.items():
+            with self.subTest(nome):
+                self.assertConsultasConstantes(requisicao)
+
+    def test_tarefas(self):
+        processo, _, _ = criar_processo(num_candidatos=2)
+        tarefa = enfileirar('exportar_ranking', processo, processo_id=processo.id, formato='csv')
+        trabalhar(ate_esvaziar=True)
+        rotas = {
+            'tarefa_progresso': lambda p, c, r: self.client.get(reverse('tarefa_progresso', args=[tarefa.id])),
+            'tarefa_progresso_parcial': lambda p, c, r: self.client.get(
+                reverse('tarefa_progresso', args=[tarefa.id]), HTTP_HX_REQUEST='true'
+            ),
+            'tarefa_arquivo': lambda p, c, r: self.client.get(reverse('tarefa_arquivo', args=[tarefa.id])),
+        }
+        for nome, requisicao in rotas.items():
+            with self.subTest(nome):
+                self.assertConsultasConstantes(requisicao)
+
+    def test_admin_rankings(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        lista = reverse('admin:ranking_rankingcandidato_changelist')
+        rotas = {
+            'changelist': lambda p, c, r: self.client.get(lista),
+            'ordenada_por_media': lambda p, c, r: self.client.get(lista, {'o': '-4'}),
+            'faixa_de_media': lambda p, c, r: self.client.get(lista, {'faixa_media': '6-8'}),
+        }
+        for nome, requisicao in rotas.items():
+            with self.subTest(nome):
+                self.assertConsultasConstantes(requisicao)
+
+    def test_admin_avaliacoes_e_formularios(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        lista = reverse('admin:ranking_avaliacaocriterio_changelist')
+        rotas = {
+            'avaliacoes_changelist': lambda p, c, r: self.client.get(lista),
+            'avaliacoes_faixa_de_nota': lambda p, c, r: self.client.get(lista, {'faixa_nota': '4-6'}),
+            'avaliacao_change': lambda p, c, r: self.client.get(reverse(
+                'admin:ranking_avaliacaocriterio_change', args=[r[0].avaliacoes_criterios.first().id]
+            )),
+            'ranking_change_com_inline': lambda p, c, r: self.client.get(
+                reverse('admin:ranking_rankingcandidato_change', args=[r[0].id])
+            ),
+            'criterio_change': lambda p, c, r: self.client.get(
+                reverse('admin:ranking_criterio_change', args=[c[0].id])
+            ),
+        }
+        for nome, requisicao in rotas.items():
+            with self.subTest(nome):
+                self.assertConsultasConstantes(requisicao)
+
+    def test_admin_demais_listas(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        processo, _, _ = criar_processo(num_candidatos=0)
+        for _ in range(3):
+            enfileirar('recalcular_medias', processo, processo_id=processo.id)
+        rotas = {
+            modelo: lambda p, c, r, modelo=modelo: self.client.get(reverse(f'admin:ranking_{modelo}_changelist'))
+            for modelo in ['candidato', 'processoseletivo', 'criterio', 'tarefa']
+        }
+        for nome, requisicao in rotas.items():
+            with self.subTest(nome):
+                self.assertConsultasConstantes(requisicao)
+
+    def test_inline_so_oferece_criterios_do_processo(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+        _, _, rankings = criar_processo(num_candidatos=1, num_criterios=2)
+        _, outros_criterios, _ = criar_processo(num_candidatos=0, num_criterios=1)
+
+        response = self.client.get(reverse('admin:ranking_rankingcandidato_change', args=[rankings[0].id]))
+
+        self.assertContains(response, 'Critério 1')
+        self.assertNotContains(response, f'value="{outros_criterios[0].id}"')
+
+
+class MigracoesTests(TransactionTestCase):
+
+    def migrar(self, alvo):
+        """Leva o banco até a migração ``alvo`` do app e devolve os models históricos desse ponto"""
+        executor = MigrationExecutor(connection)
+        executor.migrate([('ranking', alvo)])
+        executor.loader.build_graph()
+        return executor.loader.project_state([('ranking', alvo)]).apps
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes('ranking')[0][1])
+
+    def test_0004_preenche_medias_sem_divisao_inteira(self):
+        apps = self.migrar('0003_alter_criterio_peso')
+        processo = apps.get_model('ranking', 'ProcessoSeletivo').objects.create(
+            titulo='Processo', descricao='Descrição', vaga='Vaga', data_inicio=date.today(),
+        )
+        Criterio = apps.get_model('ranking', 'Criterio')
+        criterios = [
+            Criterio.objects.create(processo_seletivo=processo, nome=f'Critério {i}', peso=1) for i in range(2)
+        ]
+        candidato = apps.get_model('ranking', 'Candidato').objects.create(nome='Candidato', email='c@exemplo.com')
+        ranking = apps.get_model('ranking', 'RankingCandidato').objects.create(
+            candidato=candidato, processo_seletivo=processo,
+        )
+        for criterio, nota in zip(criterios, [5, 6]):
+            apps.get_model('ranking', 'AvaliacaoCriterio').objects.create(ranking=ranking, criterio=criterio, nota=nota)
+
+        apps = self.migrar('0004_rankingcandidato_media_ponderada')
+
+        ranking = apps.get_model('ranking', 'RankingCandidato').objects.get(pk=ranking.pk)
+        # 11 / 2 com somas inteiras no SQLite: sem o cast a média seria 5
+        self.assertEqual(str(ranking.media_ponderada), '5.50')
+
+    def test_0006_converte_ordem_inteira_em_chaves(self):
+        apps = self.migrar('0005_processoseletivo_versao_quadro')
+        processo = apps.get_model('ranking', 'ProcessoSeletivo').objects.create(
+            titulo='Processo', descricao='Descrição', vaga='Vaga', data_inicio=date.today(),
+        )
+        Candidato = apps.get_model('ranking', 'Candidato')
+        RankingHistorico = apps.get_model('ranking', 'RankingCandidato')
+        # (tier, ordem inteira); ordens repetidas no mesmo tier mantêm o desempate por id
+        posicoes = [('A', 2), ('A', 0), ('A', 1), ('A', 1), ('B', 0), (None, 5), (None, 3)]
+        ids = [
+            RankingHistorico.objects.create(
+                candidato=Candidato.objects.create(nome=f'Candidato {i}', email=f'c{i}@exemplo.com'),
+                processo_seletivo=processo, tier=tier, ordem=ordem,
+            ).pk
+            for i, (tier, ordem) in enumerate(posicoes)
+        ]
+
+        apps = self.migrar('0006_rankingcandidato_ordem_fracionaria')
+
+        RankingHistorico = apps.get_model('ranking', 'RankingCandidato')
+        for tier, esperado in [('A', [ids[1], ids[2], ids[3], ids[0]]), ('B', [ids[4]]), (None, [ids[6], ids[5]])]:
+            with self.subTest(tier=tier):
+                chaves = list(
+                    RankingHistorico.objects.filter(tier=tier).order_by('ordem').values_list('id', 'ordem')
+                )
+                self.assertEqual([pk for pk, _ in chaves], esperado)
+                self.assertEqual([chave for _, chave in chaves], chaves_distribuidas(len(esperado)))
@@ -3,12 +3,28 @@ from . import views
 
 urlpatterns = [
     path('', views.processos_list, name='processos_list'),
+    path('dashboard/', views.dashboard, name='dashboard'),
+    path('busca/', views.buscar_candidatos, name='buscar_candidatos'),
     path('processos/create/', views.processos_create, name='processos_create'),
     path('processos/<int:processo_id>/ranking/', views.processo_ranking, name='processo_ranking'),
+    path('processos/<int:processo_id>/quadro/', views.quadro, name='quadro'),
+    path('processos/<int:processo_id>/eventos/', views.eventos_quadro, name='eventos_quadro'),
+    path('processos/<int:processo_id>/tier/<str:tier>/cards/', views.tier_cards, name='tier_cards'),
+    path('processos/<int:processo_id>/exportar/', views.exportar_ranking, name='exportar_ranking'),
     path('processos/<int:processo_id>/candidato/create-form/', views.candidato_create_form, name='candidato_create_form'),
     path('processos/<int:processo_id>/candidato/create/', views.candidato_create, name='candidato_create'),
+    path('processos/<int:processo_id>/candidatos/importar-form/', views.candidatos_importar_form, name='candidatos_importar_form'),
+    path('processos/<int:processo_id>/candidatos/importar/', views.candidatos_importar, name='candidatos_importar'),
     path('candidato/<int:candidato_id>/update/', views.candidato_update, name='candidato_update'),
+    path('candidato/<int:candidato_id>/curriculo/', views.candidato_curriculo, name='candidato_curriculo'),
     path('ranking/<int:ranking_id>/update-tier/', views.update_ranking_tier, name='update_ranking_tier'),
+    path('ranking/<int:ranking_id>/card/', views.card_ranking, name='card_ranking'),
+    path('processos/<int:processo_id>/reordenar/', views.reordenar_tiers, name='reordenar_tiers'),
+    path('processos/<int:processo_id>/simular-pesos/', views.simular_pesos, name='simular_pesos'),
+    path('processos/<int:processo_id>/auto-tier-form/', views.auto_tier_form, name='auto_tier_form'),
+    path('processos/<int:processo_id>/auto-tier/', views.auto_tier, name='auto_tier'),
+    path('tarefas/<int:tarefa_id>/', views.tarefa_progresso, name='tarefa_progresso'),
+    path('tarefas/<int:tarefa_id>/arquivo/', views.tarefa_arquivo, name='tarefa_arquivo'),
     
     # URLs de Critérios
     path('processos/<int:processo_id>/criterios/', views.criterios_list_modal, name='criterios_list_modal'),
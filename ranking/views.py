@@ -1,45 +1,94 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+import csv
+import json
+import tempfile
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib import messages
-from django.db.models import Count, Q
-from .models import ProcessoSeletivo, Candidato, RankingCandidato, Criterio, AvaliacaoCriterio
+from django.db import transaction
+from django.db.models import Count, F, FilteredRelation, Func, IntegerField, OuterRef, Q, Subquery, Value
+from django.utils import formats, timezone
+from django.utils.text import slugify
+from django.utils.safestring import mark_safe
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from .autotier import LIMIARES_PADRAO, METODOS, QUANTIS_PADRAO, TIERS, aplicar_tiers, propor_tiers
+from .busca import buscar
+from .cache import aobter_quadro, condicional, etag
+from .curriculos import CurriculoUploadHandler, anexar
+from .eventos import obter_broker, origem_da_requisicao, publicar_evento
+from .estatisticas import JANELA_DIAS, obter_estatisticas, registrar_avaliacoes, registrar_mudancas_tier
+from .exportacao import gerar_csv, gravar_xlsx, xlsx_disponivel
+from .importacao import abrir_texto, importar_candidatos
+from .models import ProcessoSeletivo, Candidato, RankingCandidato, Criterio, AvaliacaoCriterio, Tarefa
+from .ordenacao import agendar_rebalanceamento, chave_para_posicao, chaves_distribuidas, precisa_rebalancear
+from .paginacao import codificar_cursor, decodificar_cursor, fatiar_pagina
+from .simulacao import simular
+from .tarefas import enfileirar, processo_grande
+
+
+# Processos por página na listagem
+PROCESSOS_POR_PAGINA = 24
+
+# Cards por página em cada coluna do quadro
+CARDS_POR_PAGINA = 40
 
+# Cores de cada tier (as mesmas dos cabeçalhos do quadro)
+CORES_TIER = {
+    'S': 'bg-red-400',
+    'A': 'bg-orange-400',
+    'B': 'bg-yellow-400',
+    'C': 'bg-lime-400',
+    'D': 'bg-green-400',
+    'F': 'bg-emerald-500',
+}
 
-def dashboard(request):
+
+async def dashboard(request):
     """View para o dashboard principal"""
     
-    # Estatísticas
-    processos_ativos_count = ProcessoSeletivo.objects.filter(
-        status__in=['aberto', 'em_andamento']
-    ).count()
-    
-    candidatos_count = Candidato.objects.count()
-    
-    # Rankings sem tier atribuído (avaliações pendentes)
-    avaliacoes_pendentes = RankingCandidato.objects.filter(
-        tier__isnull=True
-    ).count()
-    
-    # Rankings com tier atribuído (completos)
-    rankings_completos = RankingCandidato.objects.filter(
-        tier__isnull=False
-    ).count()
+    # Estatísticas (linha materializada ou uma única consulta agregada; pode reconstruir a linha)
+    estatisticas = await sync_to_async(obter_estatisticas)()
     
-    # Processos recentes (últimos 5)
-    processos_recentes = ProcessoSeletivo.objects.all()[:5]
+    # Processos recentes (últimos 5), já com o total de candidatos
+    processos_recentes = [
+        processo async for processo in ProcessoSeletivo.objects.annotate(
+            total_candidatos=Count('rankings')
+        )[:5]
+    ]
     
     context = {
-        'processos_ativos_count': processos_ativos_count,
-        'candidatos_count': candidatos_count,
-        'avaliacoes_pendentes': avaliacoes_pendentes,
-        'rankings_completos': rankings_completos,
+        'processos_ativos_count': estatisticas['processos_ativos'],
+        'candidatos_count': estatisticas['candidatos'],
+        'avaliacoes_pendentes': estatisticas['rankings_pendentes'],
+        'rankings_completos': estatisticas['rankings_completos'],
+        'rankings_por_tier': estatisticas['por_tier'],
+        'avaliados_recentes': estatisticas['avaliados_recentes'],
+        'janela_dias': JANELA_DIAS,
         'processos_recentes': processos_recentes,
     }
     
     return render(request, 'ranking/dashboard.html', context)
 
 
+def _contagem_rankings(**filtros):
+    """Subquery correlacionada com o número de rankings do processo (opcionalmente filtrados)"""
+    return Subquery(
+        RankingCandidato.objects.filter(
+            processo_seletivo=OuterRef('pk'), **filtros
+        ).order_by().annotate(total=Func(Value(1), function='COUNT')).values('total'),
+        output_field=IntegerField(),
+    )
+
+
 def processos_list(request):
-    """View para listar processos seletivos"""
+    """View para listar processos seletivos, paginada por cursor (mais recentes primeiro)"""
     
     # Filtro de status (se fornecido)
     status_filter = request.GET.get('status')
@@ -49,17 +98,93 @@ def processos_list(request):
     if status_filter:
         processos = processos.filter(status=status_filter)
     
-    # Ordenar por data de criação (mais recentes primeiro)
-    processos = processos.order_by('-criado_em')
+    # Continuar depois do último processo da página anterior
+    cursor = decodificar_cursor(request.GET.get('cursor'), 2)
+    if cursor:
+        try:
+            criado_em, processo_id = datetime.fromisoformat(cursor[0]), int(cursor[1])
+        except (TypeError, ValueError):
+            cursor = None
+        else:
+            processos = processos.filter(
+                Q(criado_em__lt=criado_em) | Q(criado_em=criado_em, id__lt=processo_id)
+            )
+    
+    # Contagens calculadas na mesma consulta, apenas para os processos da página
+    tiers = [codigo for codigo, _ in RankingCandidato.TIER_CHOICES]
+    processos = processos.order_by('-criado_em', '-id').annotate(
+        total_candidatos=_contagem_rankings(),
+        total_sem_tier=_contagem_rankings(tier__isnull=True),
+        total_criterios=Subquery(
+            Criterio.objects.filter(
+                processo_seletivo=OuterRef('pk')
+            ).order_by().annotate(total=Func(Value(1), function='COUNT')).values('total'),
+            output_field=IntegerField(),
+        ),
+        **{f'total_tier_{tier.lower()}': _contagem_rankings(tier=tier) for tier in tiers},
+    )
+    
+    processos, tem_mais = fatiar_pagina(processos, PROCESSOS_POR_PAGINA)
+    
+    for processo in processos:
+        processo.histograma_tiers = [
+            {
+                'tier': tier,
+                'total': getattr(processo, f'total_tier_{tier.lower()}'),
+                'cor': CORES_TIER[tier],
+            }
+            for tier in tiers
+        ]
+    
+    proximo_cursor = None
+    if tem_mais:
+        ultimo = processos[-1]
+        proximo_cursor = codificar_cursor(ultimo.criado_em.isoformat(), ultimo.id)
     
     context = {
         'processos': processos,
         'status_filter': status_filter,
+        'status_choices': ProcessoSeletivo.STATUS_CHOICES,
+        'proximo_cursor': proximo_cursor,
     }
     
+    # Pedidos do botão "carregar mais" recebem só os cards da próxima página
+    if request.headers.get('HX-Request') and cursor:
+        return render(request, 'ranking/partials/processos_pagina.html', context)
+    
     return render(request, 'ranking/processos_list.html', context)
 
 
+def buscar_candidatos(request):
+    """View para buscar candidatos em todos os processos (nome, contatos, observações e anotações)"""
+    
+    consulta = request.GET.get('q', '').strip()
+    
+    # Continuar depois do último resultado da página anterior (relevância, ID)
+    cursor = decodificar_cursor(request.GET.get('cursor'), 2)
+    if cursor and not (isinstance(cursor[0], (int, float)) and isinstance(cursor[1], int)):
+        cursor = None
+    
+    resultados, proximo_cursor = buscar(consulta, cursor)
+    for candidato in resultados:
+        for ranking in candidato.rankings_busca:
+            ranking.cor_tier = CORES_TIER.get(ranking.tier, 'bg-gray-300')
+    
+    context = {
+        'consulta': consulta,
+        'resultados': resultados,
+        'proximo_cursor': proximo_cursor,
+    }
+    
+    # HTMX: "carregar mais" recebe só a próxima página; digitar na busca, a lista inteira
+    if request.headers.get('HX-Request'):
+        if cursor:
+            return render(request, 'ranking/partials/busca_pagina.html', context)
+        return render(request, 'ranking/partials/busca_resultados.html', context)
+    
+    return render(request, 'ranking/busca.html', context)
+
+
 def processos_create(request):
     """View para criar novo processo seletivo"""
     
@@ -86,53 +211,299 @@ def processos_create(request):
     return redirect('processos_list')
 
 
-def processo_ranking(request, processo_id):
-    """View para exibir o ranking de candidatos de um processo"""
+def _colunas_do_quadro():
+    """Códigos das colunas do quadro, na ordem de exibição"""
+    return [codigo for codigo, _ in RankingCandidato.TIER_CHOICES] + ['unranked']
+
+
+def _pagina_tier(processo_id, coluna, cursor=None):
+    """Busca uma página de cards de uma coluna, continuando depois do cursor (ordem, id)
+
+    Retorna os cards como dicts simples e o cursor da próxima página (ou None).
+    """
     
-    processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
+    rankings = RankingCandidato.objects.filter(processo_seletivo_id=processo_id)
+    if coluna == 'unranked':
+        rankings = rankings.filter(tier__isnull=True)
+    else:
+        rankings = rankings.filter(tier=coluna)
+    
+    if cursor:
+        ordem, ranking_id = cursor
+        rankings = rankings.filter(Q(ordem__gt=ordem) | Q(ordem=ordem, id__gt=ranking_id))
+    
+    rankings = rankings.order_by('ordem', 'id').select_related('candidato').only(
+        'id', 'ordem', 'candidato__nome', 'candidato__email'
+    )
+    rankings, tem_mais = fatiar_pagina(rankings, CARDS_POR_PAGINA)
+    
+    itens = [
+        {
+            'id': ranking.id,
+            'ordem': ranking.ordem,
+            'candidato': {
+                'nome': ranking.candidato.nome,
+                'email': ranking.candidato.email,
+            },
+        }
+        for ranking in rankings
+    ]
+    
+    proximo_cursor = None
+    if tem_mais:
+        proximo_cursor = codificar_cursor(rankings[-1].ordem, rankings[-1].id)
+    
+    return itens, proximo_cursor
+
+
+def _bolinhas(notas, criterios, rotulos=None):
+    """Bolinhas de nota de um card (classe de cor e título), uma por critério, na ordem do quadro
+
+    Calculadas aqui para o template só repetir strings prontas: nada de
+    filtros nem comparações por bolinha durante a renderização. ``rotulos``
+    guarda a nota já localizada entre cards (as notas se repetem muito).
+    """
+    
+    if rotulos is None:
+        rotulos = {}
+    bolinhas = []
+    for criterio in criterios:
+        nota = notas.get(criterio['id'])
+        if nota is None:
+            classe, rotulo = 'bg-gray-300', 'Não avaliado'
+        else:
+            if nota >= 8:
+                classe = 'bg-green-500'
+            elif nota >= 6:
+                classe = 'bg-yellow-500'
+            else:
+                classe = 'bg-red-500'
+            rotulo = rotulos.get(nota)
+            if rotulo is None:
+                rotulo = rotulos[nota] = formats.localize(nota)
+        bolinhas.append({'classe': classe, 'titulo': f"{criterio['nome']}: {rotulo}"})
+    return bolinhas
+
+
+def _preencher_avaliacoes(itens, criterios):
+    """Carrega as notas de todos os cards informados em uma única consulta e monta as bolinhas de cada um"""
+    
+    notas = {item['id']: {} for item in itens}
+    if not notas:
+        return
     
-    # Buscar todos os rankings do processo
-    rankings = RankingCandidato.objects.filter(
-        processo_seletivo=processo
-    ).select_related('candidato').prefetch_related('avaliacoes_criterios__criterio')
+    avaliacoes = AvaliacaoCriterio.objects.filter(
+        ranking_id__in=notas.keys()
+    ).values_list('ranking_id', 'criterio_id', 'nota')
+    for ranking_id, criterio_id, nota in avaliacoes:
+        notas[ranking_id][criterio_id] = nota
+    
+    rotulos = {}
+    for item in itens:
+        item['notas'] = _bolinhas(notas[item['id']], criterios, rotulos)
+
+
+def _criterios_do_quadro(processo_id):
+    return list(
+        Criterio.objects.filter(processo_seletivo_id=processo_id).order_by('ordem', 'nome').values('id', 'nome')
+    )
+
+
+def _montar_quadro(processo):
+    """Renderiza o HTML do quadro com a primeira página de cada coluna
+
+    Retorna apenas dados simples (dicts/listas), prontos para ir ao cache. O
+    custo não depende do tamanho do processo: as demais páginas de cada
+    coluna são carregadas pela view tier_cards conforme a rolagem.
+    """
     
     # Buscar critérios do processo
-    criterios = Criterio.objects.filter(processo_seletivo=processo).order_by('ordem', 'nome')
-    
-    # Organizar rankings por tier e adicionar avaliações
-    rankings_por_tier = {
-        'S': [],
-        'A': [],
-        'B': [],
-        'C': [],
-        'D': [],
-        'F': [],
-        'unranked': []
+    criterios = _criterios_do_quadro(processo.id)
+    
+    # Total de cards por coluna, em uma única consulta
+    totais = RankingCandidato.objects.filter(processo_seletivo=processo).aggregate(
+        unranked=Count('id', filter=Q(tier__isnull=True)),
+        **{tier: Count('id', filter=Q(tier=tier)) for tier in _colunas_do_quadro()[:-1]},
+    )
+    
+    # Primeira página de cada coluna
+    colunas = {}
+    for coluna in _colunas_do_quadro():
+        itens, proximo_cursor = _pagina_tier(processo.id, coluna)
+        colunas[coluna] = {
+            'tier': coluna,
+            'rankings': itens,
+            'proximo_cursor': proximo_cursor,
+            'total': totais[coluna],
+        }
+    
+    _preencher_avaliacoes([item for coluna in colunas.values() for item in coluna['rankings']], criterios)
+    
+    context = {
+        'processo_id': processo.id,
+        'colunas': colunas,
+        'tem_candidatos': any(totais.values()),
     }
     
-    for ranking in rankings:
-        # Adicionar avaliações ao ranking
-        avaliacoes = {}
-        for avaliacao in ranking.avaliacoes_criterios.all():
-            avaliacoes[avaliacao.criterio.id] = avaliacao.nota
-        
-        ranking.avaliacoes_dict = avaliacoes
-        
-        if ranking.tier:
-            rankings_por_tier[ranking.tier].append(ranking)
-        else:
-            rankings_por_tier['unranked'].append(ranking)
+    return {
+        'html': render_to_string('ranking/partials/quadro.html', context),
+    }
+
+
+async def _etag_processo(request, processo_id):
+    # A versão do quadro muda a cada escrita no processo; atualizado_em cobre o cabeçalho da página
+    linha = await ProcessoSeletivo.objects.filter(id=processo_id).values_list(
+        'versao_quadro', 'atualizado_em'
+    ).afirst()
+    return etag(request, 'processo', processo_id, *linha) if linha else None
+
+
+@condicional(_etag_processo)
+async def processo_ranking(request, processo_id):
+    """View para exibir o ranking de candidatos de um processo"""
+    
+    processo = await aget_object_or_404(ProcessoSeletivo, id=processo_id)
+    
+    # Quadro cacheado pela versão atual do processo (montado numa thread em caso de miss)
+    quadro = await aobter_quadro(processo, _montar_quadro)
     
     context = {
         'processo': processo,
-        'rankings_por_tier': rankings_por_tier,
-        'tem_candidatos': rankings.exists(),
-        'criterios': criterios,
+        'quadro_html': mark_safe(quadro['html']),
     }
     
     return render(request, 'ranking/processo_ranking.html', context)
 
 
+async def quadro(request, processo_id):
+    """View HTMX que devolve só o quadro (do cache), para as abas abertas se atualizarem após mudanças em lote"""
+    
+    processo = await aget_object_or_404(ProcessoSeletivo, id=processo_id)
+    quadro = await aobter_quadro(processo, _montar_quadro)
+    
+    return HttpResponse(quadro['html'])
+
+
+def card_ranking(request, ranking_id):
+    """View HTMX que devolve um único card do quadro (candidato novo, movido ou com nota nova em outra aba)
+
+    O tier do card vai no cabeçalho ``X-Card-Tier`` para o JavaScript saber em que coluna colocá-lo.
+    """
+    
+    ranking = get_object_or_404(
+        RankingCandidato.objects.select_related('candidato').only(
+            'id', 'tier', 'ordem', 'processo_seletivo_id', 'candidato__nome', 'candidato__email'
+        ),
+        id=ranking_id,
+    )
+    item = {
+        'id': ranking.id,
+        'ordem': ranking.ordem,
+        'candidato': {
+            'nome': ranking.candidato.nome,
+            'email': ranking.candidato.email,
+        },
+    }
+    _preencher_avaliacoes([item], _criterios_do_quadro(ranking.processo_seletivo_id))
+    coluna = ranking.tier or 'unranked'
+    
+    context = {
+        'processo_id': ranking.processo_seletivo_id,
+        'ranking': item,
+        'coluna': {'tier': coluna},
+    }
+    
+    response = render(request, 'ranking/partials/card_ranking.html', context)
+    response['X-Card-Tier'] = coluna
+    return response
+
+
+async def eventos_quadro(request, processo_id):
+    """Stream de server-sent events com as mudanças no quadro do processo feitas por outras abas
+
+    Só funciona sob ASGI: sob WSGI o stream prenderia um worker inteiro, então
+    a resposta é 204, que faz o EventSource do navegador desistir de reconectar.
+    """
+    
+    processo = await aget_object_or_404(ProcessoSeletivo, id=processo_id)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    intervalo_ping = getattr(settings, 'RANKING_EVENTOS_PING', 15)
+    
+    async def stream():
+        async with obter_broker().assinar(processo.id) as fila:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    evento = await asyncio.wait_for(fila.get(), intervalo_ping)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão viva através de proxies
+                    yield ': ping\n\n'
+                    continue
+                yield f'data: {json.dumps(evento)}\n\n'
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def tier_cards(request, processo_id, tier):
+    """View que devolve a próxima página de cards de uma coluna do quadro (rolagem via HTMX)"""
+    
+    if tier not in _colunas_do_quadro():
+        return HttpResponse('Tier inválido', status=400)
+    
+    cursor = decodificar_cursor(request.GET.get('cursor'), 2)
+    if cursor and not (isinstance(cursor[0], str) and isinstance(cursor[1], int)):
+        return HttpResponse('Cursor inválido', status=400)
+    
+    itens, proximo_cursor = _pagina_tier(processo_id, tier, cursor)
+    _preencher_avaliacoes(itens, _criterios_do_quadro(processo_id))
+    
+    context = {
+        'processo_id': processo_id,
+        'coluna': {
+            'tier': tier,
+            'rankings': itens,
+            'proximo_cursor': proximo_cursor,
+        },
+    }
+    
+    return render(request, 'ranking/partials/cards_tier.html', context)
+
+
+def exportar_ranking(request, processo_id):
+    """View para baixar o ranking do processo em CSV (streaming) ou XLSX"""
+    
+    processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
+    formato = request.GET.get('formato', 'csv')
+    nome_arquivo = f'ranking-{slugify(processo.titulo) or processo.id}'
+    
+    if formato == 'xlsx':
+        if not xlsx_disponivel():
+            return HttpResponse('Exportação XLSX indisponível (instale o pacote openpyxl)', status=501)
+        
+        if processo_grande(processo):
+            # Planilha grande: gerada por uma tarefa; a página da tarefa acompanha e oferece o download
+            tarefa = enfileirar('exportar_ranking', processo, processo_id=processo.id, formato='xlsx')
+            return redirect('tarefa_progresso', tarefa_id=tarefa.id)
+        
+        # O XLSX só fica válido depois de fechado: montar num temporário e enviar em pedaços
+        arquivo = tempfile.TemporaryFile()
+        gravar_xlsx(processo, arquivo)
+        arquivo.seek(0)
+        return FileResponse(arquivo, as_attachment=True, filename=f'{nome_arquivo}.xlsx')
+    
+    if formato != 'csv':
+        return HttpResponse('Formato inválido', status=400)
+    
+    response = StreamingHttpResponse(gerar_csv(processo), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.csv"'
+    return response
+
+
 def candidato_create_form(request, processo_id):
     """View HTMX para retornar o formulário de criar candidato"""
     
@@ -161,10 +532,11 @@ def candidato_create(request, processo_id):
             )
             
             # Criar ranking para este candidato no processo
-            RankingCandidato.objects.create(
+            ranking = RankingCandidato.objects.create(
                 candidato=candidato,
                 processo_seletivo=processo,
             )
+            publicar_evento(processo.id, 'candidato', origem_da_requisicao(request), ranking_id=ranking.id, novo=True)
             
             # Retornar resposta vazia e fechar modal
             return render(request, 'ranking/partials/close_modal.html')
@@ -179,6 +551,51 @@ def candidato_create(request, processo_id):
     return redirect('processo_ranking', processo_id=processo_id)
 
 
+def candidatos_importar_form(request, processo_id):
+    """View HTMX para retornar o formulário de importação de candidatos por CSV"""
+    
+    processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
+    
+    context = {
+        'processo': processo,
+    }
+    
+    return render(request, 'ranking/partials/importar_candidatos_modal.html', context)
+
+
+def candidatos_importar(request, processo_id):
+    """View HTMX para importar candidatos de um CSV enviado, lido em streaming e gravado em lotes"""
+    
+    processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
+    
+    if request.method != 'POST':
+        return redirect('processo_ranking', processo_id=processo_id)
+    
+    context = {
+        'processo': processo,
+    }
+    
+    arquivo = request.FILES.get('arquivo')
+    if not arquivo:
+        context['error'] = 'Selecione um arquivo CSV.'
+        return render(request, 'ranking/partials/importar_candidatos_modal.html', context)
+    
+    if arquivo.size > getattr(settings, 'RANKING_TAREFAS_IMPORTACAO_KB', 512) * 1024:
+        # Arquivo grande: guardado no storage e importado por uma tarefa; o modal acompanha o progresso
+        caminho = default_storage.save(f'tarefas/importacoes/processo-{processo.id}.csv', arquivo)
+        context['tarefa'] = enfileirar('importar_candidatos', processo, processo_id=processo.id, arquivo=caminho)
+        return render(request, 'ranking/partials/importar_candidatos_modal.html', context)
+    
+    try:
+        context['resultado'] = importar_candidatos(processo, abrir_texto(arquivo.file))
+        publicar_evento(processo.id, 'quadro', origem_da_requisicao(request))
+    except (ValueError, csv.Error) as e:
+        # UnicodeDecodeError também é um ValueError
+        context['error'] = f'Erro ao ler o CSV: {e}'
+    
+    return render(request, 'ranking/partials/importar_candidatos_modal.html', context)
+
+
 def candidato_update(request, candidato_id):
     """View HTMX para atualizar informações do candidato"""
     
@@ -199,75 +616,371 @@ def candidato_update(request, candidato_id):
                 raise ValueError("E-mail é obrigatório")
             
             candidato.save()
-            
-            # Obter o ranking_id da requisição para retornar ao modal correto
-            ranking_id = request.POST.get('ranking_id')
-            if ranking_id:
-                return avaliar_candidato_modal(request, int(ranking_id))
-            
-            # Se não tiver ranking_id, retornar resposta vazia
-            return render(request, 'ranking/partials/close_modal.html')
+            erro = None
             
         except Exception as e:
-            # Em caso de erro, obter o ranking_id e retornar ao modal
-            ranking_id = request.POST.get('ranking_id')
-            if ranking_id:
-                return avaliar_candidato_modal(request, int(ranking_id))
-            
+            # Em caso de erro, exibir os dados ainda gravados
+            candidato.refresh_from_db()
+            erro = str(e)
+        
+        # Obter o ranking_id da requisição para atualizar o modal correto
+        ranking = None
+        ranking_id = request.POST.get('ranking_id')
+        if ranking_id and ranking_id.isdigit():
+            ranking = RankingCandidato.objects.filter(id=int(ranking_id), candidato=candidato).first()
+        
+        # Se não tiver ranking, fechar o modal
+        if ranking is None:
             return render(request, 'ranking/partials/close_modal.html')
+        
+        # Responder apenas com os fragmentos alterados: bloco de dados,
+        # cabeçalho do modal e card do quadro (via hx-swap-oob)
+        ranking.candidato = candidato
+        html = render_to_string('ranking/partials/candidato_info.html', {
+            'ranking': ranking,
+            'erro': erro,
+        }, request=request)
+        if erro is None:
+            publicar_evento(
+                ranking.processo_seletivo_id, 'candidato', origem_da_requisicao(request), ranking_id=ranking.id
+            )
+            html += render_to_string('ranking/partials/candidato_cabecalho.html', {
+                'ranking': ranking,
+                'oob': True,
+            })
+            html += render_to_string('ranking/partials/card_candidato.html', {
+                'ranking': ranking,
+                'oob': True,
+            })
+        return HttpResponse(html)
     
-    from django.http import HttpResponse
     return HttpResponse('Method not allowed', status=405)
 
 
+@csrf_exempt
+def candidato_curriculo(request, candidato_id):
+    """View HTMX para enviar o currículo do candidato (lido em streaming e armazenado pelo conteúdo)"""
+    
+    # O handler precisa estar no lugar antes de o corpo ser lido, inclusive pela verificação de CSRF
+    handler = CurriculoUploadHandler(request)
+    request.upload_handlers = [handler]
+    return _candidato_curriculo(request, candidato_id, handler)
+
+
+@csrf_protect
+def _candidato_curriculo(request, candidato_id, handler):
+    if request.method != 'POST':
+        return HttpResponse('Method not allowed', status=405)
+    
+    candidato = get_object_or_404(Candidato, id=candidato_id)
+    
+    enviado = request.FILES.get('curriculo')
+    erro = handler.erro
+    if enviado is None and erro is None:
+        erro = 'Selecione o arquivo do currículo.'
+    if erro is None:
+        anexar(candidato, enviado)
+    
+    ranking = None
+    ranking_id = request.POST.get('ranking_id')
+    if ranking_id and ranking_id.isdigit():
+        ranking = RankingCandidato.objects.filter(id=int(ranking_id), candidato=candidato).first()
+    if ranking is None:
+        return render(request, 'ranking/partials/close_modal.html')
+    
+    ranking.candidato = candidato
+    return render(request, 'ranking/partials/candidato_info.html', {
+        'ranking': ranking,
+        'erro': erro,
+    })
+
+
 def update_ranking_tier(request, ranking_id):
-    """View para atualizar tier e ordem do ranking"""
+    """View para mover um card de tier/posição gravando apenas a linha do próprio ranking
+
+    Recebe o tier de destino e os IDs dos cards imediatamente antes/depois
+    da posição onde o card foi solto.
+    """
     
     if request.method == 'POST':
         ranking = get_object_or_404(RankingCandidato, id=ranking_id)
         
         tier = request.POST.get('tier')
-        ordem = request.POST.get('ordem', 0)
+        tier_anterior = ranking.tier
         
-        # Atualizar tier e ordem
+        # Atualizar tier
         if tier == 'unranked' or tier == '' or tier is None:
             ranking.tier = None
         else:
             ranking.tier = tier
-            
-        try:
-            ranking.ordem = int(ordem)
-        except (ValueError, TypeError):
-            ranking.ordem = 0
-            
-        ranking.save()
         
-        from django.http import JsonResponse
+        # Arrastado para outro tier à mão: o tier automático não mexe mais neste card
+        # (reordenar dentro do mesmo tier não fixa)
+        if ranking.tier != tier_anterior:
+            ranking.tier_fixado = True
+        
+        def _id(valor):
+            try:
+                return int(valor)
+            except (ValueError, TypeError):
+                return None
+        
+        # Gerar chave entre os vizinhos
+        ranking.ordem = chave_para_posicao(
+            ranking.processo_seletivo_id,
+            ranking.tier,
+            antes_id=_id(request.POST.get('antes')),
+            depois_id=_id(request.POST.get('depois')),
+            excluir_id=ranking.id,
+        )
+        
+        with transaction.atomic():
+            # save() também incrementa a versão do quadro
+            ranking.save(update_fields=['tier', 'tier_fixado', 'ordem', 'data_avaliacao', 'atualizado_em'])
+            versao = ProcessoSeletivo.objects.filter(
+                pk=ranking.processo_seletivo_id
+            ).values_list('versao_quadro', flat=True).first()
+            if precisa_rebalancear(ranking.ordem):
+                agendar_rebalanceamento(ranking.processo_seletivo_id, ranking.tier)
+            publicar_evento(
+                ranking.processo_seletivo_id, 'tier', origem_da_requisicao(request),
+                ranking_id=ranking.id,
+                de=tier_anterior or 'unranked',
+                para=ranking.tier or 'unranked',
+                ordem=ranking.ordem,
+            )
+        
         return JsonResponse({
             'success': True,
             'ranking_id': ranking.id,
             'tier': ranking.tier,
-            'ordem': ranking.ordem
+            'ordem': ranking.ordem,
+            'versao': versao,
         })
     
-    from django.http import JsonResponse
     return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=400)
 
 
-def criterios_list_modal(request, processo_id):
-    """View para exibir modal de listagem de critérios"""
+def reordenar_tiers(request, processo_id):
+    """View para regravar de uma vez a ordem completa de colunas inteiras do quadro
+
+    Espera um JSON no formato {"colunas": {"S": [id, ...], "unranked": [id, ...]}}
+    com a lista ordenada de IDs de ranking de cada coluna de origem/destino.
+    """
+    
+    if request.method == 'POST':
+        processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
+        
+        try:
+            colunas = json.loads(request.body or b'{}').get('colunas') or {}
+            if not isinstance(colunas, dict):
+                raise ValueError("Formato inválido para 'colunas'")
+            
+            # Mapear cada ranking para seu (tier, ordem) de destino
+            tiers_validos = {codigo for codigo, _ in RankingCandidato.TIER_CHOICES}
+            destino = {}
+            for tier, ids in colunas.items():
+                if tier != 'unranked' and tier not in tiers_validos:
+                    raise ValueError(f"Tier inválido: {tier}")
+                for ranking_id, ordem in zip(ids, chaves_distribuidas(len(ids))):
+                    destino[int(ranking_id)] = (None if tier == 'unranked' else tier, ordem)
+        except (ValueError, TypeError, AttributeError) as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        
+        with transaction.atomic():
+            rankings = RankingCandidato.objects.select_for_update().filter(
+                processo_seletivo=processo, id__in=destino.keys()
+            ).only('id', 'tier', 'tier_fixado', 'ordem', 'data_avaliacao')
+            
+            # Gravar apenas as linhas que realmente mudaram
+            alterados = []
+            mudancas_tier = []
+            campos = ['tier', 'tier_fixado', 'ordem']
+            agora = timezone.now()
+            for ranking in rankings:
+                tier, ordem = destino[ranking.id]
+                if ranking.tier == tier and ranking.ordem == ordem:
+                    continue
+                mudancas_tier.append((ranking.tier, tier))
+                if ranking.tier != tier:
+                    # Arrastado para outro tier à mão: fica fixado
+                    ranking.tier_fixado = True
+                ranking.tier = tier
+                ranking.ordem = ordem
+                if tier and not ranking.data_avaliacao:
+                    ranking.data_avaliacao = agora
+                    if 'data_avaliacao' not in campos:
+                        campos.append('data_avaliacao')
+                alterados.append(ranking)
+            
+            if alterados:
+                RankingCandidato.objects.bulk_update(alterados, campos)
+                versao = ProcessoSeletivo.incrementar_versao_quadro(processo.id)
+                publicar_evento(processo.id, 'quadro', origem_da_requisicao(request))
+                
+                # bulk_update não dispara sinais: ajustar as estatísticas aqui
+                registrar_mudancas_tier(mudancas_tier)
+                if 'data_avaliacao' in campos:
+                    registrar_avaliacoes(agora, sum(1 for r in alterados if r.data_avaliacao == agora))
+            else:
+                versao = processo.versao_quadro
+        
+        return JsonResponse({
+            'success': True,
+            'atualizados': len(alterados),
+            'versao': versao,
+        })
+    
+    return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=400)
+
+
+def _contexto_auto_tier(processo, dados=None):
+    """Valores do formulário de tier automático (os enviados ou os padrões)"""
+    dados = dados or {}
+    return {
+        'processo': processo,
+        'metodos': METODOS,
+        'metodo': dados.get('metodo', 'quantis'),
+        'incluir_fixados': bool(dados.get('incluir_fixados')),
+        'limiares': [
+            (tier, dados.get(f'limiar_{tier}', padrao)) for tier, padrao in zip(TIERS, LIMIARES_PADRAO)
+        ],
+        'percentuais': [
+            (tier, dados.get(f'percentual_{tier}', padrao)) for tier, padrao in zip(TIERS, QUANTIS_PADRAO)
+        ],
+    }
+
+
+def auto_tier_form(request, processo_id):
+    """View HTMX para retornar o formulário de tier automático"""
+    
+    processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
+    
+    return render(request, 'ranking/partials/auto_tier_modal.html', _contexto_auto_tier(processo))
+
+
+def auto_tier(request, processo_id):
+    """View HTMX para pré-visualizar (acao=previa) ou aplicar (acao=aplicar) o tier automático por média"""
+    
+    processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
+    
+    if request.method != 'POST':
+        return redirect('processo_ranking', processo_id=processo_id)
+    
+    context = _contexto_auto_tier(processo, request.POST)
+    metodo = context['metodo']
+    
+    try:
+        parametros = None
+        if metodo == 'limiares':
+            parametros = [float(valor) for _, valor in context['limiares']]
+        elif metodo == 'quantis':
+            parametros = [float(valor) for _, valor in context['percentuais']]
+        
+        if request.POST.get('acao') == 'aplicar' and processo_grande(processo):
+            context['tarefa'] = enfileirar(
+                'aplicar_auto_tier',
+                processo,
+                processo_id=processo.id,
+                metodo=metodo,
+                parametros=parametros,
+                incluir_fixados=context['incluir_fixados'],
+            )
+        elif request.POST.get('acao') == 'aplicar':
+            context['proposta'] = aplicar_tiers(processo, metodo, parametros, context['incluir_fixados'])
+            context['aplicado'] = True
+            if context['proposta'].mudancas:
+                publicar_evento(processo.id, 'quadro', origem_da_requisicao(request))
+        else:
+            context['proposta'] = propor_tiers(processo, metodo, parametros, context['incluir_fixados'])
+    except ValueError as e:
+        context['error'] = str(e)
+    
+    return render(request, 'ranking/partials/auto_tier_modal.html', context)
+
+
+def tarefa_progresso(request, tarefa_id):
+    """Andamento de uma tarefa em segundo plano: fragmento HTMX (que se atualiza sozinho) ou página própria"""
+    
+    tarefa = get_object_or_404(Tarefa.objects.select_related('processo_seletivo'), id=tarefa_id)
+    
+    if request.headers.get('HX-Request'):
+        return render(request, 'ranking/partials/tarefa_progresso.html', {'tarefa': tarefa})
+    return render(request, 'ranking/tarefa.html', {'tarefa': tarefa})
+
+
+def tarefa_arquivo(request, tarefa_id):
+    """View para baixar o arquivo gerado por uma tarefa (ex.: exportação XLSX)"""
+    
+    tarefa = get_object_or_404(Tarefa, id=tarefa_id, status='concluida')
+    caminho = (tarefa.resultado or {}).get('arquivo')
+    if not caminho or not default_storage.exists(caminho):
+        raise Http404('Arquivo não encontrado')
+    
+    return FileResponse(
+        default_storage.open(caminho, 'rb'),
+        as_attachment=True,
+        filename=tarefa.resultado.get('nome_arquivo') or caminho.rsplit('/', 1)[-1],
+    )
+
+
+def simular_pesos(request, processo_id):
+    """View somente leitura: médias e posições de todos os rankings com outros pesos de critério
+
+    Os pesos propostos vêm como ``peso_<criterio_id>=<valor>`` na query string;
+    os critérios omitidos mantêm o peso atual. Nada é gravado.
+    """
     
     processo = get_object_or_404(ProcessoSeletivo, id=processo_id)
-    criterios = Criterio.objects.filter(processo_seletivo=processo).order_by('ordem', 'nome')
     
+    try:
+        pesos = {}
+        for nome, valor in request.GET.items():
+            if not nome.startswith('peso_'):
+                continue
+            peso = float(valor)
+            if not 0 <= peso <= 1000:
+                raise ValueError(f"Peso fora do intervalo: {valor}")
+            pesos[int(nome[len('peso_'):])] = peso
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'versao': processo.versao_quadro,
+        **simular(processo, pesos),
+    })
+
+
+def _criterios_do_processo(processo):
+    return Criterio.objects.filter(processo_seletivo=processo).order_by('ordem', 'nome')
+
+
+def _render_criterios_modal(request, processo, criterios, tarefa=None):
     context = {
         'processo': processo,
         'criterios': criterios,
+        'tarefa': tarefa,
     }
     
     return render(request, 'ranking/partials/criterios_modal.html', context)
 
 
+@condicional(_etag_processo)
+async def criterios_list_modal(request, processo_id):
+    """View para exibir modal de listagem de critérios"""
+    
+    processo = await aget_object_or_404(ProcessoSeletivo, id=processo_id)
+    criterios = [criterio async for criterio in _criterios_do_processo(processo)]
+    
+    return _render_criterios_modal(request, processo, criterios)
+
+
+def _criterios_modal_atualizado(request, processo, tarefa=None):
+    """Modal de critérios já atualizado, para as views síncronas de criação e edição"""
+    return _render_criterios_modal(request, processo, list(_criterios_do_processo(processo)), tarefa)
+
+
 def criterio_create_form(request, processo_id):
     """View para exibir formulário de criação de critério"""
     
@@ -316,9 +1029,10 @@ def criterio_create(request, processo_id):
                 peso=peso,
                 ordem=ordem,
             )
+            publicar_evento(processo.id, 'criterios', origem_da_requisicao(request))
             
             # Retornar modal atualizado
-            return criterios_list_modal(request, processo_id)
+            return _criterios_modal_atualizado(request, processo)
             
         except Exception as e:
             context = {
@@ -372,15 +1086,23 @@ def criterio_update(request, criterio_id):
             except (ValueError, TypeError):
                 ordem = 0
             
+            # Processo grande: as médias com o novo peso são recalculadas numa tarefa, fora da requisição
+            adiar_medias = round(peso, 2) != float(criterio.peso) and processo_grande(processo)
+            
             # Atualizar critério
             criterio.nome = nome
             criterio.descricao = descricao if descricao else None
             criterio.peso = peso
             criterio.ordem = ordem
-            criterio.save()
+            tarefa = None
+            with transaction.atomic():
+                criterio.save(propagar_peso=not adiar_medias)
+                if adiar_medias:
+                    tarefa = enfileirar('recalcular_medias', processo, processo_id=processo.id)
+            publicar_evento(processo.id, 'criterios', origem_da_requisicao(request))
             
             # Retornar modal atualizado
-            return criterios_list_modal(request, processo.id)
+            return _criterios_modal_atualizado(request, processo, tarefa)
             
         except Exception as e:
             context = {
@@ -399,42 +1121,89 @@ def criterio_delete(request, criterio_id):
     if request.method == 'DELETE':
         criterio = get_object_or_404(Criterio, id=criterio_id)
         criterio.delete()
+        publicar_evento(criterio.processo_seletivo_id, 'criterios', origem_da_requisicao(request))
         
-        from django.http import HttpResponse
         return HttpResponse('', status=200)
     
-    from django.http import HttpResponse
     return HttpResponse('Method not allowed', status=405)
 
 
-def avaliar_candidato_modal(request, ranking_id):
-    """View para exibir modal de avaliação de candidato"""
-    
-    ranking = get_object_or_404(RankingCandidato, id=ranking_id)
-    processo = ranking.processo_seletivo
-    
-    # Buscar critérios do processo
-    criterios = Criterio.objects.filter(processo_seletivo=processo).order_by('ordem', 'nome')
+def _linhas_criterios(ranking):
+    """Critérios do processo LEFT JOIN a avaliação deste ranking, numa única consulta"""
+    return Criterio.objects.filter(
+        processo_seletivo_id=ranking.processo_seletivo_id
+    ).annotate(
+        avaliacao_ranking=FilteredRelation(
+            'avaliacoes', condition=Q(avaliacoes__ranking_id=ranking.id)
+        ),
+    ).order_by('ordem', 'nome').values(
+        'id', 'nome', 'descricao', 'peso', 'ordem',
+        avaliacao_id=F('avaliacao_ranking__id'),
+        avaliacao_nota=F('avaliacao_ranking__nota'),
+        avaliacao_anotacao=F('avaliacao_ranking__anotacao'),
+        avaliacao_atualizado_em=F('avaliacao_ranking__atualizado_em'),
+    )
+
+
+def _montar_criterios(linhas):
+    """Monta os critérios com a avaliação do ranking e calcula a média ponderada a partir das mesmas linhas"""
     
-    # Para cada critério, buscar se já existe avaliação
     criterios_com_avaliacao = []
-    for criterio in criterios:
-        try:
-            avaliacao = AvaliacaoCriterio.objects.get(ranking=ranking, criterio=criterio)
-        except AvaliacaoCriterio.DoesNotExist:
-            avaliacao = None
+    soma_ponderada = soma_pesos = 0
+    for linha in linhas:
+        avaliacao = None
+        if linha['avaliacao_id'] is not None:
+            avaliacao = {
+                'id': linha['avaliacao_id'],
+                'nota': linha['avaliacao_nota'],
+                'anotacao': linha['avaliacao_anotacao'],
+                'atualizado_em': linha['avaliacao_atualizado_em'],
+            }
+            soma_ponderada += linha['avaliacao_nota'] * linha['peso']
+            soma_pesos += linha['peso']
         
         criterios_com_avaliacao.append({
-            'id': criterio.id,
-            'nome': criterio.nome,
-            'descricao': criterio.descricao,
-            'peso': criterio.peso,
-            'ordem': criterio.ordem,
+            'id': linha['id'],
+            'nome': linha['nome'],
+            'descricao': linha['descricao'],
+            'peso': linha['peso'],
+            'ordem': linha['ordem'],
             'avaliacao': avaliacao
         })
     
-    # Calcular média ponderada
-    media_ponderada = ranking.calcular_media_criterios()
+    media_ponderada = round(soma_ponderada / soma_pesos, 2) if soma_pesos else None
+    return criterios_com_avaliacao, media_ponderada
+
+
+def _criterios_com_avaliacao(ranking):
+    """Critérios do processo com a avaliação do ranking e a média ponderada"""
+    return _montar_criterios(_linhas_criterios(ranking))
+
+
+async def _etag_avaliacao(request, ranking_id):
+    # Avaliações, critérios e o candidato incrementam a versão do quadro; a extração do currículo não
+    linha = await RankingCandidato.objects.filter(id=ranking_id).values_list(
+        'processo_seletivo__versao_quadro', 'atualizado_em', 'candidato__atualizado_em',
+        'candidato__arquivo_curriculo__extracao',
+    ).afirst()
+    return etag(request, 'avaliacao', ranking_id, *linha) if linha else None
+
+
+@condicional(_etag_avaliacao)
+async def avaliar_candidato_modal(request, ranking_id):
+    """View para exibir modal de avaliação de candidato"""
+    
+    ranking = await aget_object_or_404(
+        RankingCandidato.objects.select_related(
+            'candidato__arquivo_curriculo', 'processo_seletivo'
+        ).defer('candidato__arquivo_curriculo__texto'),
+        id=ranking_id
+    )
+    
+    # Critérios do processo com a avaliação deste ranking e a média ponderada
+    criterios_com_avaliacao, media_ponderada = _montar_criterios(
+        [linha async for linha in _linhas_criterios(ranking)]
+    )
     
     context = {
         'ranking': ranking,
@@ -450,7 +1219,7 @@ def salvar_avaliacao(request, ranking_id, criterio_id):
     
     if request.method == 'POST':
         ranking = get_object_or_404(RankingCandidato, id=ranking_id)
-        criterio = get_object_or_404(Criterio, id=criterio_id)
+        criterio = get_object_or_404(Criterio, id=criterio_id, processo_seletivo_id=ranking.processo_seletivo_id)
         
         try:
             nota = request.POST.get('nota', '0')
@@ -475,17 +1244,54 @@ def salvar_avaliacao(request, ranking_id, criterio_id):
                     'anotacao': anotacao if anotacao else None,
                 }
             )
+            publicar_evento(
+                ranking.processo_seletivo_id, 'avaliacao', origem_da_requisicao(request),
+                ranking_id=ranking.id, criterio_id=criterio.id,
+            )
             
-            # Retornar modal atualizado
-            return avaliar_candidato_modal(request, ranking_id)
+            erro = None
             
         except Exception as e:
-            # Em caso de erro, retornar modal com mensagem de erro
-            return avaliar_candidato_modal(request, ranking_id)
+            erro = str(e)
+        
+        return _fragmentos_avaliacao(request, ranking, criterio.id, erro)
     
     return redirect('processo_ranking', processo_id=ranking.processo_seletivo.id)
 
 
+def _fragmentos_avaliacao(request, ranking, criterio_id, erro=None):
+    """Fragmentos HTMX de uma nota salva: linha do critério, média ponderada e
+    bolinhas do card no quadro (as duas últimas via hx-swap-oob)"""
+    
+    criterios, media_ponderada = _criterios_com_avaliacao(ranking)
+    criterio = next((c for c in criterios if c['id'] == criterio_id), None)
+    if criterio is None:
+        # Critério removido entre o carregamento do modal e o envio da nota
+        raise Http404('Critério não encontrado')
+    card = {
+        'id': ranking.id,
+        'notas': _bolinhas(
+            {c['id']: c['avaliacao']['nota'] for c in criterios if c['avaliacao']},
+            criterios,
+        ),
+    }
+    
+    html = render_to_string('ranking/partials/avaliacao_criterio.html', {
+        'ranking': ranking,
+        'criterio': criterio,
+        'erro': erro,
+    }, request=request)
+    html += render_to_string('ranking/partials/media_ponderada.html', {
+        'media_ponderada': media_ponderada,
+        'oob': True,
+    })
+    html += render_to_string('ranking/partials/card_notas.html', {
+        'ranking': card,
+        'oob': True,
+    })
+    return HttpResponse(html)
+
+
 def salvar_observacoes(request, ranking_id):
     """View para salvar observações gerais do candidato"""
     
@@ -497,12 +1303,17 @@ def salvar_observacoes(request, ranking_id):
             
             ranking.observacoes_gerais = observacoes_gerais if observacoes_gerais else None
             ranking.save()
-            
-            # Retornar modal atualizado
-            return avaliar_candidato_modal(request, ranking_id)
+            erro = None
             
         except Exception as e:
-            return avaliar_candidato_modal(request, ranking_id)
+            erro = str(e)
+        
+        # Retornar apenas o bloco de observações
+        return render(request, 'ranking/partials/observacoes_gerais.html', {
+            'ranking': ranking,
+            'erro': erro,
+            'salvo': erro is None,
+        })
     
     return redirect('processo_ranking', processo_id=ranking.processo_seletivo.id)
 
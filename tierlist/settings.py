@@ -59,6 +59,8 @@ MIDDLEWARE += [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Só atua com RANKING_INSTRUMENTACAO=True
+    'ranking.instrumentacao.InstrumentacaoMiddleware',
 ]
 
 ROOT_URLCONF = 'tierlist.urls'
@@ -67,8 +69,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates compilados uma vez por processo: o quadro inclui os partials do card centenas de vezes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -79,6 +87,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'tierlist.wsgi.application'
+ASGI_APPLICATION = 'tierlist.asgi.application'
 
 
 # Database
@@ -89,11 +98,15 @@ WSGI_APPLICATION = 'tierlist.wsgi.application'
 # Em desenvolvimento local, usa as configurações individuais do .env
 DATABASE_URL = config('DATABASE_URL', default=None)
 
+# Conexões persistentes (segundos). Sob ASGI use 0: cada requisição roda o
+# ORM numa thread própria e conexões persistentes se acumulariam por thread
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+
 if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=600,
+            conn_max_age=DB_CONN_MAX_AGE,
             conn_health_checks=True,
         )
     }
@@ -109,6 +122,79 @@ else:
         }
     }
 
+# SQLite (desenvolvimento): as transações pegam a trava de escrita já no BEGIN,
+# para escritas concorrentes (ex.: threads de extração dos currículos)
+# esperarem a vez em vez de falharem com "database is locked"; a espera vai
+# até 30 s, o suficiente para uma tarefa em lote de outro processo terminar
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update(transaction_mode='IMMEDIATE', timeout=30)
+
+
+# Cache
+# Por padrão usa memória local (por processo). Para compartilhar o cache entre
+# workers, aponte CACHE_BACKEND/CACHE_LOCATION para um backend compartilhado,
+# ex.: django.core.cache.backends.redis.RedisCache + redis://host:6379/0
+# ou django.core.cache.backends.filebased.FileBasedCache + /var/tmp/tierlist_cache
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='tierlist'),
+    }
+}
+
+# Alias de cache usado pelo quadro de ranking e tempo de vida das entradas (segundos)
+RANKING_CACHE_ALIAS = config('RANKING_CACHE_ALIAS', default='default')
+RANKING_CACHE_TIMEOUT = config('RANKING_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Serve as estatísticas do dashboard de uma linha materializada mantida por
+# sinais, em vez de contá-las a cada acesso. Após cargas em massa feitas por
+# fora do ORM, rode: python manage.py reconstruir_estatisticas
+RANKING_ESTATISTICAS_MATERIALIZADAS = config('RANKING_ESTATISTICAS_MATERIALIZADAS', default=True, cast=bool)
+
+# Instrumentação por requisição (consultas, tempo de SQL e de templates):
+# cabeçalho Server-Timing e log "ranking.instrumentacao", em WARNING para
+# requisições acima de RANKING_INSTRUMENTACAO_LENTO_MS ou com o mesmo SQL
+# repetido ao menos RANKING_INSTRUMENTACAO_REPETICOES vezes (provável N+1)
+RANKING_INSTRUMENTACAO = config('RANKING_INSTRUMENTACAO', default=False, cast=bool)
+RANKING_INSTRUMENTACAO_LENTO_MS = config('RANKING_INSTRUMENTACAO_LENTO_MS', default=500, cast=int)
+RANKING_INSTRUMENTACAO_REPETICOES = config('RANKING_INSTRUMENTACAO_REPETICOES', default=5, cast=int)
+
+# Sincronização ao vivo do quadro (server-sent events, só sob ASGI). O broker
+# em memória atende um único processo; com vários workers use
+# ranking.eventos.BrokerPostgres (LISTEN/NOTIFY no próprio banco)
+RANKING_EVENTOS_BROKER = config('RANKING_EVENTOS_BROKER', default='ranking.eventos.BrokerMemoria')
+RANKING_EVENTOS_PING = config('RANKING_EVENTOS_PING', default=15, cast=int)
+
+# Currículos: tamanho máximo do upload e threads que extraem o texto para a
+# busca (0 extrai na própria requisição, depois do commit)
+RANKING_CURRICULOS_MAX_MB = config('RANKING_CURRICULOS_MAX_MB', default=10, cast=int)
+RANKING_CURRICULOS_WORKERS = config('RANKING_CURRICULOS_WORKERS', default=2, cast=int)
+
+# Tarefas em segundo plano (fila no próprio banco, executada por
+# "python manage.py run_workers"): processos do grupo, espera entre consultas
+# à fila vazia (s), tempo sem sinal até uma tarefa ser dada como abandonada (s)
+# e dias que as finalizadas ficam guardadas. Vão para a fila as operações em
+# lote de processos com ao menos RANKING_TAREFAS_MINIMO_RANKINGS rankings e as
+# importações de CSV acima de RANKING_TAREFAS_IMPORTACAO_KB
+RANKING_TAREFAS_PROCESSOS = config('RANKING_TAREFAS_PROCESSOS', default=2, cast=int)
+RANKING_TAREFAS_INTERVALO = config('RANKING_TAREFAS_INTERVALO', default=1.0, cast=float)
+RANKING_TAREFAS_ABANDONO = config('RANKING_TAREFAS_ABANDONO', default=600, cast=int)
+RANKING_TAREFAS_RETENCAO_DIAS = config('RANKING_TAREFAS_RETENCAO_DIAS', default=7, cast=int)
+RANKING_TAREFAS_MINIMO_RANKINGS = config('RANKING_TAREFAS_MINIMO_RANKINGS', default=2000, cast=int)
+RANKING_TAREFAS_IMPORTACAO_KB = config('RANKING_TAREFAS_IMPORTACAO_KB', default=512, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ranking.instrumentacao': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators